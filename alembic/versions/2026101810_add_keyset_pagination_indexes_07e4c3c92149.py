@@ -0,0 +1,47 @@
+"""add_keyset_pagination_indexes
+
+Revision ID: 07e4c3c92149
+Revises: 54b99935fb0f
+Create Date: 2026-10-18 09:10:12.418305
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "07e4c3c92149"
+down_revision = "54b99935fb0f"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_book_name_id": ["name", "id"],
+    "ix_book_author_id": ["author", "id"],
+    "ix_book_date_published_id": ["date_published", "id"],
+}
+
+
+def upgrade():
+    # CONCURRENTLY keeps the book table writable while the indexes build,
+    # but it can't run inside the migration transaction.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name,
+                "book",
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.drop_index(
+                name,
+                table_name="book",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
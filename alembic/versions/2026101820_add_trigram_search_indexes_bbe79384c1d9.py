@@ -0,0 +1,46 @@
+"""add_trigram_search_indexes
+
+Revision ID: bbe79384c1d9
+Revises: 07e4c3c92149
+Create Date: 2026-10-18 09:20:41.730562
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "bbe79384c1d9"
+down_revision = "07e4c3c92149"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("name", "author", "genre")
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # GIN trigram indexes serve both `ILIKE '%term%'` filters and the
+    # word-similarity operators used by the `q=` search mode.
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.create_index(
+                f"ix_book_{column}_trgm",
+                "book",
+                [column],
+                unique=False,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for column in COLUMNS:
+            op.drop_index(
+                f"ix_book_{column}_trgm",
+                table_name="book",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
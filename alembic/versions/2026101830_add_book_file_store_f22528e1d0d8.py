@@ -0,0 +1,46 @@
+"""add_book_file_store
+
+Revision ID: f22528e1d0d8
+Revises: bbe79384c1d9
+Create Date: 2026-10-18 09:30:05.164211
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "f22528e1d0d8"
+down_revision = "bbe79384c1d9"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "book_file",
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=True),
+        sa.Column("size", sa.BigInteger(), nullable=True),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("path"),
+        sa.UniqueConstraint("sha256"),
+    )
+    op.add_column("book", sa.Column("file_name", sa.String(), nullable=True))
+    # Files uploaded before the content-addressed store are tracked by path
+    # only; they keep their reference counts but have no digest.
+    op.execute(
+        """
+        INSERT INTO book_file (path, ref_count)
+        SELECT file_path, count(*)
+        FROM book
+        WHERE file_path IS NOT NULL
+        GROUP BY file_path
+        """
+    )
+
+
+def downgrade():
+    op.drop_column("book", "file_name")
+    op.drop_table("book_file")
@@ -0,0 +1,44 @@
+"""add_book_facet_summary
+
+Revision ID: fc9762a8cfd3
+Revises: f22528e1d0d8
+Create Date: 2026-10-18 10:40:12.408817
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "fc9762a8cfd3"
+down_revision = "f22528e1d0d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "book_facet",
+        sa.Column("facet", sa.String(length=16), nullable=False),
+        sa.Column("value", sa.String(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("facet", "value"),
+    )
+    op.create_index(
+        "ix_book_facet_facet_count", "book_facet", ["facet", "count"], unique=False
+    )
+    for facet in ("genre", "author"):
+        op.execute(
+            f"""
+            INSERT INTO book_facet (facet, value, count)
+            SELECT '{facet}', {facet}, count(*)
+            FROM book
+            GROUP BY {facet}
+            """
+        )
+
+
+def downgrade():
+    op.drop_index("ix_book_facet_facet_count", table_name="book_facet")
+    op.drop_table("book_facet")
@@ -0,0 +1,35 @@
+"""add_book_file_access_stats
+
+Revision ID: 3b8e61c0d5a2
+Revises: fc9762a8cfd3
+Create Date: 2026-10-18 10:50:41.730205
+
+"""
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3b8e61c0d5a2"
+down_revision = "fc9762a8cfd3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "book_file",
+        sa.Column(
+            "download_count", sa.BigInteger(), server_default="0", nullable=False
+        ),
+    )
+    op.add_column(
+        "book_file",
+        sa.Column("last_downloaded_at", sa.DateTime(timezone=True), nullable=True),
+    )
+
+
+def downgrade():
+    op.drop_column("book_file", "last_downloaded_at")
+    op.drop_column("book_file", "download_count")
@@ -1,16 +1,84 @@
-from collections.abc import Sequence
+import io
+from dataclasses import dataclass
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    File,
+    Form,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from starlette.datastructures import UploadFile as StarletteUploadFile
 
-from app.crud.book import delete_book, fetch_book, list_books, save_book, update_book
-from app.dependencies.core import DBSessionDep
-from app.helper.book_file import get_basename, is_file_exists, save_file
+from app.core.database import sessionmanager
+from app.crud.book import (
+    bulk_delete_books,
+    bulk_update_books,
+    delete_book,
+    fetch_book,
+    get_cached_book,
+    get_cached_books,
+    get_cached_facets,
+    list_cached_books,
+    next_cursor,
+    save_book,
+    total_count,
+    update_book,
+)
+from app.dependencies.core import DBSessionDep, ReadDBSessionDep
+from app.helper.book_export import MEDIA_TYPES, ExportFormat, export_books
+from app.helper.book_file import (
+    SavedFile,
+    access_stats,
+    get_basename,
+    is_file_exists,
+    remove_file,
+    save_file,
+)
+from app.helper.book_file_gc import remove_released_files
+from app.helper.book_import import (
+    DEFAULT_BATCH_SIZE,
+    ImportFormat,
+    guess_format,
+    import_books,
+)
+from app.helper.book_preview import (
+    ensure_preview,
+    ensure_thumbnail,
+    guess_media_type,
+    preview_path,
+)
+from app.helper.http import conditional_file_response
+from app.helper.resumable_upload import discard_session, finish_upload
 from app.models import Book as BookDBModel
-from app.schemas.requests import BookCreate, BookFilter, BookUpdate
-from app.schemas.responses import BookResponse
+from app.schemas.requests import (
+    BookBatchRequest,
+    BookBulkDelete,
+    BookBulkUpdate,
+    BookCreate,
+    BookFilter,
+    BookSearch,
+    BookUpdate,
+    CountMode,
+)
+from app.schemas.responses import (
+    BookBatchResponse,
+    BookBulkResponse,
+    BookFacetsResponse,
+    BookImportResponse,
+    BookResponse,
+    render_batch,
+    render_book,
+    render_books,
+)
 
 router = APIRouter(
     prefix="/api/books",
@@ -19,59 +87,179 @@ router = APIRouter(
 )
 
 
+@router.get("/export")
+async def export_books_file(
+    filters: Annotated[BookSearch, Depends()],
+    fmt: Annotated[ExportFormat, Query(alias="format")] = "ndjson",
+) -> StreamingResponse:
+    return StreamingResponse(
+        export_books(filters, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="books.{fmt}"'},
+    )
+
+
+@router.get("/facets", response_model=BookFacetsResponse)
+async def get_book_facets(
+    db_session: ReadDBSessionDep,
+    limit: Annotated[int, Query(ge=1, le=100)] = 20,
+) -> BookFacetsResponse:
+    return BookFacetsResponse.model_validate(await get_cached_facets(db_session, limit))
+
+
+# Read handlers render rows straight to JSON bytes; response_model is kept
+# for the OpenAPI schema only, FastAPI passes a Response through untouched.
 @router.get("/{book_id}", response_model=BookResponse)
 async def get_book(
     book_id: int,
-    db_session: DBSessionDep,
-) -> BookDBModel:
-    return await fetch_book(db_session, book_id)
+    db_session: ReadDBSessionDep,
+) -> Response:
+    book = await get_cached_book(db_session, book_id)
+    return Response(render_book(book), media_type="application/json")
 
 
 @router.get("", response_model=list[BookResponse])
 async def get_books(
-    filters: Annotated[BookFilter, Depends()], db_session: DBSessionDep
-) -> Sequence[BookDBModel]:
-    return await list_books(db_session, filters)
+    filters: Annotated[BookFilter, Depends()],
+    db_session: ReadDBSessionDep,
+    count: CountMode | None = None,
+) -> Response:
+    books = await list_cached_books(db_session, filters)
+    response = Response(render_books(books), media_type="application/json")
+    cursor = next_cursor(filters, books)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    if count:
+        total, mode = await total_count(db_session, filters, count)
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Mode"] = mode
+    return response
+
+
+@dataclass
+class FileUpload:
+    """A book file sent in the form, or the id of a finished resumable upload.
+
+    Only collected here: the file is stored by the endpoint, after the rest
+    of the form has validated.
+    """
+
+    file: UploadFile | str | None = File(None)
+    upload_id: str | None = Form(None)
+
+    async def receive(self) -> SavedFile | None:
+        if self.upload_id:
+            return await finish_upload(self.upload_id)
+        if isinstance(self.file, StarletteUploadFile) and self.file.filename != "":
+            return await save_file(self.file)
+        return None
+
+    async def release(self, saved_file: SavedFile | None) -> None:
+        """Drop what is left once the book has been committed: the resumable
+        session, or a temporary file the book didn't need."""
+        if self.upload_id:
+            await discard_session(self.upload_id)
+        elif saved_file is not None and saved_file.source is not None:
+            await run_in_threadpool(remove_file, saved_file.source)
 
 
 @router.post("", response_model=BookResponse)
 async def create_book(
     book_data: Annotated[BookCreate, Depends(BookCreate.as_form)],
     db_session: DBSessionDep,
-    file: UploadFile = File(...),
+    background_tasks: BackgroundTasks,
+    upload: Annotated[FileUpload, Depends()],
 ) -> BookDBModel:
-    file_path = save_file(file)
-    new_book = await save_book(db_session, book_data, file_path)
+    saved_file = await upload.receive()
+    if saved_file is None:
+        raise HTTPException(status_code=422, detail="A file or upload_id is required")
+    new_book = await save_book(db_session, book_data, saved_file)
+    await upload.release(saved_file)
+    background_tasks.add_task(ensure_preview, saved_file.path)
     return new_book
 
 
+@router.post("/batch", response_model=BookBatchResponse)
+async def get_books_batch(
+    batch: BookBatchRequest, db_session: ReadDBSessionDep
+) -> Response:
+    books, missing = await get_cached_books(db_session, batch.ids)
+    return Response(render_batch(books, missing), media_type="application/json")
+
+
+@router.post("/bulk-update", response_model=BookBulkResponse)
+async def bulk_update_book_data(
+    bulk: BookBulkUpdate, db_session: DBSessionDep
+) -> BookBulkResponse:
+    book_ids = await bulk_update_books(db_session, bulk)
+    return BookBulkResponse(count=len(book_ids), ids=book_ids)
+
+
+@router.post("/bulk-delete", response_model=BookBulkResponse)
+async def bulk_delete_book_data(
+    bulk: BookBulkDelete, db_session: DBSessionDep, background_tasks: BackgroundTasks
+) -> BookBulkResponse:
+    book_ids, unreferenced = await bulk_delete_books(db_session, bulk.ids)
+    if unreferenced:
+        background_tasks.add_task(remove_released_files, sessionmanager, unreferenced)
+    return BookBulkResponse(count=len(book_ids), ids=book_ids)
+
+
+@router.post("/import", response_model=BookImportResponse)
+async def import_books_file(
+    db_session: DBSessionDep,
+    file: UploadFile = File(...),
+    fmt: Annotated[ImportFormat | None, Query(alias="format")] = None,
+    batch_size: Annotated[int, Query(ge=1, le=10_000)] = DEFAULT_BATCH_SIZE,
+) -> BookImportResponse:
+    await file.seek(0)
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        return await import_books(
+            db_session, stream, fmt or guess_format(file.filename), batch_size
+        )
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    finally:
+        stream.detach()
+
+
 @router.put("/{book_id}", response_model=BookResponse)
 async def update_book_data(
     book_id: int,
     book_data: Annotated[BookUpdate, Depends(BookUpdate.as_form)],
     db_session: DBSessionDep,
-    file: UploadFile | str | None = File(None),
+    background_tasks: BackgroundTasks,
+    upload: Annotated[FileUpload, Depends()],
 ) -> BookDBModel:
-    if isinstance(file, StarletteUploadFile) and file.filename != "":
-        file_path = save_file(file)
-    else:
-        file_path = None  # No file uploaded
-    return await update_book(db_session, book_id, book_data, file_path)
+    if upload.upload_id:
+        # Checked before the upload is attached, so a wrong id doesn't cost
+        # the client its finished upload.
+        await fetch_book(db_session, book_id)
+    saved_file = await upload.receive()
+    book = await update_book(db_session, book_id, book_data, saved_file)
+    await upload.release(saved_file)
+    if saved_file is not None:
+        background_tasks.add_task(ensure_preview, saved_file.path)
+    return book
 
 
 @router.get("/{book_id}/download")
 async def download_book_file(
     book_id: int,
-    db_session: DBSessionDep,
-) -> FileResponse:
-    book = await fetch_book(db_session, book_id)
-
-    if not is_file_exists(book.file_path):
+    request: Request,
+    db_session: ReadDBSessionDep,
+) -> Response:
+    book = await get_cached_book(db_session, book_id)
+    if not book.file_path:
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(
-        path=book.file_path,
-        filename=get_basename(book.file_path),
+    # Feeds the tiering job; a dict update keeps the hot path write-free.
+    access_stats.record(book.file_path)
+    return await conditional_file_response(
+        request,
+        book.file_path,
+        filename=book.file_name or get_basename(book.file_path),
         media_type="application/octet-stream",
     )
 
@@ -79,14 +267,44 @@ async def download_book_file(
 @router.get("/{book_id}/preview")
 async def preview_book_file(
     book_id: int,
-    db_session: DBSessionDep,
-) -> FileResponse:
-    book = await fetch_book(db_session, book_id)
+    request: Request,
+    db_session: ReadDBSessionDep,
+) -> Response:
+    book = await get_cached_book(db_session, book_id)
+
+    if not is_file_exists(book.file_path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    digest = await ensure_preview(book.file_path)
+    if digest is not None:
+        return await conditional_file_response(
+            request, preview_path(digest), media_type="application/pdf"
+        )
+    # Short PDFs without a PDF library, and every other format, are
+    # previewed as the original file under its real media type.
+    media_type = await run_in_threadpool(
+        guess_media_type, book.file_path, book.file_name
+    )
+    return await conditional_file_response(
+        request, book.file_path, media_type=media_type
+    )
+
+
+@router.get("/{book_id}/thumbnail")
+async def thumbnail_book_file(
+    book_id: int,
+    request: Request,
+    db_session: ReadDBSessionDep,
+) -> Response:
+    book = await get_cached_book(db_session, book_id)
 
     if not is_file_exists(book.file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(path=book.file_path, media_type="application/pdf")
+    thumbnail = await ensure_thumbnail(book.file_path)
+    if thumbnail is None:
+        raise HTTPException(status_code=404, detail="Thumbnail not available")
+    return await conditional_file_response(request, thumbnail, media_type="image/png")
 
 
 @router.delete("/{book_id}", status_code=204)
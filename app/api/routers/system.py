@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+
+from app.core.cache import caches
+from app.core.database import sessionmanager
+
+router = APIRouter(
+    prefix="/api/system",
+    tags=["system"],
+)
+
+
+@router.get("/cache")
+async def get_cache_stats() -> dict[str, dict[str, int]]:
+    return {
+        name: cache.stats.as_dict() | {"size": len(cache)}
+        for name, cache in caches.items()
+    }
+
+
+@router.get("/db")
+async def get_db_pool_stats() -> dict[str, int | float]:
+    return sessionmanager.pool_status()
@@ -0,0 +1,70 @@
+from email.utils import formatdate
+from typing import Annotated
+
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+
+from app.helper.resumable_upload import (
+    UploadSession,
+    append_chunks,
+    cancel_session,
+    create_session,
+    get_session,
+    parse_metadata,
+)
+
+router = APIRouter(
+    prefix="/api/uploads",
+    tags=["uploads"],
+)
+
+CHUNK_MEDIA_TYPE = "application/offset+octet-stream"
+
+
+def session_headers(session: UploadSession) -> dict[str, str]:
+    return {
+        "upload-offset": str(session.offset),
+        "upload-length": str(session.length),
+        "upload-expires": formatdate(session.expires_at, usegmt=True),
+        "cache-control": "no-store",
+    }
+
+
+@router.post("", status_code=201)
+async def create_upload(
+    upload_length: Annotated[int, Header(ge=0)],
+    upload_metadata: Annotated[str | None, Header()] = None,
+) -> Response:
+    """Start a resumable upload; the file name goes in Upload-Metadata as
+    ``filename <base64>``. Finish it by passing the id as ``upload_id`` to
+    POST or PUT /api/books."""
+    filename = parse_metadata(upload_metadata).get("filename", "")
+    session = await create_session(upload_length, filename)
+    headers = session_headers(session) | {"location": f"{router.prefix}/{session.id}"}
+    return Response(status_code=201, headers=headers)
+
+
+@router.head("/{upload_id}")
+async def get_upload_offset(upload_id: str) -> Response:
+    return Response(headers=session_headers(await get_session(upload_id)))
+
+
+@router.patch("/{upload_id}", status_code=204)
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: Annotated[int, Header(ge=0)],
+    content_type: Annotated[str | None, Header()] = None,
+) -> Response:
+    # The body is read straight from the request stream, chunk by chunk,
+    # rather than spooled first.
+    if content_type != CHUNK_MEDIA_TYPE:
+        raise HTTPException(
+            status_code=415, detail=f"Content-Type must be {CHUNK_MEDIA_TYPE}"
+        )
+    session = await append_chunks(upload_id, upload_offset, request.stream())
+    return Response(status_code=204, headers=session_headers(session))
+
+
+@router.delete("/{upload_id}", status_code=204)
+async def delete_upload(upload_id: str) -> None:
+    await cancel_session(upload_id)
@@ -0,0 +1,110 @@
+import argparse
+import asyncio
+import json
+from collections.abc import Sequence
+from dataclasses import asdict
+
+from app.core.database import sessionmanager
+from app.helper.book_file_gc import DEFAULT_BATCH_SIZE as GC_BATCH_SIZE
+from app.helper.book_file_gc import reconcile_uploads
+from app.helper.book_file_layout import DEFAULT_BATCH_SIZE as SHARD_BATCH_SIZE
+from app.helper.book_file_layout import shard_uploads
+from app.helper.book_file_tiering import DEFAULT_BATCH_SIZE as TIER_BATCH_SIZE
+from app.helper.book_file_tiering import tier_files
+from app.helper.book_import import DEFAULT_BATCH_SIZE, guess_format, import_books
+
+
+async def import_books_command(args: argparse.Namespace) -> None:
+    with open(args.path, encoding="utf-8", newline="") as stream:
+        async with sessionmanager.session() as session:
+            result = await import_books(
+                session,
+                stream,
+                args.format or guess_format(args.path),
+                args.batch_size,
+            )
+    print(result.model_dump_json(indent=2))
+
+
+async def gc_files_command(args: argparse.Namespace) -> None:
+    report = await reconcile_uploads(
+        sessionmanager,
+        grace_period=args.grace_period,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run,
+    )
+    print(json.dumps(asdict(report), indent=2))
+
+
+async def shard_files_command(args: argparse.Namespace) -> None:
+    report = await shard_uploads(
+        sessionmanager, batch_size=args.batch_size, dry_run=args.dry_run
+    )
+    print(json.dumps(asdict(report), indent=2))
+
+
+async def tier_files_command(args: argparse.Namespace) -> None:
+    report = await tier_files(
+        sessionmanager, cold_after=args.cold_after, batch_size=args.batch_size
+    )
+    print(json.dumps(asdict(report), indent=2))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser(
+        "import-books", help="Bulk import book metadata from CSV or NDJSON"
+    )
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=["csv", "ndjson"])
+    import_parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    import_parser.set_defaults(handler=import_books_command)
+
+    gc_parser = commands.add_parser(
+        "gc-files",
+        help="Remove unreferenced uploads and report books whose file is missing",
+    )
+    gc_parser.add_argument(
+        "--grace-period",
+        type=float,
+        help="seconds an unreferenced file is kept (default: STORAGE__GC_GRACE_PERIOD)",
+    )
+    gc_parser.add_argument("--batch-size", type=int, default=GC_BATCH_SIZE)
+    gc_parser.add_argument("--dry-run", action="store_true")
+    gc_parser.set_defaults(handler=gc_files_command)
+
+    shard_parser = commands.add_parser(
+        "shard-files",
+        help="Move uploads from the flat directory layout to the sharded one",
+    )
+    shard_parser.add_argument("--batch-size", type=int, default=SHARD_BATCH_SIZE)
+    shard_parser.add_argument("--dry-run", action="store_true")
+    shard_parser.set_defaults(handler=shard_files_command)
+
+    tier_parser = commands.add_parser(
+        "tier-files", help="Compress stored files that have not been downloaded lately"
+    )
+    tier_parser.add_argument(
+        "--cold-after",
+        type=float,
+        help="seconds without a download before a file is compressed "
+        "(default: STORAGE__TIER_COLD_AFTER)",
+    )
+    tier_parser.add_argument("--batch-size", type=int, default=TIER_BATCH_SIZE)
+    tier_parser.set_defaults(handler=tier_files_command)
+
+    return parser
+
+
+async def run(argv: Sequence[str] | None = None) -> None:
+    args = build_parser().parse_args(argv)
+    try:
+        await args.handler(args)
+    finally:
+        await sessionmanager.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
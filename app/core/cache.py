@@ -0,0 +1,165 @@
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from app.core.config import Cache as CacheSettings
+from app.core.config import get_settings
+from app.core.metrics import Counter, Gauge, Labels, registry
+
+MISSING: Any = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    def as_dict(self) -> dict[str, int]:
+        return asdict(self)
+
+
+class CacheBackend(ABC):
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+
+    def __len__(self) -> int:
+        return 0
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the cached value or MISSING."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None: ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> None: ...
+
+    @abstractmethod
+    async def clear(self) -> None: ...
+
+
+class NullCache(CacheBackend):
+    async def get(self, key: str) -> Any:
+        self.stats.misses += 1
+        return MISSING
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        pass
+
+    async def delete(self, key: str) -> None:
+        pass
+
+    async def clear(self) -> None:
+        pass
+
+
+class MemoryCache(CacheBackend):
+    """Bounded in-process LRU cache with per-entry TTL.
+
+    Entries live in the worker process, so writes only invalidate the worker
+    that served them; the TTL bounds how stale other workers can get.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        super().__init__()
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+                self.stats.evictions += 1
+            self.stats.misses += 1
+            return MISSING
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.stats.evictions += 1
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+
+class Generation:
+    """Counter folded into cache keys; bumping it orphans every older key."""
+
+    def __init__(self) -> None:
+        self.value = 0
+        self.bumped_at = float("-inf")
+
+    def bump(self) -> None:
+        self.value += 1
+        self.bumped_at = time.monotonic()
+
+
+caches: dict[str, CacheBackend] = {}
+
+
+def build_cache(settings: CacheSettings) -> CacheBackend:
+    if settings.backend == "memory":
+        return MemoryCache(max_size=settings.max_size, ttl=settings.ttl)
+    return NullCache()
+
+
+def get_cache(name: str) -> CacheBackend:
+    if name not in caches:
+        caches[name] = build_cache(get_settings().cache)
+    return caches[name]
+
+
+def _cache_stat(stat: str) -> list[tuple[Labels, float]]:
+    return [((name,), getattr(cache.stats, stat)) for name, cache in caches.items()]
+
+
+registry.register(
+    Counter(
+        "cache_hits_total",
+        "Cache hits by cache.",
+        ("cache",),
+        lambda: _cache_stat("hits"),
+    )
+)
+registry.register(
+    Counter(
+        "cache_misses_total",
+        "Cache misses by cache.",
+        ("cache",),
+        lambda: _cache_stat("misses"),
+    )
+)
+registry.register(
+    Counter(
+        "cache_evictions_total",
+        "Cache entries evicted for size or expiry, by cache.",
+        ("cache",),
+        lambda: _cache_stat("evictions"),
+    )
+)
+registry.register(
+    Gauge(
+        "cache_entries",
+        "Entries currently held, by cache.",
+        ("cache",),
+        lambda: [((name,), len(cache)) for name, cache in caches.items()],
+    )
+)
@@ -1,5 +1,6 @@
 from functools import lru_cache
 from pathlib import Path
+from typing import Literal
 
 from pydantic import BaseModel, SecretStr, computed_field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -14,10 +15,69 @@ class Database(BaseModel):
     password: SecretStr
     port: int = 5432
     db: str = "postgres"
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+    pool_pre_ping: bool = False
+    statement_cache_size: int = 100
+    # Transaction-pooling PgBouncer can't keep prepared statements across
+    # transactions, so this turns off asyncpg's statement caches.
+    pgbouncer: bool = False
+    # "host" or "host:port" of streaming replicas sharing the primary's
+    # credentials and database name.
+    replica_hostnames: list[str] = []
+    replica_retry_interval: float = 30.0
+    read_your_writes_window: int = 5
+    # Seconds; statements running longer are logged with their route, 0
+    # turns the log off.
+    slow_query_threshold: float = 0.5
+
+
+class Storage(BaseModel):
+    upload_dir: str = "./uploaded_books"
+    max_upload_size: int = 512 * 1024 * 1024
+    chunk_size: int = 1024 * 1024
+    # Seconds between background reconciliation runs (0 disables them), and
+    # how old an unreferenced file must be before it is removed, which has to
+    # outlast the slowest upload.
+    gc_interval: float = 6 * 3600
+    gc_grace_period: float = 3600
+    # PDF previews: the first pages and a thumbnail, rendered with pymupdf.
+    preview_dir: str = "./uploaded_books_previews"
+    preview_pages: int = 5
+    preview_workers: int = 2
+    thumbnail_width: int = 320
+    # Files not downloaded for tier_cold_after seconds are gzipped at rest
+    # (already compressed formats excepted); a cold file downloaded
+    # tier_promote_downloads times between two runs is stored uncompressed
+    # again. Runs every tier_interval seconds, 0 disables them.
+    tier_interval: float = 3600
+    tier_cold_after: float = 7 * 24 * 3600
+    tier_promote_downloads: int = 3
+    compression_level: int = 6
+    # Resumable uploads not appended to for this many seconds are discarded.
+    resumable_ttl: float = 24 * 3600
+    # Let the reverse proxy send file bodies: "x-accel-redirect" (nginx)
+    # answers with offload_prefix plus the path relative to offload_root,
+    # "x-sendfile" (Apache, lighttpd) with the absolute path. Compressed files
+    # and files outside offload_root are still streamed by the worker.
+    offload: Literal["none", "x-accel-redirect", "x-sendfile"] = "none"
+    offload_root: str = "."
+    offload_prefix: str = "/internal/"
+
+
+class Cache(BaseModel):
+    backend: Literal["memory", "none"] = "memory"
+    max_size: int = 10_000
+    ttl: float = 60.0
+    negative_ttl: float = 5.0
 
 
 class Settings(BaseSettings):  # type: ignore
     database: Database
+    storage: Storage = Storage()
+    cache: Cache = Cache()
 
     @computed_field
     def sqlalchemy_database_uri(self) -> URL:
@@ -30,6 +90,23 @@ class Settings(BaseSettings):  # type: ignore
             database=self.database.db,
         )
 
+    @computed_field
+    def sqlalchemy_replica_uris(self) -> list[URL]:
+        uris = []
+        for replica in self.database.replica_hostnames:
+            hostname, _, port = replica.partition(":")
+            uris.append(
+                URL.create(
+                    drivername="postgresql+asyncpg",
+                    username=self.database.username,
+                    password=self.database.password.get_secret_value(),
+                    host=hostname,
+                    port=int(port) if port else self.database.port,
+                    database=self.database.db,
+                )
+            )
+        return uris
+
     model_config = SettingsConfigDict(
         env_file=f"{PROJECT_DIR}/.env",
         case_sensitive=False,
@@ -1,7 +1,12 @@
 import contextlib
-from collections.abc import AsyncGenerator, AsyncIterator
+import itertools
+import time
+from collections.abc import AsyncIterator, Sequence
+from dataclasses import dataclass
 from typing import Any
+from uuid import uuid4
 
+from sqlalchemy import exc
 from sqlalchemy.engine.url import URL
 from sqlalchemy.ext.asyncio import (
     AsyncConnection,
@@ -11,30 +16,136 @@ from sqlalchemy.ext.asyncio import (
     create_async_engine,
 )
 from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, QueuePool
 
-from app.core.config import get_settings
+from app.core.config import Database, get_settings
+from app.core.metrics import Counter, Gauge, Labels, instrument_engine, registry
 
 
 class Base(DeclarativeBase):
     __mapper_args__ = {"eager_defaults": True}
 
 
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_time += waited
+            self.max_wait = max(self.max_wait, waited)
+
+
+def engine_kwargs(settings: Database) -> dict[str, Any]:
+    statement_cache_size = 0 if settings.pgbouncer else settings.statement_cache_size
+    connect_args: dict[str, Any] = {
+        "statement_cache_size": statement_cache_size,
+        "prepared_statement_cache_size": statement_cache_size,
+    }
+    if settings.pgbouncer:
+        connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return {
+        "poolclass": TimedQueuePool,
+        "pool_size": settings.pool_size,
+        "max_overflow": settings.max_overflow,
+        "pool_timeout": settings.pool_timeout,
+        "pool_recycle": settings.pool_recycle,
+        "pool_pre_ping": settings.pool_pre_ping,
+        "connect_args": connect_args,
+    }
+
+
+@dataclass
+class Replica:
+    engine: AsyncEngine
+    sessionmaker: async_sessionmaker[AsyncSession]
+    unhealthy_until: float = 0.0
+
+
 class DatabaseSessionManager:
-    def __init__(self, host: URL, engine_kwargs: dict[str, Any] = {}):
+    def __init__(
+        self,
+        host: URL,
+        engine_kwargs: dict[str, Any] = {},
+        replica_hosts: Sequence[URL] = (),
+        replica_retry_interval: float = 30.0,
+    ):
         self._engine: AsyncEngine | None = create_async_engine(host, **engine_kwargs)
+        instrument_engine(self._engine, "primary")
         self._sessionmaker: async_sessionmaker[AsyncSession] | None = (
             async_sessionmaker(
                 autocommit=False, bind=self._engine, expire_on_commit=False
             )
         )
+        self._replicas: list[Replica] = []
+        for index, replica_host in enumerate(replica_hosts):
+            engine = create_async_engine(replica_host, **engine_kwargs)
+            instrument_engine(engine, f"replica-{index}")
+            self._replicas.append(
+                Replica(
+                    engine=engine,
+                    sessionmaker=async_sessionmaker(
+                        autocommit=False, bind=engine, expire_on_commit=False
+                    ),
+                )
+            )
+        self._replica_cycle = itertools.count()
+        self.replica_retry_interval = replica_retry_interval
+
+    @property
+    def is_open(self) -> bool:
+        return self._engine is not None
+
+    @property
+    def has_replicas(self) -> bool:
+        return bool(self._replicas)
 
     async def close(self) -> None:
         if self._engine is None:
             raise Exception("DatabaseSessionManager is not initialized")
         await self._engine.dispose()
+        for replica in self._replicas:
+            await replica.engine.dispose()
 
         self._engine = None
         self._sessionmaker = None
+        self._replicas = []
+
+    def pool_status(self) -> dict[str, int | float]:
+        if self._engine is None:
+            raise Exception("DatabaseSessionManager is not initialized")
+
+        pool = self._engine.pool
+        if not isinstance(pool, QueuePool):
+            return {}
+        status: dict[str, int | float] = {
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        }
+        if isinstance(pool, TimedQueuePool):
+            status |= {
+                "checkouts": pool.checkouts,
+                "timeouts": pool.timeouts,
+                "wait_time_total": pool.wait_time,
+                "wait_time_max": pool.max_wait,
+            }
+        return status
 
     @contextlib.asynccontextmanager
     async def connect(self) -> AsyncIterator[AsyncConnection]:
@@ -62,10 +173,104 @@ class DatabaseSessionManager:
         finally:
             await session.close()
 
+    async def _replica_session(self) -> AsyncSession | None:
+        now = time.monotonic()
+        for _ in range(len(self._replicas)):
+            replica = self._replicas[next(self._replica_cycle) % len(self._replicas)]
+            if replica.unhealthy_until > now:
+                continue
+
+            session = replica.sessionmaker()
+            try:
+                # Check out a connection up front so an unreachable replica
+                # is skipped here rather than failing the request later.
+                await session.connection()
+            except (OSError, exc.DBAPIError, exc.TimeoutError):
+                await session.close()
+                replica.unhealthy_until = now + self.replica_retry_interval
+                continue
+            session.info["replica"] = True
+            return session
+        return None
+
+    @contextlib.asynccontextmanager
+    async def read_session(
+        self, use_primary: bool = False
+    ) -> AsyncIterator[AsyncSession]:
+        """Session for read-only work, spread round-robin over healthy replicas.
+
+        Falls back to the primary when there are no replicas, all of them are
+        marked unhealthy, or the caller needs to read its own writes. The
+        session's info records "replica" or "use_primary" for caches.
+        """
+        session = None if use_primary else await self._replica_session()
+        if session is None:
+            async with self.session() as primary_session:
+                primary_session.info["use_primary"] = use_primary
+                yield primary_session
+            return
+
+        try:
+            yield session
+        except Exception:
+            await session.rollback()
+            raise
+        finally:
+            await session.close()
+
 
-sessionmanager = DatabaseSessionManager(get_settings().sqlalchemy_database_uri)  # type: ignore
+def is_postgres(db_session: AsyncSession) -> bool:
+    return db_session.get_bind().dialect.name == "postgresql"
 
 
-async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
-    async with sessionmanager.session() as session:
-        yield session
+sessionmanager = DatabaseSessionManager(
+    get_settings().sqlalchemy_database_uri,  # type: ignore
+    engine_kwargs(get_settings().database),
+    get_settings().sqlalchemy_replica_uris,  # type: ignore
+    get_settings().database.replica_retry_interval,
+)
+
+
+def _pool_values(*keys: str) -> list[tuple[Labels, float]]:
+    status = sessionmanager.pool_status() if sessionmanager.is_open else {}
+    if len(keys) == 1:
+        return [((), status[keys[0]])] if keys[0] in status else []
+    return [((key,), status[key]) for key in keys if key in status]
+
+
+registry.register(
+    Gauge(
+        "db_pool_connections",
+        "Primary pool connections by state.",
+        ("state",),
+        collect=lambda: _pool_values("size", "checked_in", "checked_out", "overflow"),
+    )
+)
+registry.register(
+    Counter(
+        "db_pool_checkouts_total",
+        "Primary pool connection checkouts.",
+        collect=lambda: _pool_values("checkouts"),
+    )
+)
+registry.register(
+    Counter(
+        "db_pool_timeouts_total",
+        "Primary pool checkouts that timed out waiting for a connection.",
+        collect=lambda: _pool_values("timeouts"),
+    )
+)
+registry.register(
+    Counter(
+        "db_pool_wait_seconds_total",
+        "Time spent waiting for a primary pool connection.",
+        collect=lambda: _pool_values("wait_time_total"),
+    )
+)
+registry.register(
+    Gauge(
+        "db_pool_wait_seconds_max",
+        "Longest wait for a primary pool connection.",
+        collect=lambda: _pool_values("wait_time_max"),
+    )
+)
@@ -0,0 +1,389 @@
+import bisect
+import contextlib
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SLOW_QUERY_THRESHOLD = get_settings().database.slow_query_threshold
+
+Labels = tuple[str, ...]
+MetricT = TypeVar("MetricT", bound="Metric")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(ABC):
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+
+    @abstractmethod
+    def samples(self) -> Iterator[tuple[str, Labels, Labels, float]]:
+        """Yield (suffix, extra label names, label values, value) tuples."""
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for suffix, extra_names, values, value in self.samples():
+            labels = _format_labels((*self.labelnames, *extra_names), values)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Value(Metric):
+    """Single value per label set, updated directly or read at scrape time.
+
+    ``collect`` lets a metric mirror state kept elsewhere (pool or cache
+    statistics) without touching that code on the hot path.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        collect: Callable[[], Iterable[tuple[Labels, float]]] | None = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.values: dict[Labels, float] = {}
+        self.collect = collect
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self) -> Iterator[tuple[str, Labels, Labels, float]]:
+        values = self.collect() if self.collect else self.values.items()
+        for labels, value in values:
+            yield "", (), labels, value
+
+
+class Counter(Value):
+    type = "counter"
+
+
+class Gauge(Value):
+    type = "gauge"
+
+    def set(self, value: float, labels: Labels = ()) -> None:
+        self.values[labels] = value
+
+    def dec(self, amount: float = 1, labels: Labels = ()) -> None:
+        self.inc(-amount, labels)
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last one is +Inf),
+        # then the sum; cumulative counts are only built when scraped.
+        self.values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        entry = self.values.get(labels)
+        if entry is None:
+            entry = self.values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+        entry[0][bisect.bisect_left(self.buckets, value)] += 1
+        entry[1][0] += value
+
+    def samples(self) -> Iterator[tuple[str, Labels, Labels, float]]:
+        for labels, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), counts):
+                cumulative += count
+                yield "_bucket", ("le",), (*labels, _format_value(bound)), cumulative
+            yield "_sum", (), labels, total[0]
+            yield "_count", (), labels, cumulative
+
+
+class Registry:
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: MetricT) -> MetricT:
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics.values()) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter(
+        "http_requests_total",
+        "HTTP requests by method, route template and status.",
+        ("method", "route", "status"),
+    )
+)
+http_request_duration = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request latency by method and route template.",
+        ("method", "route"),
+    )
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+)
+http_response_bytes = registry.register(
+    Counter(
+        "http_response_bytes_total",
+        "Response body bytes sent, by route template.",
+        ("route",),
+    )
+)
+upload_bytes = registry.register(
+    Counter("book_upload_bytes_total", "Bytes received in book file uploads.")
+)
+http_request_queries = registry.register(
+    Histogram(
+        "http_request_db_queries",
+        "Database statements issued per request, by route template.",
+        ("route",),
+        QUERY_COUNT_BUCKETS,
+    )
+)
+http_request_db_duration = registry.register(
+    Histogram(
+        "http_request_db_duration_seconds",
+        "Database time spent per request, by route template.",
+        ("route",),
+        QUERY_BUCKETS,
+    )
+)
+gc_removed_files = registry.register(
+    Counter(
+        "upload_gc_removed_files_total",
+        "Unreferenced files removed from the upload directory.",
+    )
+)
+gc_removed_bytes = registry.register(
+    Counter(
+        "upload_gc_removed_bytes_total",
+        "Bytes freed by removing unreferenced uploads.",
+    )
+)
+gc_missing_files = registry.register(
+    Gauge(
+        "upload_gc_missing_files",
+        "Books whose file was missing at the last reconciliation.",
+    )
+)
+tier_compressed_files = registry.register(
+    Counter(
+        "storage_tier_compressed_files_total",
+        "Cold files moved to the compressed tier.",
+    )
+)
+tier_saved_bytes = registry.register(
+    Counter(
+        "storage_tier_saved_bytes_total",
+        "Bytes saved by compressing cold files.",
+    )
+)
+tier_promoted_files = registry.register(
+    Counter(
+        "storage_tier_promoted_files_total",
+        "Compressed files restored to the uncompressed tier.",
+    )
+)
+db_query_duration = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Database statement execution time by engine and statement type.",
+        ("engine", "operation"),
+        QUERY_BUCKETS,
+    )
+)
+
+
+def route_template(scope: Scope) -> str:
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+@dataclass
+class QueryStats:
+    """Statements run while a track_queries() block is active."""
+
+    scope: Scope | None = None
+    parent: "QueryStats | None" = None
+    count: int = 0
+    total_time: float = 0.0
+    slowest_time: float = 0.0
+    slowest_statement: str | None = None
+    statements: list[str] = field(default_factory=list)
+
+    @property
+    def route(self) -> str:
+        return route_template(self.scope) if self.scope is not None else "-"
+
+    def record(self, statement: str, elapsed: float) -> None:
+        stats: QueryStats | None = self
+        # Nested blocks (a test wrapping a request) see the same statements.
+        while stats is not None:
+            stats.count += 1
+            stats.total_time += elapsed
+            stats.statements.append(statement)
+            if elapsed >= stats.slowest_time:
+                stats.slowest_time = elapsed
+                stats.slowest_statement = statement
+            stats = stats.parent
+
+
+current_queries: ContextVar[QueryStats | None] = ContextVar(
+    "current_queries", default=None
+)
+
+
+@contextlib.contextmanager
+def track_queries(scope: Scope | None = None) -> Iterator[QueryStats]:
+    stats = QueryStats(scope=scope, parent=current_queries.get())
+    token = current_queries.set(stats)
+    try:
+        yield stats
+    finally:
+        current_queries.reset(token)
+
+
+def server_timing(stats: QueryStats) -> bytes:
+    return f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries"'.encode()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware recording latency, status and body size per route.
+
+    Routes are labelled by their template (``/api/books/{book_id}``), never by
+    the raw path, to keep the number of series bounded. Statements run while
+    serving the request are counted, and the totals so far are reported in a
+    Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        sent = 0
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", server_timing(queries)),
+                ]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        start = time.perf_counter()
+        http_requests_in_flight.inc()
+        try:
+            with track_queries(scope) as queries:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            route = route_template(scope)
+            method = scope["method"]
+            http_request_duration.observe(time.perf_counter() - start, (method, route))
+            http_requests.inc(labels=(method, route, str(status)))
+            http_response_bytes.inc(sent, (route,))
+            http_request_queries.observe(queries.count, (route,))
+            http_request_db_duration.observe(queries.total_time, (route,))
+            if queries.count:
+                logger.debug(
+                    "%s %s: %d queries in %.1f ms, slowest %.1f ms: %s",
+                    method,
+                    route,
+                    queries.count,
+                    queries.total_time * 1000,
+                    queries.slowest_time * 1000,
+                    queries.slowest_statement,
+                )
+
+
+def instrument_engine(engine: AsyncEngine, name: str) -> None:
+    """Time every statement run on the engine.
+
+    Durations go to db_query_duration and the active QueryStats, and
+    statements slower than SLOW_QUERY_THRESHOLD seconds are logged.
+    """
+
+    def before_cursor_execute(
+        conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        conn.info["query_start"] = time.perf_counter()
+
+    def after_cursor_execute(
+        conn: Any, cursor: Any, statement: str, *args: Any
+    ) -> None:
+        elapsed = time.perf_counter() - conn.info["query_start"]
+        operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+        db_query_duration.observe(elapsed, (name, operation))
+
+        stats = current_queries.get()
+        if stats is not None:
+            stats.record(statement, elapsed)
+        if 0 < SLOW_QUERY_THRESHOLD <= elapsed:
+            logger.warning(
+                "Slow query on %s (%.1f ms) in %s: %s",
+                name,
+                elapsed * 1000,
+                stats.route if stats is not None else "-",
+                statement,
+            )
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
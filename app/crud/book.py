@@ -1,26 +1,120 @@
-from collections.abc import Sequence
+import json
+import time
+from collections.abc import AsyncIterator, Iterable, Sequence
+from typing import Any
 
 from fastapi import HTTPException
-from sqlalchemy import select
+from sqlalchemy import (
+    BigInteger,
+    Row,
+    any_,
+    bindparam,
+    delete,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.elements import ClauseElement, ColumnElement
+from sqlalchemy.sql.expression import Executable, Select
 
-from app.helper.book_file import remove_file
+from app.core.cache import MISSING, Generation, get_cache
+from app.core.config import get_settings
+from app.core.database import is_postgres
+from app.crud.book_facet import (
+    FACETS,
+    FacetDeltas,
+    adjust_facets,
+    facet_deltas,
+    fetch_facets,
+)
+from app.crud.book_file import (
+    acquire_file,
+    release_file,
+    release_files,
+    remove_unreferenced,
+)
+from app.helper.book_file import SavedFile
+from app.helper.pagination import decode_cursor, encode_cursor
 from app.models import Book as BookDBModel
-from app.schemas.requests import BookCreate, BookFilter, BookUpdate
+from app.schemas.requests import (
+    BookBulkUpdate,
+    BookCreate,
+    BookFilter,
+    BookMatch,
+    BookSearch,
+    BookSort,
+    BookUpdate,
+    CountMode,
+)
 
+SORT_COLUMNS: dict[BookSort, InstrumentedAttribute[Any]] = {
+    "id": BookDBModel.id,
+    "name": BookDBModel.name,
+    "author": BookDBModel.author,
+    "date_published": BookDBModel.date_published,
+}
+SEARCH_COLUMNS = (BookDBModel.name, BookDBModel.author, BookDBModel.genre)
+EXPORT_COLUMNS = (
+    BookDBModel.id,
+    BookDBModel.name,
+    BookDBModel.author,
+    BookDBModel.genre,
+    BookDBModel.date_published,
+)
+# Read-only handlers select plain rows instead of entities: no identity map,
+# no instance state, and rows are immutable so the caches can share them.
+ROW_COLUMNS = (*EXPORT_COLUMNS, BookDBModel.file_path, BookDBModel.file_name)
 
-async def fetch_book(db_session: AsyncSession, book_id: int) -> BookDBModel:
-    stmt = select(BookDBModel).where(BookDBModel.id == book_id)
-    book = (await db_session.scalars(stmt)).first()
-    if not book:
-        raise HTTPException(status_code=404, detail="Book not found")
-    return book
+book_cache = get_cache("book")
+list_cache = get_cache("book_list")
+count_cache = get_cache("book_count")
+list_generation = Generation()
+NOT_FOUND: Any = object()
+CASE_INSENSITIVE_FILTERS = ("name", "author", "genre", "q")
+EXACT_COUNT_THRESHOLD = 10_000
 
 
-async def list_books(
-    db_session: AsyncSession, filters: BookFilter
-) -> Sequence[BookDBModel]:
+class Explain(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` of a statement, keeping its bound parameters."""
+
+    inherit_cache = False
+
+    def __init__(self, statement: Select[Any]) -> None:
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element: Explain, compiler: SQLCompiler, **kw: Any) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kw)
+
+
+def search_condition(db_session: AsyncSession, q: str) -> ColumnElement[bool]:
+    if not is_postgres(db_session):
+        return or_(*(column.ilike(f"%{q}%") for column in SEARCH_COLUMNS))
+    # `column %> q` is the word-similarity operator served by the
+    # gin_trgm_ops indexes.
+    return or_(*(column.op("%>")(q) for column in SEARCH_COLUMNS))
+
+
+def search_rank(q: str) -> ColumnElement[Any]:
+    return func.greatest(
+        *(func.word_similarity(literal(q), column) for column in SEARCH_COLUMNS)
+    )
+
+
+def filter_conditions(
+    db_session: AsyncSession, filters: BookSearch
+) -> list[ColumnElement[bool]]:
     conditions: list[ColumnElement[bool]] = []
     if filters.name:
         conditions.append(BookDBModel.name.ilike(f"%{filters.name}%"))
@@ -28,67 +122,548 @@ async def list_books(
         conditions.append(BookDBModel.author.ilike(f"%{filters.author}%"))
     if filters.genre:
         conditions.append(BookDBModel.genre.ilike(f"%{filters.genre}%"))
-    if filters.genre:
+    if filters.date_published:
         conditions.append(
             BookDBModel.date_published == filters.date_published,
         )
+    if filters.q:
+        conditions.append(search_condition(db_session, filters.q))
+    return conditions
+
+
+def cursor_condition(filters: BookFilter, cursor: str) -> ColumnElement[bool]:
+    if filters.q:
+        raise HTTPException(
+            status_code=400, detail="Cursor pagination is not supported with q"
+        )
+    value, last_id = decode_cursor(cursor, filters.sort)
+    sort_column = SORT_COLUMNS[filters.sort]
+    if sort_column is BookDBModel.id:
+        return BookDBModel.id > last_id
+    return tuple_(sort_column, BookDBModel.id) > tuple_(value, last_id)
+
+
+def order_clauses(
+    db_session: AsyncSession, filters: BookFilter
+) -> list[ColumnElement[Any] | InstrumentedAttribute[Any]]:
+    if filters.q and is_postgres(db_session):
+        return [search_rank(filters.q).desc(), BookDBModel.id]
+    sort_column = SORT_COLUMNS[filters.sort]
+    if sort_column is BookDBModel.id:
+        return [BookDBModel.id]
+    return [sort_column, BookDBModel.id]
+
+
+def ids_condition(
+    db_session: AsyncSession, book_ids: Sequence[int]
+) -> ColumnElement[bool]:
+    if is_postgres(db_session):
+        # One array parameter keeps a single prepared statement for any
+        # number of ids, unlike an expanded IN list.
+        ids = bindparam("book_ids", list(book_ids), type_=ARRAY(BigInteger))
+        return BookDBModel.id == any_(ids)
+    return BookDBModel.id.in_(book_ids)
+
+
+async def fetch_book(
+    db_session: AsyncSession, book_id: int, for_update: bool = False
+) -> BookDBModel:
+    """Load a book; `for_update` locks its row until the transaction ends,
+    so facet deltas and file releases are computed from the current row."""
+    stmt = select(BookDBModel).where(BookDBModel.id == book_id)
+    if for_update:
+        # A copy already in the session may predate the lock.
+        stmt = stmt.with_for_update().execution_options(populate_existing=True)
+    book = (await db_session.scalars(stmt)).first()
+    if not book:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return book
+
+
+def reads_cache(db_session: AsyncSession) -> bool:
+    # Clients pinned to the primary after a write must see it, not an entry
+    # another worker cached before it.
+    return not db_session.info.get("use_primary", False)
+
+
+def cache_generation(db_session: AsyncSession) -> int | None:
+    """list_generation before a read, or None if the read can't be cached.
+
+    A replica may still return rows from before a write for a while after it,
+    so its reads are only cached once the last write this worker invalidated
+    is older than the read-your-writes window.
+    """
+    if not reads_cache(db_session):
+        return None
+    if db_session.info.get("replica", False):
+        window = get_settings().database.read_your_writes_window
+        if time.monotonic() - list_generation.bumped_at < window:
+            return None
+    return list_generation.value
+
+
+def book_cache_key(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+async def fetch_book_row(db_session: AsyncSession, book_id: int) -> Row[Any]:
+    stmt = select(*ROW_COLUMNS).where(BookDBModel.id == book_id)
+    row = (await db_session.execute(stmt)).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Book not found")
+    return row
+
+
+async def get_cached_book(db_session: AsyncSession, book_id: int) -> Row[Any]:
+    """Read-through variant of fetch_book_row for handlers that never mutate.
+
+    404s are cached for the shorter negative TTL. A row is only cached if no
+    write was invalidated while it was read, since it may predate that write.
+    """
+    if not reads_cache(db_session):
+        return await fetch_book_row(db_session, book_id)
+    key = book_cache_key(book_id)
+    cached = await book_cache.get(key)
+    if cached is NOT_FOUND:
+        raise HTTPException(status_code=404, detail="Book not found")
+    if cached is not MISSING:
+        return cached  # type: ignore[no-any-return]
+
+    generation = cache_generation(db_session)
+    try:
+        row = await fetch_book_row(db_session, book_id)
+    except HTTPException:
+        if list_generation.value == generation:
+            negative_ttl = get_settings().cache.negative_ttl
+            await book_cache.set(key, NOT_FOUND, ttl=negative_ttl)
+        raise
+    if list_generation.value == generation:
+        await book_cache.set(key, row)
+    return row
+
+
+async def fetch_books(
+    db_session: AsyncSession, book_ids: Sequence[int]
+) -> Sequence[Row[Any]]:
+    stmt = select(*ROW_COLUMNS).where(ids_condition(db_session, book_ids))
+    return (await db_session.execute(stmt)).all()
+
+
+async def get_cached_books(
+    db_session: AsyncSession, book_ids: Sequence[int]
+) -> tuple[list[Row[Any]], list[int]]:
+    """Resolve many ids at once, returning (books in request order, missing ids).
+
+    Cached entries are served directly and the remaining ids are loaded with
+    a single query.
+    """
+    requested = list(dict.fromkeys(book_ids))
+    found: dict[int, Row[Any]] = {}
+    misses: list[int] = []
+    for book_id in requested:
+        cached = (
+            await book_cache.get(book_cache_key(book_id))
+            if reads_cache(db_session)
+            else MISSING
+        )
+        if cached is MISSING:
+            misses.append(book_id)
+        elif cached is not NOT_FOUND:
+            found[book_id] = cached
+
+    if misses:
+        generation = cache_generation(db_session)
+        for book in await fetch_books(db_session, misses):
+            found[book.id] = book
+        # As in get_cached_book, rows read across an invalidation aren't kept.
+        if list_generation.value == generation:
+            negative_ttl = get_settings().cache.negative_ttl
+            for book_id in misses:
+                if book_id in found:
+                    await book_cache.set(book_cache_key(book_id), found[book_id])
+                else:
+                    await book_cache.set(
+                        book_cache_key(book_id), NOT_FOUND, ttl=negative_ttl
+                    )
+
+    books = [found[book_id] for book_id in requested if book_id in found]
+    missing = [book_id for book_id in requested if book_id not in found]
+    return books, missing
+
+
+async def invalidate_book(book_id: int) -> None:
+    await invalidate_books([book_id])
+
+
+async def invalidate_books(book_ids: Iterable[int]) -> None:
+    for book_id in book_ids:
+        await book_cache.delete(book_cache_key(book_id))
+    list_generation.bump()
+
+
+def normalized_filters(filters: BookSearch) -> dict[str, Any]:
+    # Text filters are matched case-insensitively, so their case is dropped
+    # from the key; empty strings and None both mean "no filter".
+    key = filters.model_dump(mode="json")
+    for field in CASE_INSENSITIVE_FILTERS:
+        key[field] = key[field].lower() if key[field] else None
+    return key
 
-    stmt = select(BookDBModel)
+
+def list_cache_key(filters: BookFilter) -> str:
+    key = normalized_filters(filters)
+    if filters.cursor:
+        key["offset"] = None
+    payload = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return f"books:{list_generation.value}:{payload}"
+
+
+def count_cache_key(filters: BookSearch) -> str:
+    # Only the search fields matter; paging and sorting don't change totals.
+    key = {
+        field: value
+        for field, value in normalized_filters(filters).items()
+        if field in BookSearch.model_fields
+    }
+    payload = json.dumps(key, sort_keys=True, separators=(",", ":"))
+    return f"count:{list_generation.value}:{payload}"
+
+
+async def count_books(
+    db_session: AsyncSession, filters: BookSearch, limit: int | None = None
+) -> int:
+    """Number of matching books; with `limit`, counting stops at limit + 1."""
+    conditions = filter_conditions(db_session, filters)
+    if limit is not None:
+        matches = select(BookDBModel.id).where(*conditions).limit(limit + 1)
+        stmt = select(func.count()).select_from(matches.subquery())
+    else:
+        stmt = select(func.count()).select_from(BookDBModel)
+        if conditions:
+            stmt = stmt.where(*conditions)
+    return (await db_session.scalar(stmt)) or 0
+
+
+async def get_cached_count(
+    db_session: AsyncSession, filters: BookSearch, limit: int | None = None
+) -> int:
+    if not reads_cache(db_session):
+        return await count_books(db_session, filters, limit)
+    key = count_cache_key(filters)
+    total = await count_cache.get(key)
+    if total is MISSING:
+        generation = cache_generation(db_session)
+        total = await count_books(db_session, filters, limit)
+        # A count cut off at the limit is not the total.
+        if generation is not None and (limit is None or total <= limit):
+            await count_cache.set(key, total)
+    return total  # type: ignore[no-any-return]
+
+
+async def estimate_books(db_session: AsyncSession, filters: BookSearch) -> int | None:
+    """Planner's row estimate for the filters, or None where there is none.
+
+    The unfiltered total comes from pg_class.reltuples, which ANALYZE and
+    autovacuum keep current; filtered totals from the EXPLAIN row estimate.
+    """
+    if not is_postgres(db_session):
+        return None
+    conditions = filter_conditions(db_session, filters)
+    if not conditions:
+        reltuples = await db_session.scalar(
+            text("SELECT reltuples FROM pg_class WHERE oid = 'book'::regclass")
+        )
+        # -1 until the table has been analyzed once.
+        return int(reltuples) if reltuples is not None and reltuples >= 0 else None
+
+    plan = await db_session.scalar(Explain(select(BookDBModel.id).where(*conditions)))
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def total_count(
+    db_session: AsyncSession, filters: BookSearch, mode: CountMode
+) -> tuple[int, CountMode]:
+    """Total for the filters, and the mode that actually produced it.
+
+    The planner often estimates selective ILIKE and trigram filters far too
+    low, so estimates below EXACT_COUNT_THRESHOLD are checked with a count
+    that stops after EXACT_COUNT_THRESHOLD + 1 matches: an exact total when
+    there are no more, otherwise that lower bound as the estimate. Without
+    planner statistics the count is always exact.
+    """
+    if mode == "estimated":
+        estimate = await estimate_books(db_session, filters)
+        if estimate is not None and estimate >= EXACT_COUNT_THRESHOLD:
+            return estimate, "estimated"
+        if estimate is not None:
+            total = await get_cached_count(db_session, filters, EXACT_COUNT_THRESHOLD)
+            if total > EXACT_COUNT_THRESHOLD:
+                return total, "estimated"
+            return total, "exact"
+    return await get_cached_count(db_session, filters), "exact"
+
+
+async def get_cached_facets(
+    db_session: AsyncSession, limit: int
+) -> dict[str, list[dict[str, Any]]]:
+    # Facets change exactly when listings do, so they share the generation.
+    if not reads_cache(db_session):
+        return await fetch_facets(db_session, limit)
+    key = f"facets:{list_generation.value}:{limit}"
+    facets = await list_cache.get(key)
+    if facets is MISSING:
+        generation = cache_generation(db_session)
+        facets = await fetch_facets(db_session, limit)
+        if generation is not None:
+            await list_cache.set(key, facets)
+    return facets  # type: ignore[no-any-return]
+
+
+async def query_books(
+    db_session: AsyncSession, filters: BookFilter
+) -> Sequence[Row[Any]]:
+    conditions = filter_conditions(db_session, filters)
+    if filters.cursor:
+        conditions.append(cursor_condition(filters, filters.cursor))
+
+    stmt = select(*ROW_COLUMNS)
     if conditions:
         stmt = stmt.where(*conditions)
-    stmt = stmt.limit(filters.limit).offset(filters.limit * filters.offset)
+    stmt = stmt.order_by(*order_clauses(db_session, filters)).limit(filters.limit)
+    if not filters.cursor:
+        stmt = stmt.offset(filters.limit * filters.offset)
+
+    return (await db_session.execute(stmt)).all()
 
-    books = (await db_session.scalars(stmt)).all()
+
+async def list_books(
+    db_session: AsyncSession, filters: BookFilter
+) -> Sequence[Row[Any]]:
+    books = await query_books(db_session, filters)
     if not books:
         raise HTTPException(status_code=404, detail="Book(s) not found")
     return books
 
 
+async def list_cached_books(
+    db_session: AsyncSession, filters: BookFilter
+) -> Sequence[Row[Any]]:
+    if not reads_cache(db_session):
+        return await list_books(db_session, filters)
+    key = list_cache_key(filters)
+    books = await list_cache.get(key)
+    if books is MISSING:
+        generation = cache_generation(db_session)
+        books = await query_books(db_session, filters)
+        # Keyed by generation, so only replica lag can make this stale.
+        if generation is not None:
+            await list_cache.set(key, books)
+
+    if not books:
+        raise HTTPException(status_code=404, detail="Book(s) not found")
+    return books  # type: ignore[no-any-return]
+
+
+async def stream_book_rows(
+    db_session: AsyncSession, filters: BookSearch, batch_size: int
+) -> AsyncIterator[Sequence[Row[Any]]]:
+    """Yield matching books in id order as batches of Core rows.
+
+    `yield_per` makes the driver fetch through a server-side cursor on
+    Postgres, so memory stays flat however many rows match.
+    """
+    stmt = select(*EXPORT_COLUMNS).order_by(BookDBModel.id)
+    conditions = filter_conditions(db_session, filters)
+    if conditions:
+        stmt = stmt.where(*conditions)
+    result = await db_session.stream(stmt.execution_options(yield_per=batch_size))
+    async for rows in result.partitions():
+        yield rows
+
+
+def next_cursor(filters: BookFilter, books: Sequence[Row[Any]]) -> str | None:
+    if filters.q or len(books) < filters.limit:
+        return None
+    last = books[-1]
+    return encode_cursor(
+        filters.sort, getattr(last, SORT_COLUMNS[filters.sort].key), last.id
+    )
+
+
 async def save_book(
-    db_session: AsyncSession, book_data: BookCreate, file_path: str
+    db_session: AsyncSession, book_data: BookCreate, file: SavedFile | None = None
 ) -> BookDBModel:
     new_book = BookDBModel(
         name=book_data.name,
         author=book_data.author,
         genre=book_data.genre,
         date_published=book_data.date_published,
-        file_path=file_path,
     )
+    if file:
+        new_book.file_path = await acquire_file(db_session, file)
+        new_book.file_name = file.filename
     db_session.add(new_book)
+    await adjust_facets(db_session, facet_deltas([new_book]))
     await db_session.commit()
     await db_session.refresh(new_book)
+    await invalidate_book(new_book.id)
     return new_book
 
 
+async def insert_books(db_session: AsyncSession, books: Sequence[BookCreate]) -> None:
+    """Add a batch of metadata-only books with one multi-row INSERT.
+
+    The caller owns the transaction and bumps list_generation once it has
+    committed. New ids are not fetched back, so cached 404s expire on their
+    own.
+    """
+    await db_session.execute(insert(BookDBModel), [book.model_dump() for book in books])
+    await adjust_facets(db_session, facet_deltas(books))
+
+
 async def update_book(
     db_session: AsyncSession,
     book_id: int,
     book_data: BookUpdate,
-    file_path: str | None = None,
+    file: SavedFile | None = None,
 ) -> BookDBModel:
-    book = await fetch_book(db_session, book_id)
+    book = await fetch_book(db_session, book_id, for_update=True)
     data_to_update = filter(
         lambda kv: kv[1] not in (None, ""),
         book_data.model_dump(exclude_unset=True).items(),
     )
     old_file = None
+    deltas = facet_deltas([book], -1)
 
     for field, value in dict(data_to_update).items():
         setattr(book, field, value)
+    deltas.update(facet_deltas([book]))
+    await adjust_facets(db_session, deltas)
 
-    if file_path and book.file_path != file_path:
-        old_file = book.file_path
-        book.file_path = file_path
+    if file:
+        book.file_name = file.filename
+        if book.file_path != file.path:
+            file_path = await acquire_file(db_session, file)
+            if await release_file(db_session, book.file_path):
+                old_file = book.file_path
+            book.file_path = file_path
 
     await db_session.commit()
     await db_session.refresh(book)
+    await invalidate_book(book_id)
     if old_file:
-        remove_file(old_file)
+        await remove_unreferenced(db_session, [old_file])
     return book
 
 
 async def delete_book(db_session: AsyncSession, book_id: int) -> None:
-    book = await fetch_book(db_session, book_id)
+    book = await fetch_book(db_session, book_id, for_update=True)
     await db_session.delete(book)
+    await adjust_facets(db_session, facet_deltas([book], -1))
+    unreferenced = await release_file(db_session, book.file_path)
     await db_session.commit()
-    remove_file(book.file_path)
+    await invalidate_book(book_id)
+    if unreferenced:
+        await remove_unreferenced(db_session, [book.file_path])
+
+
+def match_conditions(match: BookMatch) -> list[ColumnElement[bool]]:
+    # Bulk writes match exactly: the list filters' substring and trigram
+    # matching would reach far more rows than the caller named.
+    return [
+        getattr(BookDBModel, field) == value
+        for field, value in match.model_dump().items()
+        if value not in (None, "")
+    ]
+
+
+def locked_rows(
+    conditions: Sequence[ColumnElement[bool]], *columns: InstrumentedAttribute[Any]
+) -> Select[Any]:
+    """Matching rows locked FOR UPDATE in id order, so overlapping bulk writes
+    queue behind each other instead of deadlocking."""
+    return (
+        select(*columns).where(*conditions).order_by(BookDBModel.id).with_for_update()
+    )
+
+
+async def bulk_update_books(
+    db_session: AsyncSession, bulk: BookBulkUpdate
+) -> list[int]:
+    """Apply one patch to many books with a single UPDATE ... RETURNING.
+
+    Returns the ids of the updated books.
+    """
+    values = {
+        field: value
+        for field, value in bulk.update.model_dump(exclude_unset=True).items()
+        if value not in (None, "")
+    }
+    if bulk.filter is not None:
+        conditions = match_conditions(bulk.filter)
+    else:
+        conditions = [ids_condition(db_session, bulk.ids or [])]
+
+    moves_facets = bool(values.keys() & set(FACETS))
+    deltas = FacetDeltas()
+    if moves_facets:
+        # RETURNING only sees the new values, so the facet values being
+        # replaced are read first. Locking the rows and then updating exactly
+        # those ids keeps concurrent writers from skewing the counts.
+        locked = locked_rows(
+            conditions, BookDBModel.id, BookDBModel.genre, BookDBModel.author
+        )
+        old = (await db_session.execute(locked)).all()
+        deltas = facet_deltas(old, -1)
+        target = ids_condition(db_session, [book.id for book in old])
+    else:
+        target = BookDBModel.id.in_(locked_rows(conditions, BookDBModel.id))
+
+    stmt = (
+        update(BookDBModel)
+        .where(target)
+        .values(values)
+        .returning(BookDBModel.id, BookDBModel.genre, BookDBModel.author)
+        .execution_options(synchronize_session=False)
+    )
+    updated = (await db_session.execute(stmt)).all()
+    if moves_facets:
+        deltas.update(facet_deltas(updated))
+        await adjust_facets(db_session, deltas)
+    await db_session.commit()
+
+    book_ids = [book.id for book in updated]
+    await invalidate_books(book_ids)
+    return book_ids
+
+
+async def bulk_delete_books(
+    db_session: AsyncSession, book_ids: Sequence[int]
+) -> tuple[list[int], list[str]]:
+    """Delete many books with a single DELETE ... RETURNING.
+
+    Returns (deleted ids, unreferenced file paths). Unlike delete_book the
+    files are left on disk for the caller to remove after the response.
+    """
+    locked = locked_rows([ids_condition(db_session, book_ids)], BookDBModel.id)
+    stmt = (
+        delete(BookDBModel)
+        .where(BookDBModel.id.in_(locked))
+        .returning(
+            BookDBModel.id,
+            BookDBModel.genre,
+            BookDBModel.author,
+            BookDBModel.file_path,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    deleted = (await db_session.execute(stmt)).all()
+    await adjust_facets(db_session, facet_deltas(deleted, -1))
+    unreferenced = await release_files(db_session, [book.file_path for book in deleted])
+    await db_session.commit()
+
+    deleted_ids = [book.id for book in deleted]
+    await invalidate_books(deleted_ids)
+    return deleted_ids, unreferenced
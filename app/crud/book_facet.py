@@ -0,0 +1,79 @@
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import is_postgres
+from app.models import Book as BookDBModel
+from app.models import BookFacet as BookFacetDBModel
+
+FACETS = ("genre", "author")
+
+FacetDeltas = Counter[tuple[str, str]]
+
+
+def facet_deltas(books: Iterable[Any], sign: int = 1) -> FacetDeltas:
+    """Per (facet, value) changes for adding (sign=1) or removing (-1) books."""
+    deltas: FacetDeltas = Counter()
+    for book in books:
+        for facet in FACETS:
+            deltas[facet, getattr(book, facet)] += sign
+    return deltas
+
+
+async def adjust_facets(db_session: AsyncSession, deltas: FacetDeltas) -> None:
+    """Apply facet count changes in the caller's transaction.
+
+    Rows are upserted in key order so concurrent writers lock them in the
+    same order and can't deadlock. Rows that drop to zero are kept and
+    filtered out on read, so a concurrent insert never races a delete.
+    """
+    values = [
+        {"facet": facet, "value": value, "count": delta}
+        for (facet, value), delta in sorted(deltas.items())
+        if delta
+    ]
+    if not values:
+        return
+    dialect_insert = postgresql.insert if is_postgres(db_session) else sqlite.insert
+    stmt = dialect_insert(BookFacetDBModel).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BookFacetDBModel.facet, BookFacetDBModel.value],
+        set_={"count": BookFacetDBModel.count + stmt.excluded.count},
+    )
+    await db_session.execute(stmt)
+
+
+async def fetch_facets(
+    db_session: AsyncSession, limit: int
+) -> dict[str, list[dict[str, Any]]]:
+    facets = {}
+    for facet in FACETS:
+        stmt = (
+            select(BookFacetDBModel.value, BookFacetDBModel.count)
+            .where(BookFacetDBModel.facet == facet, BookFacetDBModel.count > 0)
+            .order_by(BookFacetDBModel.count.desc(), BookFacetDBModel.value)
+            .limit(limit)
+        )
+        rows = await db_session.execute(stmt)
+        facets[facet] = [{"value": row.value, "count": row.count} for row in rows]
+    return facets
+
+
+async def rebuild_facets(db_session: AsyncSession) -> None:
+    """Recompute every facet from the book table, for rows written around it.
+
+    The caller owns the transaction.
+    """
+    await db_session.execute(delete(BookFacetDBModel))
+    for facet in FACETS:
+        column = getattr(BookDBModel, facet)
+        await db_session.execute(
+            insert(BookFacetDBModel).from_select(
+                ["facet", "value", "count"],
+                select(literal(facet), column, func.count()).group_by(column),
+            )
+        )
@@ -0,0 +1,268 @@
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Mapping, Sequence
+from datetime import datetime
+
+from sqlalchemy import DateTime, Table, bindparam, case, delete, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.core.database import is_postgres
+from app.helper.book_file import SavedFile, get_digest, remove_file, store_file
+from app.models import Book as BookDBModel
+from app.models import BookFile as BookFileDBModel
+
+
+async def acquire_file(db_session: AsyncSession, file: SavedFile) -> str:
+    """Add one reference to a stored blob and return the path it is stored
+    under, which for content already in the store may be an older path than
+    file.path (the flat layout).
+
+    The upload is put in place only after the row is written, so a release
+    of the same content waits on it (see claim_unreferenced).
+    """
+    insert = postgresql.insert if is_postgres(db_session) else sqlite.insert
+    stmt = insert(BookFileDBModel).values(
+        path=file.path, sha256=file.sha256, size=file.size, ref_count=1
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BookFileDBModel.sha256],
+        set_={"ref_count": BookFileDBModel.ref_count + 1},
+    )
+    path = (await db_session.scalars(stmt.returning(BookFileDBModel.path))).one()
+    await run_in_threadpool(store_file, file, path)
+    return path
+
+
+async def release_file(db_session: AsyncSession, file_path: str | None) -> bool:
+    """Drop one reference to a stored file.
+
+    Returns True when nothing references the file any more, in which case the
+    caller removes it from disk once its transaction has committed.
+    """
+    return bool(await release_files(db_session, [file_path]))
+
+
+async def release_files(
+    db_session: AsyncSession, file_paths: Iterable[str | None]
+) -> list[str]:
+    """Drop one reference per occurrence of each path.
+
+    Paths losing the same number of references share one UPDATE, so a bulk
+    delete costs one statement per distinct count, usually just one. Returns
+    the paths nothing references any more.
+    """
+    released = Counter(path for path in file_paths if path)
+    by_count: defaultdict[int, list[str]] = defaultdict(list)
+    for path, count in released.items():
+        by_count[count].append(path)
+
+    remaining: dict[str, int] = {}
+    for count, paths in sorted(by_count.items()):
+        stmt = (
+            update(BookFileDBModel)
+            .where(BookFileDBModel.path.in_(paths))
+            .values(ref_count=BookFileDBModel.ref_count - count)
+            .returning(BookFileDBModel.path, BookFileDBModel.ref_count)
+        )
+        for path, ref_count in await db_session.execute(stmt):
+            remaining[path] = ref_count
+
+    # Paths without a row predate reference counting and go as well.
+    unreferenced = sorted(path for path in released if remaining.get(path, 0) <= 0)
+    if unreferenced:
+        await db_session.execute(
+            delete(BookFileDBModel).where(
+                BookFileDBModel.path.in_(unreferenced), BookFileDBModel.ref_count <= 0
+            )
+        )
+    return unreferenced
+
+
+async def claim_unreferenced(
+    db_session: AsyncSession, file_paths: Sequence[str]
+) -> list[str]:
+    """Claim released paths nothing references, for removal from disk.
+
+    A claim is a blob row without references for the path and its digest,
+    inserted unless either has a row already. Until the transaction ends, an
+    upload of the same content waits in acquire_file before putting its file
+    in place, so the claimed files can be removed safely in the meantime.
+    """
+    if not file_paths:
+        return []
+    insert = postgresql.insert if is_postgres(db_session) else sqlite.insert
+    stmt = (
+        insert(BookFileDBModel)
+        .values(
+            [
+                {"path": path, "sha256": get_digest(path), "ref_count": 0}
+                for path in sorted(set(file_paths))
+            ]
+        )
+        .on_conflict_do_nothing()
+        .returning(BookFileDBModel.path)
+    )
+    return list((await db_session.scalars(stmt)).all())
+
+
+async def remove_unreferenced(
+    db_session: AsyncSession, file_paths: Sequence[str]
+) -> list[str]:
+    """Remove released files from disk unless referenced again since, and
+    commit; returns the removed paths."""
+    claimed = await claim_unreferenced(db_session, file_paths)
+    if claimed:
+        await run_in_threadpool(_remove_files, claimed)
+        await db_session.execute(
+            delete(BookFileDBModel).where(
+                BookFileDBModel.path.in_(claimed), BookFileDBModel.ref_count <= 0
+            )
+        )
+    await db_session.commit()
+    return claimed
+
+
+def _remove_files(paths: list[str]) -> None:
+    for path in paths:
+        remove_file(path)
+
+
+async def record_downloads(
+    db_session: AsyncSession,
+    counts: Mapping[str, int],
+    last_access: Mapping[str, datetime],
+) -> None:
+    """Add downloads counted in memory to the per-file statistics."""
+    if not counts:
+        return
+    # Core rather than ORM: an ORM update with a parameter list is a bulk
+    # update by primary key, which can't increment.
+    table: Table = BookFileDBModel.metadata.tables["book_file"]
+    last = table.c.last_downloaded_at
+    accessed_at = bindparam("accessed_at", type_=DateTime(timezone=True))
+    stmt = (
+        update(table)
+        .where(table.c.path == bindparam("file_path"))
+        .values(
+            download_count=table.c.download_count + bindparam("downloads"),
+            last_downloaded_at=case(
+                (or_(last.is_(None), last < accessed_at), accessed_at), else_=last
+            ),
+        )
+    )
+    await db_session.execute(
+        stmt,
+        [
+            {"file_path": path, "downloads": count, "accessed_at": last_access[path]}
+            for path, count in sorted(counts.items())
+        ],
+    )
+
+
+async def find_cold_files(
+    db_session: AsyncSession, cutoff: datetime, after: str | None, limit: int
+) -> Sequence[str]:
+    """Paths not downloaded since `cutoff`, in path order after `after`."""
+    last = BookFileDBModel.last_downloaded_at
+    stmt = (
+        select(BookFileDBModel.path)
+        .where(or_(last.is_(None), last < cutoff))
+        .order_by(BookFileDBModel.path)
+        .limit(limit)
+    )
+    if after is not None:
+        stmt = stmt.where(BookFileDBModel.path > after)
+    return (await db_session.scalars(stmt)).all()
+
+
+async def move_files(
+    db_session: AsyncSession, moves: Sequence[tuple[str, str]]
+) -> None:
+    """Point blob rows and books at new paths, given (old, new) pairs."""
+    if not moves:
+        return
+    params = [{"old_path": old, "new_path": new} for old, new in moves]
+    for table, column in (
+        (BookFileDBModel.metadata.tables["book_file"], "path"),
+        (BookDBModel.metadata.tables["book"], "file_path"),
+    ):
+        await db_session.execute(
+            update(table)
+            .where(table.c[column] == bindparam("old_path"))
+            .values({column: bindparam("new_path")}),
+            params,
+        )
+
+
+async def tracked_paths(db_session: AsyncSession, paths: Iterable[str]) -> set[str]:
+    """The given paths that have a blob row."""
+    stmt = select(BookFileDBModel.path).where(BookFileDBModel.path.in_(list(paths)))
+    return set((await db_session.scalars(stmt)).all())
+
+
+async def adopt_files(
+    db_session: AsyncSession, files: Sequence[tuple[str, str, str, int]]
+) -> None:
+    """Move blob rows tracked by path only into the content store, given
+    (old_path, new_path, sha256, size) for each.
+
+    A row whose content is already stored under a digest, by an upload or an
+    earlier file in `files`, is folded into that row: its references are
+    added there and its books are repointed to that path.
+    """
+    if not files:
+        return
+    stmt = (
+        select(BookFileDBModel.sha256, BookFileDBModel.path)
+        .where(BookFileDBModel.sha256.in_({sha256 for _, _, sha256, _ in files}))
+        .order_by(BookFileDBModel.path)
+        .with_for_update()
+    )
+    stored: dict[str | None, str] = {
+        sha256: path for sha256, path in await db_session.execute(stmt)
+    }
+    adopted = []
+    merged = []
+    repointed = []
+    for old_path, new_path, sha256, size in files:
+        if sha256 in stored:
+            merged.append((old_path, stored[sha256]))
+            repointed.append(merged[-1])
+            continue
+        stored[sha256] = new_path
+        repointed.append((old_path, new_path))
+        adopted.append(
+            {
+                "old_path": old_path,
+                "new_path": new_path,
+                "digest": sha256,
+                "bytes": size,
+            }
+        )
+
+    table: Table = BookFileDBModel.metadata.tables["book_file"]
+    if adopted:
+        await db_session.execute(
+            update(table)
+            .where(table.c.path == bindparam("old_path"))
+            .values(
+                path=bindparam("new_path"),
+                sha256=bindparam("digest"),
+                size=bindparam("bytes"),
+            ),
+            adopted,
+        )
+    for old_path, path in merged:
+        ref_count = await db_session.scalar(
+            delete(BookFileDBModel)
+            .where(BookFileDBModel.path == old_path)
+            .returning(BookFileDBModel.ref_count)
+        )
+        if ref_count:
+            await db_session.execute(
+                update(BookFileDBModel)
+                .where(BookFileDBModel.path == path)
+                .values(ref_count=BookFileDBModel.ref_count + ref_count)
+            )
+    await move_files(db_session, repointed)
@@ -1,8 +1,40 @@
+from collections.abc import AsyncGenerator
 from typing import Annotated
 
-from fastapi import Depends
+from fastapi import Depends, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db_session
+from app.core.config import get_settings
+from app.core.database import sessionmanager
+
+READ_PRIMARY_COOKIE = "read_primary"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+async def get_db_session(
+    request: Request, response: Response
+) -> AsyncGenerator[AsyncSession, None]:
+    # After a write, pin this client's reads to the primary for a short
+    # while so it doesn't read stale data from a lagging replica.
+    if sessionmanager.has_replicas and request.method not in SAFE_METHODS:
+        response.set_cookie(
+            READ_PRIMARY_COOKIE,
+            "1",
+            max_age=get_settings().database.read_your_writes_window,
+            path="/api",
+            httponly=True,
+        )
+    async with sessionmanager.session() as session:
+        yield session
+
+
+async def get_read_db_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    use_primary = READ_PRIMARY_COOKIE in request.cookies
+    async with sessionmanager.read_session(use_primary=use_primary) as session:
+        yield session
+
 
 DBSessionDep = Annotated[AsyncSession, Depends(get_db_session)]
+ReadDBSessionDep = Annotated[AsyncSession, Depends(get_read_db_session)]
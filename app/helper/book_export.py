@@ -0,0 +1,52 @@
+import csv
+import io
+from collections.abc import AsyncIterator, Sequence
+from typing import Any, Literal
+
+from sqlalchemy import Row
+
+from app.core.database import sessionmanager
+from app.crud.book import stream_book_rows
+from app.schemas.requests import BookSearch
+from app.schemas.responses import BookResponse, render_book
+
+ExportFormat = Literal["ndjson", "csv"]
+EXPORT_BATCH_SIZE = 1000
+MEDIA_TYPES: dict[ExportFormat, str] = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _ndjson_chunk(rows: Sequence[Row[Any]]) -> str:
+    return "".join(render_book(row).decode() + "\n" for row in rows)
+
+
+def _csv_chunk(rows: Sequence[Row[Any]], header: bool) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(BookResponse.model_fields)
+    for row in rows:
+        book = BookResponse.model_validate(row, from_attributes=True)
+        writer.writerow(book.model_dump(mode="json").values())
+    return buffer.getvalue()
+
+
+async def export_books(
+    filters: BookSearch,
+    fmt: ExportFormat,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> AsyncIterator[str]:
+    # The session is opened here rather than taken from the request
+    # dependency, so it stays alive for as long as the response streams.
+    async with sessionmanager.read_session() as session:
+        first = True
+        async for rows in stream_book_rows(session, filters, batch_size):
+            if fmt == "csv":
+                yield _csv_chunk(rows, header=first)
+            else:
+                yield _ndjson_chunk(rows)
+            first = False
+        if first and fmt == "csv":
+            yield _csv_chunk([], header=True)
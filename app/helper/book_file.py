@@ -1,29 +1,354 @@
+import contextlib
+import gzip
+import hashlib
+import io
 import os
+import re
 import shutil
-from uuid import uuid4
+import tempfile
+import time
+import zlib
+from collections import Counter
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import BinaryIO
 
-from fastapi import UploadFile
+from fastapi import HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
 
-UPLOAD_DIR = "./uploaded_books"
+from app.core.config import get_settings
+from app.core.metrics import upload_bytes
+
+UPLOAD_DIR = get_settings().storage.upload_dir
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+SHA256_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+# Cold files live next to their hot path with this suffix; the database keeps
+# referring to the hot path whichever tier the file is in.
+COMPRESSED_SUFFIX = ".gz"
+# Leading bytes of formats that are already compressed.
+COMPRESSED_MAGIC = (
+    b"\x1f\x8b",  # gzip
+    b"PK\x03\x04",  # zip, epub, docx, odt
+    b"(\xb5/\xfd",  # zstd
+    b"BZh",  # bzip2
+    b"\xfd7zXZ\x00",  # xz
+    b"7z\xbc\xaf\x27\x1c",
+    b"Rar!",
+    b"\x89PNG",
+    b"\xff\xd8\xff",  # jpeg
+)
+COMPRESSION_SAMPLE_SIZE = 1024 * 1024
+# Files whose first megabyte shrinks by less than this stay uncompressed.
+MIN_COMPRESSION_SAVING = 0.1
+
+
+@dataclass(frozen=True)
+class SavedFile:
+    path: str
+    size: int
+    sha256: str
+    filename: str
+    # Written but not in the store yet: acquire_file moves it to `path`, or
+    # links it there to keep the source, once a blob row references it.
+    source: str | None = None
+    link: bool = False
+
+
+@dataclass(frozen=True)
+class StoredBlob:
+    path: str
+    compressed: bool
+    stat: os.stat_result
+
+
+@dataclass
+class AccessStats:
+    """Downloads per stored file since the last drain, kept in memory so the
+    download path never writes to the database."""
+
+    counts: Counter[str] = field(default_factory=Counter)
+    last_access: dict[str, float] = field(default_factory=dict)
+
+    def record(self, file_path: str) -> None:
+        self.counts[file_path] += 1
+        self.last_access[file_path] = time.time()
+
+    def drain(self) -> tuple[Counter[str], dict[str, float]]:
+        counts, last_access = self.counts, self.last_access
+        self.counts, self.last_access = Counter(), {}
+        return counts, last_access
+
+
+access_stats = AccessStats()
+
+
+def _write_chunk(buffer: BinaryIO, digest: "hashlib._Hash", chunk: bytes) -> None:
+    digest.update(chunk)
+    buffer.write(chunk)
+
+
+def _close(buffer: BinaryIO) -> None:
+    buffer.flush()
+    os.fsync(buffer.fileno())
+    buffer.close()
+
+
+def shard_path(upload_dir: str, digest: str) -> str:
+    return os.path.join(upload_dir, digest[:2], digest[2:4], digest)
+
+
+def store_path(sha256: str) -> str:
+    """Where content with this digest is stored."""
+    # Content still in the flat layout keeps its path until it is moved, so
+    # a blob is never stored twice.
+    flat = os.path.join(UPLOAD_DIR, sha256)
+    if os.path.exists(flat) or os.path.exists(compressed_path(flat)):
+        return flat
+    return shard_path(UPLOAD_DIR, sha256)
+
+
+def store_file(file: SavedFile, target: str) -> None:
+    """Put a saved file's content at `target` in the content store.
+
+    Only called once a blob row refers to `target`, so a release that finds
+    no row can't remove the file from under a new upload. Content already
+    there is replaced, or touched when linking, which also keeps
+    reconciliation from removing it as an old unreferenced file.
+    """
+    if file.source is None:
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    if not file.link:
+        os.replace(file.source, target)
+        return
+    try:
+        os.link(file.source, target)
+    except FileExistsError:
+        os.utime(target)
+
+
+async def save_file(file: UploadFile) -> SavedFile:
+    """Stream an upload into the content-addressed store in UPLOAD_DIR.
+
+    Chunks are hashed and written in the thread pool into a temporary file,
+    which acquire_file renames to its SHA-256 digest once a book references
+    it. Identical uploads therefore end up as the same single file, under
+    ``ab/cd/<digest>`` so no directory grows too large.
+    """
+    settings = get_settings().storage
+    if file.size is not None and file.size > settings.max_upload_size:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    fd, tmp_path = await run_in_threadpool(
+        tempfile.mkstemp, dir=UPLOAD_DIR, prefix=".upload-"
+    )
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        buffer = os.fdopen(fd, "wb")
+        try:
+            await file.seek(0)
+            while chunk := await file.read(settings.chunk_size):
+                size += len(chunk)
+                upload_bytes.inc(len(chunk))
+                if size > settings.max_upload_size:
+                    raise HTTPException(status_code=413, detail="File too large")
+                await run_in_threadpool(_write_chunk, buffer, digest, chunk)
+        finally:
+            await run_in_threadpool(_close, buffer)
+    except BaseException:
+        await run_in_threadpool(remove_file, tmp_path)
+        raise
+    sha256 = digest.hexdigest()
+    return SavedFile(
+        path=await run_in_threadpool(store_path, sha256),
+        size=size,
+        sha256=sha256,
+        filename=get_basename(file.filename or ""),
+        source=tmp_path,
+    )
+
+
+def compressed_path(file_path: str) -> str:
+    return file_path + COMPRESSED_SUFFIX
 
-def save_file(file: UploadFile) -> str:
-    file_location = os.path.join(UPLOAD_DIR, f"{uuid4()}_{file.filename}")
-    file.file.seek(0)
-    with open(file_location, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    return file_location
+
+def other_layout(file_path: str) -> str | None:
+    """Where a content-addressed file lives in the other directory layout:
+    sharded for a flat path and flat for a sharded one."""
+    digest = get_digest(file_path)
+    if digest is None:
+        return None
+    directory = os.path.dirname(file_path)
+    parent, second = os.path.split(directory)
+    root, first = os.path.split(parent)
+    if (first, second) == (digest[:2], digest[2:4]):
+        return os.path.join(root, digest)
+    return shard_path(directory, digest)
+
+
+def resolve_file(file_path: str) -> StoredBlob | None:
+    """Locate a stored file in either tier; an uncompressed copy wins.
+
+    Paths of the other directory layout are tried last, so rows read before
+    a file was moved to the sharded layout keep working.
+    """
+    if not file_path:
+        return None
+    for candidate in (file_path, other_layout(file_path)):
+        if candidate is None:
+            continue
+        for path, compressed in (
+            (candidate, False),
+            (compressed_path(candidate), True),
+        ):
+            try:
+                return StoredBlob(path, compressed, os.stat(path))
+            except FileNotFoundError:
+                continue
+    return None
 
 
 def is_file_exists(file_path: str) -> bool:
-    return bool(file_path) and os.path.exists(file_path)
+    return resolve_file(file_path) is not None
+
+
+def open_file(file_path: str) -> io.BufferedIOBase:
+    """Open a stored file for reading, decompressing it if it is cold."""
+    blob = resolve_file(file_path)
+    if blob is None:
+        raise FileNotFoundError(file_path)
+    if blob.compressed:
+        return gzip.open(blob.path, "rb")
+    return open(blob.path, "rb")
+
+
+def read_head(file_path: str, size: int) -> bytes:
+    with open_file(file_path) as file:
+        return file.read(size)
+
+
+async def iter_decompressed(path: str, chunk_size: int) -> AsyncIterator[bytes]:
+    file = await run_in_threadpool(gzip.open, path, "rb")
+    try:
+        while chunk := await run_in_threadpool(file.read, chunk_size):
+            yield chunk
+    finally:
+        await run_in_threadpool(file.close)
+
+
+def _worth_compressing(sample: bytes, level: int) -> bool:
+    if not sample or sample.startswith(COMPRESSED_MAGIC):
+        return False
+    compressed = zlib.compress(sample, level)
+    return len(compressed) <= len(sample) * (1 - MIN_COMPRESSION_SAVING)
+
+
+def _copy(source: io.BufferedIOBase, target: io.BufferedIOBase | BinaryIO) -> None:
+    shutil.copyfileobj(source, target, get_settings().storage.chunk_size)
+
+
+def _atomic_copy(
+    source: io.BufferedIOBase, target: str, mtime_ns: int, level: int | None = None
+) -> int:
+    # Written next to the target and renamed over it, so readers never see a
+    # partial file. Copying the source's mtime keeps Last-Modified stable
+    # across tier moves. A level gzips the copy. Returns the size written.
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=".tier-")
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            if level is None:
+                _copy(source, buffer)
+            else:
+                with gzip.GzipFile(
+                    fileobj=buffer, mode="wb", compresslevel=level, mtime=0
+                ) as writer:
+                    _copy(source, writer)
+            buffer.flush()
+            os.fsync(buffer.fileno())
+            size = buffer.tell()
+        os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+        os.replace(tmp_path, target)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(tmp_path)
+        raise
+    return size
+
+
+def compress_file(file_path: str, level: int) -> int:
+    """Move a hot file to the compressed tier; returns the bytes saved.
+
+    Already compressed formats, files gzip would barely shrink, and files
+    deleted or compressed by someone else meanwhile are left alone and 0 is
+    returned.
+    """
+    target = compressed_path(file_path)
+    try:
+        with open(file_path, "rb") as source:
+            stat = os.fstat(source.fileno())
+            if not _worth_compressing(source.read(COMPRESSION_SAMPLE_SIZE), level):
+                return 0
+            source.seek(0)
+            size = _atomic_copy(source, target, stat.st_mtime_ns, level)
+        os.remove(file_path)
+    except FileNotFoundError:
+        # A copy made for a file deleted meanwhile is left to reconciliation.
+        return 0
+    return stat.st_size - size
+
+
+def decompress_file(file_path: str) -> bool:
+    """Move a cold file back to the hot tier; False if it wasn't cold."""
+    source = compressed_path(file_path)
+    try:
+        stat = os.stat(source)
+        with gzip.open(source, "rb") as reader:
+            _atomic_copy(reader, file_path, stat.st_mtime_ns)
+    except FileNotFoundError:
+        return False
+    # Another worker may have restored the same file.
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(source)
+    return True
+
+
+def extract_file(file_path: str, directory: str) -> str:
+    """Decompressed copy of a stored file in `directory`; the caller removes
+    it."""
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".extract-")
+    try:
+        with os.fdopen(fd, "wb") as buffer, open_file(file_path) as reader:
+            _copy(reader, buffer)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path
 
 
 def get_basename(file_path: str) -> str:
     return os.path.basename(file_path)
 
 
+def get_digest(file_path: str) -> str | None:
+    name = get_basename(file_path)
+    return name if SHA256_PATTERN.fullmatch(name) else None
+
+
+def file_etag(file_path: str, stat_result: os.stat_result) -> str:
+    digest = get_digest(file_path)
+    if digest is None:
+        # Files stored before the content-addressed layout have no digest in
+        # their name; fall back to the same validator FileResponse would use.
+        etag_base = f"{stat_result.st_mtime}-{stat_result.st_size}"
+        digest = hashlib.md5(etag_base.encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
 def remove_file(file_path: str) -> None:
     if is_file_exists(file_path):
-        os.remove(file_path)
+        for path in (file_path, compressed_path(file_path)):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
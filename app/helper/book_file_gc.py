@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+import time
+from collections.abc import Generator, Iterator, Sequence
+from dataclasses import dataclass, field
+
+from sqlalchemy import select, union
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.database import DatabaseSessionManager
+from app.core.metrics import gc_missing_files, gc_removed_bytes, gc_removed_files
+from app.crud.book_file import remove_unreferenced
+from app.helper.book_file import (
+    COMPRESSED_SUFFIX,
+    UPLOAD_DIR,
+    is_file_exists,
+    other_layout,
+)
+from app.helper.book_preview import PREVIEW_DIR
+from app.helper.resumable_upload import expire_sessions
+from app.models import Book as BookDBModel
+from app.models import BookFile as BookFileDBModel
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_MISSING = 1000
+
+
+@dataclass
+class GcReport:
+    scanned_files: int = 0
+    removed_files: int = 0
+    removed_bytes: int = 0
+    scanned_books: int = 0
+    missing_files: int = 0
+    missing_book_ids: list[int] = field(default_factory=list)
+    removed_previews: int = 0
+    expired_uploads: int = 0
+
+
+@dataclass(frozen=True)
+class StoredFile:
+    path: str
+    mtime: float
+    size: int
+
+
+def walk_files(directory: str) -> Generator[os.DirEntry[str], None, None]:
+    """Entries under `directory`, descending into shard directories.
+
+    Hidden directories hold state owned by other jobs (resumable uploads)
+    and are skipped.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if not entry.name.startswith("."):
+                    yield from walk_files(entry.path)
+            else:
+                yield entry
+
+
+def _next_files(
+    entries: Iterator[os.DirEntry[str]], batch_size: int
+) -> tuple[list[StoredFile], bool]:
+    """Read up to batch_size directory entries; returns (files, exhausted)."""
+    files: list[StoredFile] = []
+    for _ in range(batch_size):
+        entry = next(entries, None)
+        if entry is None:
+            return files, True
+        try:
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+        except FileNotFoundError:
+            continue
+        files.append(StoredFile(entry.path, stat.st_mtime, stat.st_size))
+    return files, False
+
+
+def _remove_if_unchanged(file: StoredFile) -> bool:
+    # An upload with the same digest may have replaced the file since it was
+    # scanned; its new mtime keeps it out of the grace window.
+    try:
+        if os.stat(file.path).st_mtime != file.mtime:
+            return False
+        os.remove(file.path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def _without_source(files: list[StoredFile], upload_dir: str) -> list[StoredFile]:
+    # Derivatives are named after the digest of the file they were made from;
+    # hidden names are temporaries a render or an extraction left behind.
+    return [
+        file
+        for file in files
+        if (name := os.path.basename(file.path)).startswith(".")
+        or not is_file_exists(os.path.join(upload_dir, name.split(".", 1)[0]))
+    ]
+
+
+def _missing(rows: list[tuple[int, str]]) -> list[int]:
+    return [book_id for book_id, path in rows if not is_file_exists(path)]
+
+
+def _referenced_as(file: StoredFile) -> set[str]:
+    # Compressed files are referenced by their uncompressed path, and a file
+    # being moved between directory layouts by either path. A legacy upload
+    # may also have been stored under a name ending in the suffix.
+    paths = {file.path, file.path.removesuffix(COMPRESSED_SUFFIX)}
+    return paths | {alias for path in paths if (alias := other_layout(path))}
+
+
+async def remove_orphans(
+    manager: DatabaseSessionManager,
+    upload_dir: str,
+    grace_period: float,
+    batch_size: int,
+    dry_run: bool,
+) -> GcReport:
+    report = GcReport()
+    cutoff = time.time() - grace_period
+    entries = walk_files(upload_dir)
+    try:
+        exhausted = False
+        while not exhausted:
+            files, exhausted = await run_in_threadpool(_next_files, entries, batch_size)
+            report.scanned_files += len(files)
+            candidates = [file for file in files if file.mtime < cutoff]
+            if not candidates:
+                continue
+
+            paths = [path for file in candidates for path in _referenced_as(file)]
+            stmt = union(
+                select(BookFileDBModel.path).where(BookFileDBModel.path.in_(paths)),
+                select(BookDBModel.file_path).where(BookDBModel.file_path.in_(paths)),
+            )
+            async with manager.session() as session:
+                referenced = set((await session.scalars(stmt)).all())
+
+            for file in candidates:
+                if not referenced.isdisjoint(_referenced_as(file)):
+                    continue
+                if dry_run:
+                    logger.info("Would remove unreferenced upload %s", file.path)
+                elif await run_in_threadpool(_remove_if_unchanged, file):
+                    logger.info("Removed unreferenced upload %s", file.path)
+                else:
+                    continue
+                report.removed_files += 1
+                report.removed_bytes += file.size
+    finally:
+        await run_in_threadpool(entries.close)
+    return report
+
+
+async def remove_released_files(
+    manager: DatabaseSessionManager,
+    paths: Sequence[str],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Remove files released by a committed bulk delete, a batch at a time.
+
+    Each batch is claimed in book_file first, so content uploaded again since
+    the commit keeps its file (see claim_unreferenced).
+    """
+    removed = 0
+    for start in range(0, len(paths), batch_size):
+        async with manager.session() as session:
+            batch = paths[start : start + batch_size]
+            removed += len(await remove_unreferenced(session, batch))
+    return removed
+
+
+async def remove_stale_previews(
+    upload_dir: str, preview_dir: str, grace_period: float, dry_run: bool
+) -> int:
+    cutoff = time.time() - grace_period
+    removed = 0
+    entries = walk_files(preview_dir)
+    try:
+        exhausted = False
+        while not exhausted:
+            files, exhausted = await run_in_threadpool(
+                _next_files, entries, DEFAULT_BATCH_SIZE
+            )
+            candidates = [file for file in files if file.mtime < cutoff]
+            for file in await run_in_threadpool(
+                _without_source, candidates, upload_dir
+            ):
+                if dry_run or await run_in_threadpool(_remove_if_unchanged, file):
+                    removed += 1
+    finally:
+        await run_in_threadpool(entries.close)
+    return removed
+
+
+async def find_missing(
+    manager: DatabaseSessionManager, report: GcReport, batch_size: int
+) -> None:
+    last_id: int | None = None
+    while True:
+        stmt = (
+            select(BookDBModel.id, BookDBModel.file_path)
+            .where(BookDBModel.file_path.is_not(None), BookDBModel.file_path != "")
+            .order_by(BookDBModel.id)
+            .limit(batch_size)
+        )
+        if last_id is not None:
+            stmt = stmt.where(BookDBModel.id > last_id)
+        async with manager.session() as session:
+            rows = [(row.id, row.file_path) for row in await session.execute(stmt)]
+        if not rows:
+            return
+
+        report.scanned_books += len(rows)
+        for book_id in await run_in_threadpool(_missing, rows):
+            logger.warning("File of book %s is missing", book_id)
+            report.missing_files += 1
+            if len(report.missing_book_ids) < MAX_REPORTED_MISSING:
+                report.missing_book_ids.append(book_id)
+        last_id = rows[-1][0]
+
+
+async def reconcile_uploads(
+    manager: DatabaseSessionManager,
+    upload_dir: str = UPLOAD_DIR,
+    grace_period: float | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> GcReport:
+    """Reconcile the upload directory with the database.
+
+    Files no book or blob row refers to are removed once they are older than
+    the grace period, which also covers abandoned ``.upload-`` and ``.tier-``
+    temporaries. Compressed copies count as their uncompressed path.
+    Books whose file is gone are reported, and previews whose source file is
+    gone are removed after the same grace period. Resumable uploads idle for
+    STORAGE__RESUMABLE_TTL are discarded. Both sides are walked in batches
+    with a short transaction each, so neither is ever held in memory whole.
+    Pass the primary's manager: a lagging replica could miss new references.
+    """
+    if grace_period is None:
+        grace_period = get_settings().storage.gc_grace_period
+    report = await remove_orphans(
+        manager, upload_dir, grace_period, batch_size, dry_run
+    )
+    await find_missing(manager, report, batch_size)
+    report.removed_previews = await remove_stale_previews(
+        upload_dir, PREVIEW_DIR, grace_period, dry_run
+    )
+    if not dry_run:
+        report.expired_uploads = await run_in_threadpool(
+            expire_sessions, get_settings().storage.resumable_ttl
+        )
+
+    if not dry_run:
+        gc_removed_files.inc(report.removed_files)
+        gc_removed_bytes.inc(report.removed_bytes)
+    gc_missing_files.set(report.missing_files)
+    return report
+
+
+async def reconcile_periodically(
+    manager: DatabaseSessionManager, interval: float
+) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await reconcile_uploads(manager)
+        except Exception:
+            logger.exception("Upload reconciliation failed")
+            continue
+        logger.info(
+            "Upload reconciliation removed %d files (%d bytes), %d books miss a file",
+            report.removed_files,
+            report.removed_bytes,
+            report.missing_files,
+        )
@@ -0,0 +1,223 @@
+import gzip
+import hashlib
+import logging
+import os
+from collections.abc import Iterator
+from dataclasses import dataclass
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.database import DatabaseSessionManager
+from app.crud.book_file import adopt_files, move_files, tracked_paths
+from app.helper.book_file import COMPRESSED_SUFFIX, UPLOAD_DIR, get_digest, shard_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+@dataclass
+class ShardReport:
+    scanned_files: int = 0
+    moved_files: int = 0
+
+
+@dataclass(frozen=True)
+class Move:
+    # Files on disk, possibly compressed, and the paths rows refer to.
+    source: str
+    target: str
+    old_path: str
+    new_path: str
+    # Legacy uploads are hashed on the way; their rows get the digest.
+    sha256: str | None = None
+    size: int = 0
+
+
+@dataclass(frozen=True)
+class LegacyFile:
+    source: str
+    path: str
+    compressed: bool
+
+
+def _next_names(
+    entries: Iterator[os.DirEntry[str]], batch_size: int
+) -> tuple[list[str], bool]:
+    names: list[str] = []
+    for _ in range(batch_size):
+        entry = next(entries, None)
+        if entry is None:
+            return names, True
+        if entry.is_file(follow_symlinks=False):
+            names.append(entry.name)
+    return names, False
+
+
+def _plan(upload_dir: str, names: list[str]) -> list[Move]:
+    moves = []
+    for name in names:
+        digest = get_digest(name.removesuffix(COMPRESSED_SUFFIX))
+        if digest is None:
+            continue
+        suffix = name.removeprefix(digest)
+        new_path = shard_path(upload_dir, digest)
+        moves.append(
+            Move(
+                source=os.path.join(upload_dir, name),
+                target=new_path + suffix,
+                old_path=os.path.join(upload_dir, digest),
+                new_path=new_path,
+            )
+        )
+    return moves
+
+
+def _legacy_names(names: list[str]) -> list[str]:
+    return [
+        name
+        for name in names
+        if not name.startswith(".")
+        and get_digest(name.removesuffix(COMPRESSED_SUFFIX)) is None
+    ]
+
+
+def _referenced_as(upload_dir: str, name: str) -> list[LegacyFile]:
+    # A legacy upload is referenced by its own name or, in the compressed
+    # tier, by the name without the suffix; its own name wins.
+    source = os.path.join(upload_dir, name)
+    files = [LegacyFile(source, source, False)]
+    if name.endswith(COMPRESSED_SUFFIX):
+        files.append(LegacyFile(source, source.removesuffix(COMPRESSED_SUFFIX), True))
+    return files
+
+
+async def _find_legacy(
+    manager: DatabaseSessionManager, upload_dir: str, names: list[str]
+) -> list[LegacyFile]:
+    candidates = [_referenced_as(upload_dir, name) for name in _legacy_names(names)]
+    if not candidates:
+        return []
+    async with manager.session() as session:
+        tracked = await tracked_paths(
+            session, {file.path for files in candidates for file in files}
+        )
+    # Files no row refers to are left to upload reconciliation.
+    return [
+        file
+        for files in candidates
+        if (file := next((file for file in files if file.path in tracked), None))
+    ]
+
+
+def _hash(file: LegacyFile, upload_dir: str) -> Move | None:
+    digest = hashlib.sha256()
+    size = 0
+    chunk_size = get_settings().storage.chunk_size
+    try:
+        reader = gzip.open(file.source) if file.compressed else open(file.source, "rb")
+        with reader:
+            while chunk := reader.read(chunk_size):
+                digest.update(chunk)
+                size += len(chunk)
+    except FileNotFoundError:
+        return None
+    sha256 = digest.hexdigest()
+    new_path = shard_path(upload_dir, sha256)
+    return Move(
+        source=file.source,
+        target=new_path + (COMPRESSED_SUFFIX if file.compressed else ""),
+        old_path=file.path,
+        new_path=new_path,
+        sha256=sha256,
+        size=size,
+    )
+
+
+def _hash_all(files: list[LegacyFile], upload_dir: str) -> list[Move]:
+    return [move for file in files if (move := _hash(file, upload_dir))]
+
+
+def _link(moves: list[Move]) -> None:
+    for move in moves:
+        os.makedirs(os.path.dirname(move.target), exist_ok=True)
+        try:
+            os.link(move.source, move.target)
+        except FileExistsError:
+            # Stored there already, by an upload or an interrupted run; the
+            # content is the same either way.
+            pass
+
+
+def _unlink(moves: list[Move]) -> int:
+    moved = 0
+    for move in moves:
+        if not os.path.exists(move.target):
+            logger.warning("%s was not linked, keeping %s", move.target, move.source)
+            continue
+        try:
+            os.remove(move.source)
+        except FileNotFoundError:
+            continue
+        moved += 1
+    return moved
+
+
+async def shard_uploads(
+    manager: DatabaseSessionManager,
+    upload_dir: str = UPLOAD_DIR,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    dry_run: bool = False,
+) -> ShardReport:
+    """Move files from the flat upload directory into ``ab/cd/<digest>``.
+
+    Each batch is hard-linked into place, its blob rows and books are
+    repointed in one short transaction, and only then are the flat names
+    removed. Either path resolves to the file throughout, so the app keeps
+    serving while this runs, and it can be interrupted and rerun at any
+    point. Uploads stored as ``{uuid}_{filename}`` before the content store
+    are hashed first, and their rows get the digest; content stored twice is
+    folded into one blob. Pass the primary's manager.
+    """
+    report = ShardReport()
+    entries = await run_in_threadpool(os.scandir, upload_dir)
+    try:
+        exhausted = False
+        while not exhausted:
+            names, exhausted = await run_in_threadpool(_next_names, entries, batch_size)
+            report.scanned_files += len(names)
+            moves = _plan(upload_dir, names)
+            legacy = await _find_legacy(manager, upload_dir, names)
+            if dry_run:
+                report.moved_files += len(moves) + len(legacy)
+                continue
+            moves += await run_in_threadpool(_hash_all, legacy, upload_dir)
+            if not moves:
+                continue
+
+            await run_in_threadpool(_link, moves)
+            async with manager.session() as session:
+                await move_files(
+                    session,
+                    sorted(
+                        {
+                            (move.old_path, move.new_path)
+                            for move in moves
+                            if move.sha256 is None
+                        }
+                    ),
+                )
+                await adopt_files(
+                    session,
+                    [
+                        (move.old_path, move.new_path, move.sha256, move.size)
+                        for move in moves
+                        if move.sha256 is not None
+                    ],
+                )
+                await session.commit()
+            report.moved_files += await run_in_threadpool(_unlink, moves)
+    finally:
+        await run_in_threadpool(entries.close)
+    return report
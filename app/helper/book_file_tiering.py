@@ -0,0 +1,182 @@
+import asyncio
+import contextlib
+import fcntl
+import logging
+import os
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.config import get_settings
+from app.core.database import DatabaseSessionManager
+from app.core.metrics import (
+    tier_compressed_files,
+    tier_promoted_files,
+    tier_saved_bytes,
+)
+from app.crud.book_file import find_cold_files, record_downloads
+from app.helper.book_file import (
+    COMPRESSED_SUFFIX,
+    UPLOAD_DIR,
+    access_stats,
+    compress_file,
+    compressed_path,
+    decompress_file,
+    resolve_file,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 1000
+# In a hidden directory, which reconciliation never walks into.
+LOCK_PATH = os.path.join(UPLOAD_DIR, ".locks", "tier")
+
+
+@dataclass
+class TierReport:
+    downloaded_files: int = 0
+    promoted_files: int = 0
+    scanned_files: int = 0
+    compressed_files: int = 0
+    saved_bytes: int = 0
+    compression_skipped: bool = False
+
+
+@contextlib.contextmanager
+def _try_lock(path: str) -> Iterator[bool]:
+    """Hold an exclusive flock on `path` if no other process does; yields
+    whether it was acquired."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as file:
+        try:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+        else:
+            yield True
+
+
+def _compress_if_cold(file_path: str, cutoff: float, level: int) -> int | None:
+    """Bytes saved by compressing a cold hot-tier file, None if it was left."""
+    blob = resolve_file(file_path)
+    if blob is None or blob.compressed:
+        return None
+    if blob.stat.st_mtime >= cutoff:
+        # Uploaded recently: a re-upload of a cold file restores a hot copy,
+        # so the stale compressed one can go.
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(compressed_path(blob.path))
+        return None
+    return compress_file(blob.path, level)
+
+
+def _promote(file_path: str) -> bool:
+    blob = resolve_file(file_path)
+    if blob is None or not blob.compressed:
+        return False
+    return decompress_file(blob.path.removesuffix(COMPRESSED_SUFFIX))
+
+
+async def flush_downloads(manager: DatabaseSessionManager) -> dict[str, int]:
+    """Write this worker's download counts to the database and return them."""
+    counts, last_access = access_stats.drain()
+    async with manager.session() as session:
+        await record_downloads(
+            session,
+            counts,
+            {
+                path: datetime.fromtimestamp(timestamp, UTC)
+                for path, timestamp in last_access.items()
+            },
+        )
+        await session.commit()
+    return dict(counts)
+
+
+async def promote_files(
+    counts: dict[str, int], threshold: int, report: TierReport
+) -> None:
+    for path in sorted(path for path, count in counts.items() if count >= threshold):
+        if await run_in_threadpool(_promote, path):
+            logger.info("Restored frequently downloaded %s uncompressed", path)
+            report.promoted_files += 1
+
+
+async def compress_cold_files(
+    manager: DatabaseSessionManager,
+    cold_after: float,
+    batch_size: int,
+    report: TierReport,
+) -> None:
+    now = time.time()
+    cutoff = datetime.fromtimestamp(now - cold_after, UTC)
+    level = get_settings().storage.compression_level
+    after: str | None = None
+    while True:
+        async with manager.session() as session:
+            paths = await find_cold_files(session, cutoff, after, batch_size)
+        if not paths:
+            return
+        report.scanned_files += len(paths)
+        for path in paths:
+            saved = await run_in_threadpool(
+                _compress_if_cold, path, now - cold_after, level
+            )
+            if saved:
+                report.compressed_files += 1
+                report.saved_bytes += saved
+        after = paths[-1]
+
+
+async def tier_files(
+    manager: DatabaseSessionManager,
+    cold_after: float | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> TierReport:
+    """Move stored files between the hot and the compressed tier.
+
+    Download counts gathered in memory since the last run are flushed first;
+    compressed files downloaded often enough in that window are restored,
+    and files neither downloaded nor uploaded within `cold_after` seconds are
+    gzipped. Counts are per worker, so promotion reflects the downloads this
+    worker served. Every worker runs this job, but only one process at a
+    time compresses: the others skip that step while LOCK_PATH is held.
+    Pass the primary's manager.
+    """
+    settings = get_settings().storage
+    if cold_after is None:
+        cold_after = settings.tier_cold_after
+    report = TierReport()
+    counts = await flush_downloads(manager)
+    report.downloaded_files = len(counts)
+    await promote_files(counts, settings.tier_promote_downloads, report)
+    with _try_lock(LOCK_PATH) as locked:
+        if locked:
+            await compress_cold_files(manager, cold_after, batch_size, report)
+        else:
+            logger.info("Cold files are being compressed by another process")
+            report.compression_skipped = True
+
+    tier_compressed_files.inc(report.compressed_files)
+    tier_saved_bytes.inc(report.saved_bytes)
+    tier_promoted_files.inc(report.promoted_files)
+    return report
+
+
+async def tier_periodically(manager: DatabaseSessionManager, interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            report = await tier_files(manager)
+        except Exception:
+            logger.exception("Storage tiering failed")
+            continue
+        logger.info(
+            "Storage tiering compressed %d files (%d bytes saved), restored %d",
+            report.compressed_files,
+            report.saved_bytes,
+            report.promoted_files,
+        )
@@ -0,0 +1,121 @@
+import csv
+import itertools
+import json
+from collections.abc import Iterator
+from typing import IO, Literal
+
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+
+from app.crud.book import insert_books, list_generation
+from app.schemas.requests import BookCreate
+from app.schemas.responses import BookImportError, BookImportResponse
+
+ImportFormat = Literal["csv", "ndjson"]
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+ParsedRow = tuple[int, BookCreate | str]
+
+
+def guess_format(filename: str | None) -> ImportFormat:
+    if filename and filename.lower().endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "csv"
+
+
+def _validate(record: object) -> BookCreate | str:
+    try:
+        return BookCreate.model_validate(record)
+    except ValidationError as exc:
+        return "; ".join(
+            f"{'.'.join(map(str, error['loc'])) or 'row'}: {error['msg']}"
+            for error in exc.errors()
+        )
+
+
+def parse_rows(stream: IO[str], fmt: ImportFormat) -> Iterator[ParsedRow]:
+    """Yield (line number, BookCreate or error message) for every record."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, _validate(record)
+        return
+
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as exc:
+            yield line_no, f"row: invalid JSON ({exc.msg})"
+            continue
+        yield line_no, _validate(record)
+
+
+def _next_batch(rows: Iterator[ParsedRow], size: int) -> list[ParsedRow]:
+    return list(itertools.islice(rows, size))
+
+
+def _record_error(result: BookImportResponse, line: int, error: str) -> None:
+    result.failed += 1
+    if len(result.errors) < MAX_REPORTED_ERRORS:
+        result.errors.append(BookImportError(line=line, error=error))
+
+
+async def _insert_row_by_row(
+    db_session: AsyncSession,
+    rows: list[tuple[int, BookCreate]],
+    result: BookImportResponse,
+) -> None:
+    for line, book in rows:
+        try:
+            async with db_session.begin_nested():
+                await insert_books(db_session, [book])
+        except DBAPIError as exc:
+            _record_error(result, line, str(exc.orig))
+        else:
+            result.inserted += 1
+    await db_session.commit()
+    list_generation.bump()
+
+
+async def import_books(
+    db_session: AsyncSession,
+    stream: IO[str],
+    fmt: ImportFormat,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> BookImportResponse:
+    """Stream records from `stream` into the book table in batches.
+
+    Parsing runs in the thread pool one batch at a time, so memory stays
+    bounded by `batch_size` whatever the input size. Each batch is one
+    multi-row INSERT and one commit; if the database rejects a batch it is
+    retried row by row so only the offending rows are reported.
+    """
+    result = BookImportResponse()
+    rows = parse_rows(stream, fmt)
+    while batch := await run_in_threadpool(_next_batch, rows, batch_size):
+        valid: list[tuple[int, BookCreate]] = []
+        for line, row in batch:
+            if isinstance(row, BookCreate):
+                valid.append((line, row))
+            else:
+                _record_error(result, line, row)
+        if not valid:
+            continue
+
+        try:
+            await insert_books(db_session, [book for _, book in valid])
+            await db_session.commit()
+        except DBAPIError:
+            await db_session.rollback()
+            await _insert_row_by_row(db_session, valid, result)
+        else:
+            # Only after the commit, or a concurrent read could cache the
+            # listing from before the batch under the new generation.
+            list_generation.bump()
+            result.inserted += len(valid)
+    return result
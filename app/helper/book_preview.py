@@ -0,0 +1,129 @@
+import asyncio
+import logging
+import mimetypes
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+from starlette.concurrency import run_in_threadpool
+
+from app.core.cache import MISSING, MemoryCache
+from app.core.config import get_settings
+from app.helper.book_file import extract_file, get_digest, read_head, resolve_file
+from app.helper.pdf_render import PDF_MAGIC, RenderError, render_derivatives
+
+logger = logging.getLogger(__name__)
+
+PREVIEW_DIR = get_settings().storage.preview_dir
+os.makedirs(PREVIEW_DIR, exist_ok=True)
+
+_inflight: dict[str, "asyncio.Future[bool]"] = {}
+# Digests of files that are not PDFs or that can't be rendered (unparsable,
+# encrypted or empty), skipped by this worker for a while. Other failures (a
+# broken pool, a full disk) are retried on the next request.
+_unrenderable = MemoryCache(max_size=10_000, ttl=3600)
+
+
+def preview_path(digest: str) -> str:
+    return os.path.join(PREVIEW_DIR, f"{digest}.pdf")
+
+
+def thumbnail_path(digest: str) -> str:
+    return os.path.join(PREVIEW_DIR, f"{digest}.png")
+
+
+def is_pdf(path: str) -> bool:
+    return read_head(path, len(PDF_MAGIC)) == PDF_MAGIC
+
+
+def guess_media_type(path: str, filename: str | None = None) -> str:
+    if is_pdf(path):
+        return "application/pdf"
+    media_type, _ = mimetypes.guess_type(filename or path)
+    return media_type or "application/octet-stream"
+
+
+@lru_cache(maxsize=1)
+def get_pool() -> ProcessPoolExecutor:
+    # Spawned rather than forked: forking a process running an event loop
+    # and thread pools is not safe.
+    return ProcessPoolExecutor(
+        max_workers=get_settings().storage.preview_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def shutdown_pool() -> None:
+    if get_pool.cache_info().currsize:
+        get_pool().shutdown(cancel_futures=True)
+        get_pool.cache_clear()
+
+
+async def _generate(source: str, digest: str) -> bool:
+    if not await run_in_threadpool(is_pdf, source):
+        await _unrenderable.set(digest, True)
+        return False
+
+    blob = await run_in_threadpool(resolve_file, source)
+    if blob is None:
+        return False
+    # The renderers need a plain file; cold sources are decompressed first.
+    if blob.compressed:
+        render_source = await run_in_threadpool(extract_file, source, PREVIEW_DIR)
+    else:
+        render_source = blob.path
+    settings = get_settings().storage
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            get_pool(),
+            render_derivatives,
+            render_source,
+            preview_path(digest),
+            thumbnail_path(digest),
+            settings.preview_pages,
+            settings.thumbnail_width,
+        )
+    except RenderError:
+        logger.warning("Can't render a preview of %s", source, exc_info=True)
+        await _unrenderable.set(digest, True)
+        return False
+    except Exception:
+        logger.exception("Rendering the preview of %s failed", source)
+        return False
+    finally:
+        if blob.compressed:
+            await run_in_threadpool(os.remove, render_source)
+    return True
+
+
+async def ensure_preview(source: str) -> str | None:
+    """Digest of a stored PDF whose preview exists, rendering it if needed.
+
+    Concurrent calls for the same file share one rendering. Returns None for
+    files that can't have a preview: non-PDFs, broken PDFs and files stored
+    without a digest in their name.
+    """
+    digest = get_digest(source)
+    if digest is None or await _unrenderable.get(digest) is not MISSING:
+        return None
+    if await run_in_threadpool(os.path.exists, preview_path(digest)):
+        return digest
+
+    future = _inflight.get(digest)
+    if future is None:
+        future = asyncio.ensure_future(_generate(source, digest))
+        _inflight[digest] = future
+        future.add_done_callback(lambda _: _inflight.pop(digest, None))
+    # Shielded so a client disconnect doesn't cancel it for the others.
+    return digest if await asyncio.shield(future) else None
+
+
+async def ensure_thumbnail(source: str) -> str | None:
+    digest = await ensure_preview(source)
+    if digest is None or not await run_in_threadpool(
+        os.path.exists, thumbnail_path(digest)
+    ):
+        return None
+    return thumbnail_path(digest)
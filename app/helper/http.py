@@ -0,0 +1,120 @@
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+from app.core.config import get_settings
+from app.helper.book_file import file_etag, iter_decompressed, resolve_file
+
+
+def is_not_modified(headers: Headers, etag: str, last_modified: str) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in tags or etag.removeprefix("W/") in tags
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(
+                if_modified_since
+            )
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def accepts_gzip(headers: Headers) -> bool:
+    for coding in headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "x-gzip"):
+            continue
+        quality = params.strip().lower().removeprefix("q=")
+        try:
+            return not params.strip() or float(quality) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def content_disposition(filename: str) -> str:
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def offload_headers(path: str) -> dict[str, str] | None:
+    """Headers handing `path` to the reverse proxy, None to serve it here."""
+    settings = get_settings().storage
+    if settings.offload == "none":
+        return None
+    absolute = os.path.abspath(path)
+    if settings.offload == "x-sendfile":
+        return {"x-sendfile": absolute}
+    relative = os.path.relpath(absolute, os.path.abspath(settings.offload_root))
+    if relative.startswith(os.pardir):
+        return None
+    location = settings.offload_prefix.rstrip("/") + "/" + quote(relative)
+    return {"x-accel-redirect": location}
+
+
+async def conditional_file_response(
+    request: Request,
+    path: str,
+    media_type: str,
+    filename: str | None = None,
+) -> Response:
+    """Serve a stored file with validators, 304s and Range support.
+
+    FileResponse already answers Range and If-Range requests (including
+    multipart/byteranges); this adds the strong ETag derived from the stored
+    digest and the If-None-Match / If-Modified-Since short-circuit.
+
+    A file in the compressed tier goes out as stored, with Content-Encoding:
+    gzip, to clients that accept it and don't ask for a range; everyone else
+    gets it decompressed on the fly, whole. Uncompressed files are handed to
+    the reverse proxy when STORAGE__OFFLOAD is set.
+    """
+    blob = await run_in_threadpool(resolve_file, path)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    etag = file_etag(path, blob.stat)
+    last_modified = formatdate(blob.stat.st_mtime, usegmt=True)
+    headers = {"etag": etag, "last-modified": last_modified}
+    encoded = False
+    if blob.compressed:
+        encoded = accepts_gzip(request.headers) and "range" not in request.headers
+        if encoded:
+            headers["etag"] = etag = etag.removesuffix('"') + '-gzip"'
+        headers |= {"vary": "accept-encoding", "accept-ranges": "none"}
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    if blob.compressed and not encoded:
+        if filename is not None:
+            headers["content-disposition"] = content_disposition(filename)
+        return StreamingResponse(
+            iter_decompressed(blob.path, get_settings().storage.chunk_size),
+            media_type=media_type,
+            headers=headers,
+        )
+    if encoded:
+        headers["content-encoding"] = "gzip"
+    elif (offload := offload_headers(blob.path)) is not None:
+        # The proxy answers Range requests itself and sets its own length.
+        if filename is not None:
+            headers["content-disposition"] = content_disposition(filename)
+        return Response(media_type=media_type, headers=headers | offload)
+    return FileResponse(
+        path=blob.path,
+        filename=filename,
+        media_type=media_type,
+        headers=headers,
+        stat_result=blob.stat,
+    )
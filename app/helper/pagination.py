@@ -0,0 +1,28 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    if isinstance(value, date):
+        value = value.isoformat()
+    payload = json.dumps([sort, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple[Any, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort == "date_published":
+            value = date.fromisoformat(value)
+    except (binascii.Error, TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if cursor_sort != sort or not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return value, last_id
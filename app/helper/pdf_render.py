@@ -0,0 +1,50 @@
+"""Derivative rendering, run in worker processes.
+
+Kept free of app imports so spawned workers start quickly.
+"""
+
+import os
+import tempfile
+
+import pymupdf
+
+PDF_MAGIC = b"%PDF-"
+
+
+class RenderError(Exception):
+    """The file can't be rendered, however often it is tried: pymupdf can't
+    parse it, it is encrypted or it has no pages."""
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".render-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def render_derivatives(
+    source: str, preview: str, thumbnail: str, pages: int, width: int
+) -> None:
+    """Write the first `pages` pages of `source` to `preview` and a `width`
+    pixels wide PNG of page one to `thumbnail`."""
+    try:
+        document = pymupdf.open(source)
+    except pymupdf.FileDataError as exc:
+        raise RenderError(str(exc)) from None
+    with document:
+        if document.needs_pass:
+            raise RenderError(f"{source} is encrypted")
+        if not len(document):
+            raise RenderError(f"{source} has no pages")
+        with pymupdf.open() as excerpt:
+            excerpt.insert_pdf(document, to_page=min(pages, len(document)) - 1)
+            _atomic_write(preview, excerpt.tobytes(garbage=3, deflate=True))
+        page = document[0]
+        zoom = width / page.rect.width
+        pixmap = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom))
+        _atomic_write(thumbnail, pixmap.tobytes("png"))
@@ -0,0 +1,239 @@
+"""Resumable uploads, after the tus protocol.
+
+A session is a data file in PARTIAL_DIR that chunks are appended to, plus a
+JSON sidecar with the announced length and file name. The data file's size
+is the offset to resume from and its mtime the last activity, so nothing
+else has to be kept in step with the bytes on disk.
+"""
+
+import base64
+import binascii
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+
+from app.core.config import get_settings
+from app.core.metrics import upload_bytes
+from app.helper.book_file import UPLOAD_DIR, SavedFile, get_basename, store_path
+
+# Inside UPLOAD_DIR so finished uploads are linked, not copied, into the
+# store; reconciliation leaves hidden directories alone.
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, ".partial")
+os.makedirs(PARTIAL_DIR, exist_ok=True)
+
+UPLOAD_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+METADATA_SUFFIX = ".json"
+
+
+@dataclass(frozen=True)
+class UploadSession:
+    id: str
+    length: int
+    filename: str
+    offset: int
+    expires_at: float
+
+
+def parse_metadata(header: str | None) -> dict[str, str]:
+    """Decode an Upload-Metadata header: comma-separated `key base64value`."""
+    metadata: dict[str, str] = {}
+    for pair in (header or "").split(","):
+        key, _, value = pair.strip().partition(" ")
+        if not key:
+            continue
+        try:
+            metadata[key] = base64.b64decode(value, validate=True).decode()
+        except (binascii.Error, UnicodeDecodeError):
+            raise HTTPException(status_code=400, detail="Invalid Upload-Metadata")
+    return metadata
+
+
+def _data_path(upload_id: str) -> str:
+    return os.path.join(PARTIAL_DIR, upload_id)
+
+
+def _read_session(upload_id: str) -> UploadSession | None:
+    if not UPLOAD_ID_PATTERN.fullmatch(upload_id):
+        return None
+    path = _data_path(upload_id)
+    try:
+        with open(path + METADATA_SUFFIX, encoding="utf-8") as file:
+            metadata = json.load(file)
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    expires_at = stat.st_mtime + get_settings().storage.resumable_ttl
+    if expires_at <= time.time():
+        return None
+    return UploadSession(
+        id=upload_id,
+        length=metadata["length"],
+        filename=metadata["filename"],
+        offset=stat.st_size,
+        expires_at=expires_at,
+    )
+
+
+async def get_session(upload_id: str) -> UploadSession:
+    session = await run_in_threadpool(_read_session, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return session
+
+
+def _create(upload_id: str, length: int, filename: str) -> None:
+    path = _data_path(upload_id)
+    with open(path + METADATA_SUFFIX, "x", encoding="utf-8") as file:
+        json.dump({"length": length, "filename": filename}, file)
+    open(path, "xb").close()
+
+
+async def create_session(length: int, filename: str) -> UploadSession:
+    if length > get_settings().storage.max_upload_size:
+        raise HTTPException(status_code=413, detail="File too large")
+    upload_id = uuid.uuid4().hex
+    await run_in_threadpool(_create, upload_id, length, get_basename(filename))
+    return await get_session(upload_id)
+
+
+def _open_locked(upload_id: str) -> BinaryIO:
+    # The lock keeps a second PATCH, or a finalize, from interleaving with
+    # a running append, in this worker or any other. No O_CREAT: a session
+    # finished or cancelled since it was looked up must not come back empty.
+    path = _data_path(upload_id)
+    try:
+        file = os.fdopen(os.open(path, os.O_WRONLY | os.O_APPEND), "ab")
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    try:
+        fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        file.close()
+        raise HTTPException(status_code=409, detail="Upload is busy")
+    # The previous holder may have finished or cancelled the session while
+    # this one waited to open; the sidecar is removed last.
+    if not os.path.exists(path + METADATA_SUFFIX):
+        file.close()
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return file
+
+
+def _close(file: BinaryIO) -> None:
+    file.flush()
+    os.fsync(file.fileno())
+    file.close()
+
+
+async def append_chunks(
+    upload_id: str, offset: int, chunks: AsyncIterator[bytes]
+) -> UploadSession:
+    """Append a request body to an upload starting at `offset`.
+
+    Bytes are written as they arrive; when the client drops mid-request what
+    arrived so far is kept and the next HEAD reports it.
+    """
+    session = await get_session(upload_id)
+    file = await run_in_threadpool(_open_locked, upload_id)
+    try:
+        size = os.fstat(file.fileno()).st_size
+        if offset != size:
+            raise HTTPException(status_code=409, detail="Upload-Offset mismatch")
+        with contextlib.suppress(ClientDisconnect):
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > session.length:
+                    raise HTTPException(
+                        status_code=413, detail="Chunk exceeds Upload-Length"
+                    )
+                upload_bytes.inc(len(chunk))
+                await run_in_threadpool(file.write, chunk)
+    finally:
+        await run_in_threadpool(_close, file)
+    return await get_session(upload_id)
+
+
+def _remove(upload_id: str) -> None:
+    path = _data_path(upload_id)
+    for leftover in (path, path + METADATA_SUFFIX):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(leftover)
+
+
+async def cancel_session(upload_id: str) -> None:
+    await get_session(upload_id)
+    file = await run_in_threadpool(_open_locked, upload_id)
+    try:
+        await run_in_threadpool(_remove, upload_id)
+    finally:
+        await run_in_threadpool(file.close)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while chunk := file.read(get_settings().storage.chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def finish_upload(upload_id: str) -> SavedFile:
+    """Check a complete upload and describe it for acquire_file, which links
+    it into the content store.
+
+    The session stays until discard_session, which the caller runs once the
+    book is committed, so a request that fails can be retried.
+    """
+    session = await get_session(upload_id)
+    if session.offset != session.length:
+        raise HTTPException(status_code=409, detail="Upload is incomplete")
+    file = await run_in_threadpool(_open_locked, upload_id)
+    try:
+        if os.fstat(file.fileno()).st_size != session.length:
+            raise HTTPException(status_code=409, detail="Upload is incomplete")
+        sha256 = await run_in_threadpool(_sha256, _data_path(upload_id))
+    finally:
+        await run_in_threadpool(file.close)
+    return SavedFile(
+        path=await run_in_threadpool(store_path, sha256),
+        size=session.length,
+        sha256=sha256,
+        filename=session.filename,
+        source=_data_path(upload_id),
+        link=True,
+    )
+
+
+async def discard_session(upload_id: str) -> None:
+    """Remove a finished session once its file is referenced."""
+    await run_in_threadpool(_remove, upload_id)
+
+
+def expire_sessions(ttl: float) -> int:
+    """Remove sessions idle for longer than `ttl` seconds; returns how many."""
+    cutoff = time.time() - ttl
+    expired = 0
+    with os.scandir(PARTIAL_DIR) as entries:
+        for entry in entries:
+            upload_id = entry.name.removesuffix(METADATA_SUFFIX)
+            with contextlib.suppress(FileNotFoundError):
+                if entry.stat().st_mtime >= cutoff:
+                    continue
+                if entry.name == upload_id:
+                    _remove(upload_id)
+                    expired += 1
+                elif not os.path.exists(_data_path(upload_id)):
+                    # Left behind by a crash while the session was created.
+                    os.remove(entry.path)
+    return expired
@@ -1,11 +1,49 @@
+import asyncio
+import contextlib
+from collections.abc import AsyncIterator
+
 import uvicorn
 from fastapi import FastAPI
 
 from app.api.routers.books import router as users_router
+from app.api.routers.metrics import router as metrics_router
+from app.api.routers.system import router as system_router
+from app.api.routers.uploads import router as uploads_router
+from app.core.config import get_settings
+from app.core.database import sessionmanager
+from app.core.metrics import MetricsMiddleware
+from app.helper.book_file_gc import reconcile_periodically
+from app.helper.book_file_tiering import tier_periodically
+from app.helper.book_preview import shutdown_pool
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    settings = get_settings().storage
+    jobs = [
+        (reconcile_periodically, settings.gc_interval),
+        (tier_periodically, settings.tier_interval),
+    ]
+    tasks = [
+        asyncio.create_task(job(sessionmanager, interval))
+        for job, interval in jobs
+        if interval > 0
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    shutdown_pool()
+
 
-app = FastAPI(title="Library", docs_url="/api/docs")
+app = FastAPI(title="Library", docs_url="/api/docs", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(users_router)
+app.include_router(uploads_router)
+app.include_router(system_router)
+app.include_router(metrics_router)
 
 
 if __name__ == "__main__":
@@ -2,5 +2,7 @@
 from app.core.database import Base
 
 from .book import Book
+from .book_facet import BookFacet
+from .book_file import BookFile
 
-__all__ = ["Base", "Book"]
+__all__ = ["Base", "Book", "BookFacet", "BookFile"]
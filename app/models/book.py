@@ -1,6 +1,6 @@
 from datetime import date
 
-from sqlalchemy import BigInteger, Date, String
+from sqlalchemy import BigInteger, Date, Index, Integer, String
 from sqlalchemy.orm import Mapped, mapped_column
 
 from . import Base
@@ -8,9 +8,24 @@ from . import Base
 
 class Book(Base):
     __tablename__ = "book"
+    __table_args__ = (
+        Index("ix_book_name_id", "name", "id"),
+        Index("ix_book_author_id", "author", "id"),
+        Index("ix_book_date_published_id", "date_published", "id"),
+        *(
+            Index(
+                f"ix_book_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+            )
+            for column in ("name", "author", "genre")
+        ),
+    )
 
     id: Mapped[int] = mapped_column(
-        BigInteger,
+        # SQLite only autoincrements INTEGER PRIMARY KEY columns.
+        BigInteger().with_variant(Integer, "sqlite"),
         primary_key=True,
     )
     name: Mapped[str] = mapped_column(
@@ -36,3 +51,7 @@ class Book(Base):
         String,
         nullable=True,
     )
+    file_name: Mapped[str | None] = mapped_column(
+        String,
+        nullable=True,
+    )
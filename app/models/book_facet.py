@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Index, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class BookFacet(Base):
+    """Number of books per genre or author, kept current by every write."""
+
+    __tablename__ = "book_facet"
+    __table_args__ = (Index("ix_book_facet_facet_count", "facet", "count"),)
+
+    facet: Mapped[str] = mapped_column(
+        String(16),
+        primary_key=True,
+    )
+    value: Mapped[str] = mapped_column(
+        String,
+        primary_key=True,
+    )
+    count: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+    )
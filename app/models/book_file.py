@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import BigInteger, DateTime, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from . import Base
+
+
+class BookFile(Base):
+    __tablename__ = "book_file"
+
+    path: Mapped[str] = mapped_column(
+        String,
+        primary_key=True,
+    )
+    sha256: Mapped[str | None] = mapped_column(
+        String(64),
+        nullable=True,
+        unique=True,
+    )
+    size: Mapped[int | None] = mapped_column(
+        BigInteger,
+        nullable=True,
+    )
+    ref_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+    )
+    download_count: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        server_default="0",
+    )
+    last_downloaded_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+    )
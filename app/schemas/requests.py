@@ -1,20 +1,34 @@
 from datetime import date
-from typing import Annotated, Any
+from typing import Annotated, Any, Literal
 
 from fastapi import Form, Query
 from fastapi.exceptions import RequestValidationError
-from pydantic import BaseModel, field_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 
+BookSort = Literal["id", "name", "author", "date_published"]
+CountMode = Literal["exact", "estimated"]
+BulkIds = Annotated[list[int], Field(min_length=1, max_length=10_000)]
 
-class BookFilter(BaseModel):
+
+class BookSearch(BaseModel):
     name: str | None = None
     author: str | None = None
     genre: str | None = None
     date_published: date | None = None
+    q: str | None = None
+
+
+class BookFilter(BookSearch):
+    sort: BookSort = "id"
+    cursor: str | None = None
     limit: Annotated[int, Query(ge=1, le=100)] = 100
     offset: Annotated[int, Query(ge=0)] = 0
 
 
+class BookBatchRequest(BaseModel):
+    ids: Annotated[list[int], Field(min_length=1, max_length=500)]
+
+
 class BookCreate(BaseModel):
     name: str
     author: str
@@ -69,3 +83,37 @@ class BookUpdate(BaseModel):
             genre=genre,
             date_published=date_published,
         )
+
+
+class BookMatch(BaseModel):
+    """Exact field values; unlike BookSearch there is no fuzzy matching."""
+
+    model_config = {"extra": "forbid"}
+
+    name: str | None = None
+    author: str | None = None
+    genre: str | None = None
+    date_published: date | None = None
+
+
+class BookBulkUpdate(BaseModel):
+    """Patch applied to every book in `ids`, or to every book matching `filter`."""
+
+    ids: BulkIds | None = None
+    filter: BookMatch | None = None
+    update: BookUpdate
+
+    @model_validator(mode="after")
+    def check_target(self) -> "BookBulkUpdate":
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Exactly one of ids or filter is required")
+        # An empty filter would match the whole table.
+        if self.filter is not None and not any(self.filter.model_dump().values()):
+            raise ValueError("filter must set at least one field")
+        if not any(self.update.model_dump().values()):
+            raise ValueError("update must set at least one field")
+        return self
+
+
+class BookBulkDelete(BaseModel):
+    ids: BulkIds
@@ -1,6 +1,9 @@
-from datetime import datetime
+from collections.abc import Iterable
+from datetime import date, datetime, time
+from typing import Any
 
 from pydantic import BaseModel
+from pydantic_core import to_json
 
 
 class BookResponse(BaseModel):
@@ -11,3 +14,63 @@ class BookResponse(BaseModel):
     author: str
     genre: str
     date_published: datetime
+
+
+def book_payload(row: Any) -> dict[str, Any]:
+    """Build the BookResponse JSON shape from a row without validating a model.
+
+    date_published is widened to midnight the way BookResponse coerces it.
+    """
+    published = row.date_published
+    if not isinstance(published, datetime) and isinstance(published, date):
+        published = datetime.combine(published, time.min)
+    return {
+        "id": row.id,
+        "name": row.name,
+        "author": row.author,
+        "genre": row.genre,
+        "date_published": published,
+    }
+
+
+def render_book(row: Any) -> bytes:
+    return to_json(book_payload(row))
+
+
+def render_books(rows: Iterable[Any]) -> bytes:
+    return to_json([book_payload(row) for row in rows])
+
+
+def render_batch(rows: Iterable[Any], missing: list[int]) -> bytes:
+    return to_json({"books": [book_payload(row) for row in rows], "missing": missing})
+
+
+class BookBatchResponse(BaseModel):
+    books: list[BookResponse]
+    missing: list[int]
+
+
+class BookBulkResponse(BaseModel):
+    count: int
+    ids: list[int]
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class BookFacetsResponse(BaseModel):
+    genre: list[FacetCount]
+    author: list[FacetCount]
+
+
+class BookImportError(BaseModel):
+    line: int
+    error: str
+
+
+class BookImportResponse(BaseModel):
+    inserted: int = 0
+    failed: int = 0
+    errors: list[BookImportError] = []
@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+from pydantic import ValidationError
+
+from app.core.config import get_settings
+
+# Uploads made by the create scenario go to a scratch directory unless one is
+# configured explicitly; this has to happen before the settings are cached.
+SCRATCH_UPLOAD_DIR = None
+if "STORAGE__UPLOAD_DIR" not in os.environ:
+    SCRATCH_UPLOAD_DIR = tempfile.mkdtemp(prefix="bench-uploads-")
+    os.environ["STORAGE__UPLOAD_DIR"] = SCRATCH_UPLOAD_DIR
+
+try:
+    get_settings()
+except ValidationError:
+    # SQLite runs need no Postgres credentials.
+    os.environ["DATABASE__PASSWORD"] = ""
+    get_settings.cache_clear()
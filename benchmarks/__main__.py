@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import shutil
+import sys
+import tempfile
+from collections.abc import AsyncIterator
+from pathlib import Path
+from typing import Any
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from sqlalchemy.engine.url import URL
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import DatabaseSessionManager, sessionmanager
+from app.dependencies.core import get_db_session, get_read_db_session
+from app.main import app
+from benchmarks import SCRATCH_UPLOAD_DIR
+from benchmarks.load import SCENARIOS, Context, run_scenario
+from benchmarks.micro import MICRO_BENCHMARKS, run_micro
+from benchmarks.seed import create_schema, id_range, seed_catalog
+
+METRICS = ("throughput", "p50_ms", "p95_ms", "p99_ms")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    names = [scenario.name for scenario in SCENARIOS] + list(MICRO_BENCHMARKS)
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Seed a synthetic catalog and benchmark the books API.",
+    )
+    parser.add_argument("--database", choices=["sqlite", "postgres"], default="sqlite")
+    parser.add_argument(
+        "--sqlite-path",
+        default=str(Path(tempfile.gettempdir()) / "library-bench.sqlite3"),
+        help="reused between runs, so a large catalog is only seeded once",
+    )
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--seed-batch-size", type=int, default=10_000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--file-size", type=int, default=64 * 1024)
+    parser.add_argument(
+        "--only", nargs="+", choices=names, metavar="NAME", help=", ".join(names)
+    )
+    parser.add_argument("--baseline", type=Path, help="JSON baseline to compare with")
+    parser.add_argument(
+        "--save-baseline", type=Path, help="write this run's results as a baseline"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed relative throughput drop or p95 increase (default 0.2)",
+    )
+    return parser
+
+
+def use_sqlite(path: str) -> DatabaseSessionManager:
+    manager = DatabaseSessionManager(
+        URL.create(drivername="sqlite+aiosqlite", database=path),
+        {"connect_args": {"timeout": 30}},
+    )
+
+    async def session() -> AsyncIterator[AsyncSession]:
+        async with manager.session() as db_session:
+            yield db_session
+
+    app.dependency_overrides[get_db_session] = session
+    app.dependency_overrides[get_read_db_session] = session
+    return manager
+
+
+def regressions(
+    results: dict[str, dict[str, float]],
+    baseline: dict[str, dict[str, float]],
+    threshold: float,
+) -> list[str]:
+    found = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result["throughput"] < base["throughput"] * (1 - threshold):
+            found.append(
+                f"{name}: throughput {result['throughput']}/s "
+                f"vs baseline {base['throughput']}/s"
+            )
+        if result["p95_ms"] > base["p95_ms"] * (1 + threshold):
+            found.append(
+                f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']} ms"
+            )
+    return found
+
+
+def print_row(name: str, result: dict[str, float]) -> None:
+    errors = result.get("errors", "")
+    print(
+        f"{name:<20}{result['throughput']:>12,.1f}"
+        + "".join(f"{result[metric]:>10.3f}" for metric in METRICS[1:])
+        + f"{errors:>8}",
+        flush=True,
+    )
+
+
+async def benchmark(args: argparse.Namespace) -> dict[str, dict[str, float]]:
+    if args.database == "sqlite":
+        manager = use_sqlite(args.sqlite_path)
+        await create_schema(manager)
+        async with manager.connect() as connection:
+            await connection.execute(text("PRAGMA journal_mode=WAL"))
+    else:
+        manager = sessionmanager
+
+    try:
+        await seed_catalog(manager, args.rows, args.seed_batch_size)
+        first_id, last_id = await id_range(manager)
+        ctx = Context(
+            rows=args.rows,
+            first_id=first_id,
+            last_id=last_id,
+            file_size=args.file_size,
+        )
+
+        print(f"{'':<20}{'req/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        results: dict[str, dict[str, float]] = {}
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario in SCENARIOS:
+                if args.only and scenario.name not in args.only:
+                    continue
+                result = await run_scenario(
+                    client, scenario, ctx, args.requests, args.concurrency
+                )
+                if result.requests:
+                    results[scenario.name] = result.summary()
+                    print_row(scenario.name, results[scenario.name])
+
+        for name in MICRO_BENCHMARKS:
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_micro(name)
+            print_row(name, results[name])
+        return results
+    finally:
+        app.dependency_overrides.clear()
+        if manager is not sessionmanager:
+            await manager.close()
+        await sessionmanager.close()
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        results = asyncio.run(benchmark(args))
+    finally:
+        if SCRATCH_UPLOAD_DIR:
+            shutil.rmtree(SCRATCH_UPLOAD_DIR, ignore_errors=True)
+
+    report: dict[str, Any] = {
+        "settings": {
+            "database": args.database,
+            "rows": args.rows,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["settings"] != report["settings"]:
+            print(f"warning: baseline was recorded with {baseline['settings']}")
+        found = regressions(results, baseline["results"], args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+    errors = sum(result.get("errors", 0) for result in results.values())
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
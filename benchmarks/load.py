@@ -0,0 +1,184 @@
+import asyncio
+import os
+import random
+import statistics
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any
+
+from httpx import AsyncClient, Response
+
+from benchmarks.seed import ADJECTIVES, GENRES, NOUNS, author_count, catalog_row
+
+
+@dataclass
+class Context:
+    """State shared by the scenarios of one run."""
+
+    rows: int
+    first_id: int
+    last_id: int
+    file_size: int
+    rng: random.Random = field(default_factory=lambda: random.Random(42))
+    created: list[int] = field(default_factory=list)
+
+    def book_id(self) -> int:
+        return self.rng.randint(self.first_id, self.last_id)
+
+    def created_id(self) -> int:
+        return self.rng.choice(self.created)
+
+
+@dataclass
+class Scenario:
+    name: str
+    request: Callable[[AsyncClient, Context], Awaitable[Response]]
+    ok_statuses: frozenset[int] = frozenset({200})
+
+
+@dataclass
+class Result:
+    requests: int
+    errors: int
+    elapsed: float
+    latencies: list[float]
+
+    def summary(self) -> dict[str, float]:
+        return summarize(self.latencies, self.requests / self.elapsed) | {
+            "requests": self.requests,
+            "errors": self.errors,
+        }
+
+
+def summarize(latencies: list[float], throughput: float) -> dict[str, float]:
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return {
+        "throughput": round(throughput, 1),
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "p99_ms": round(p99 * 1000, 3),
+    }
+
+
+def list_request(
+    params: Callable[[Context], dict[str, Any]],
+) -> Callable[[AsyncClient, Context], Awaitable[Response]]:
+    async def request(client: AsyncClient, ctx: Context) -> Response:
+        return await client.get("/api/books", params={"limit": 20, **params(ctx)})
+
+    return request
+
+
+async def get_book(client: AsyncClient, ctx: Context) -> Response:
+    return await client.get(f"/api/books/{ctx.book_id()}")
+
+
+async def facets(client: AsyncClient, ctx: Context) -> Response:
+    return await client.get("/api/books/facets")
+
+
+async def create_book(client: AsyncClient, ctx: Context) -> Response:
+    response = await client.post(
+        "/api/books",
+        data={
+            "name": "Benchmark upload",
+            "author": "Benchmark",
+            "genre": "Benchmark",
+            "date_published": "2024-01-01",
+        },
+        # Random bytes, so every upload is a new blob rather than a dedup hit.
+        files={"file": ("bench.pdf", os.urandom(ctx.file_size), "application/pdf")},
+    )
+    if response.status_code == HTTPStatus.OK:
+        ctx.created.append(response.json()["id"])
+    return response
+
+
+async def download_book(client: AsyncClient, ctx: Context) -> Response:
+    return await client.get(f"/api/books/{ctx.created_id()}/download")
+
+
+async def delete_book(client: AsyncClient, ctx: Context) -> Response:
+    return await client.delete(f"/api/books/{ctx.created.pop()}")
+
+
+def random_date(ctx: Context) -> str:
+    return catalog_row(ctx.rng.randrange(ctx.rows), ctx.rows)[3].isoformat()
+
+
+SCENARIOS = [
+    Scenario("get_book", get_book),
+    Scenario("list", list_request(lambda ctx: {})),
+    Scenario(
+        "list_name",
+        list_request(lambda ctx: {"name": ctx.rng.choice(NOUNS)}),
+        frozenset({200, 404}),
+    ),
+    Scenario(
+        "list_author",
+        list_request(
+            lambda ctx: {
+                "author": f"Author {ctx.rng.randrange(author_count(ctx.rows))}"
+            }
+        ),
+        frozenset({200, 404}),
+    ),
+    Scenario(
+        "list_genre",
+        list_request(lambda ctx: {"genre": ctx.rng.choice(GENRES)}),
+        frozenset({200, 404}),
+    ),
+    Scenario(
+        "list_date",
+        list_request(lambda ctx: {"date_published": random_date(ctx)}),
+        frozenset({200, 404}),
+    ),
+    Scenario(
+        "list_search",
+        list_request(
+            lambda ctx: {"q": f"{ctx.rng.choice(ADJECTIVES)} {ctx.rng.choice(NOUNS)}"}
+        ),
+        frozenset({200, 404}),
+    ),
+    Scenario("list_sorted", list_request(lambda ctx: {"sort": "date_published"})),
+    Scenario("facets", facets),
+    Scenario("create", create_book),
+    Scenario("download", download_book),
+    Scenario("delete", delete_book, frozenset({204})),
+]
+
+
+async def run_scenario(
+    client: AsyncClient,
+    scenario: Scenario,
+    ctx: Context,
+    requests: int,
+    concurrency: int,
+) -> Result:
+    if scenario.request in (download_book, delete_book):
+        requests = min(requests, len(ctx.created))
+    remaining = iter(range(requests))
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            try:
+                response = await scenario.request(client, ctx)
+                ok = response.status_code in scenario.ok_statuses
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            errors += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return Result(requests, errors, time.perf_counter() - started, latencies)
@@ -0,0 +1,50 @@
+import statistics
+import timeit
+from collections.abc import Callable
+from datetime import date
+
+from app.crud.book import list_cache_key
+from app.helper.pagination import decode_cursor, encode_cursor
+from app.models import Book as BookDBModel
+from app.schemas.requests import BookFilter
+from app.schemas.responses import BookResponse, render_books
+from benchmarks.load import summarize
+
+PAGE = [
+    BookDBModel(
+        id=index,
+        name=f"Book {index}",
+        author=f"Author {index % 7}",
+        genre="Fantasy",
+        date_published=date(2000, 1, 1 + index % 28),
+    )
+    for index in range(100)
+]
+FILTERS = BookFilter(name="Dune", genre="Sci-Fi", sort="name", limit=50)
+CURSOR = encode_cursor("date_published", date(2000, 1, 1), 12345)
+
+
+def validate_page() -> bytes:
+    return (
+        b"["
+        + b",".join(
+            BookResponse.model_validate(book).model_dump_json().encode()
+            for book in PAGE
+        )
+        + b"]"
+    )
+
+
+MICRO_BENCHMARKS: dict[str, Callable[[], object]] = {
+    "render_page_fast": lambda: render_books(PAGE),
+    "render_page_models": validate_page,
+    "list_cache_key": lambda: list_cache_key(FILTERS),
+    "decode_cursor": lambda: decode_cursor(CURSOR, "date_published"),
+}
+
+
+def run_micro(name: str, repeat: int = 20, number: int = 200) -> dict[str, float]:
+    """Time a hot in-process function; percentiles are per call."""
+    timings = timeit.repeat(MICRO_BENCHMARKS[name], repeat=repeat, number=number)
+    per_call = [timing / number for timing in timings]
+    return summarize(per_call, 1 / statistics.median(per_call))
@@ -0,0 +1,119 @@
+import time
+from collections.abc import Iterator
+from datetime import date, timedelta
+from typing import Any
+
+from sqlalchemy import func, insert, select, text
+
+from app.core.database import Base, DatabaseSessionManager
+from app.crud.book_facet import rebuild_facets
+from app.models import Book as BookDBModel
+
+ADJECTIVES = (
+    "Silent Broken Golden Hidden Last Distant Crimson Burning "
+    "Frozen Lost Secret Iron Glass Wandering Hollow Endless"
+).split()
+NOUNS = (
+    "Kingdom River Garden Empire Shadow Voyage Mirror Harbor "
+    "Forest Engine Archive Tower Storm Orchard Signal Frontier"
+).split()
+GENRES = (
+    "Fantasy Mystery Thriller Romance Horror History "
+    "Biography Poetry Drama Adventure Philosophy Satire"
+).split()
+FIRST_DATE = date(1900, 1, 1)
+DATE_SPAN = 45_000
+BOOKS_PER_AUTHOR = 50
+SEED_COLUMNS = ("name", "author", "genre", "date_published")
+
+
+def author_count(rows: int) -> int:
+    return max(rows // BOOKS_PER_AUTHOR, 1)
+
+
+def catalog_row(index: int, rows: int) -> tuple[str, str, str, date]:
+    """Deterministic synthetic book number `index` of a `rows`-sized catalog."""
+    adjective = ADJECTIVES[index % len(ADJECTIVES)]
+    noun = NOUNS[index // len(ADJECTIVES) % len(NOUNS)]
+    return (
+        f"{adjective} {noun} {index}",
+        f"Author {index * 7919 % author_count(rows)}",
+        GENRES[index % len(GENRES)],
+        FIRST_DATE + timedelta(days=index * 104_729 % DATE_SPAN),
+    )
+
+
+def catalog_batches(
+    start: int, stop: int, rows: int, batch_size: int
+) -> Iterator[list[tuple[str, str, str, date]]]:
+    for offset in range(start, stop, batch_size):
+        yield [
+            catalog_row(index, rows)
+            for index in range(offset, min(offset + batch_size, stop))
+        ]
+
+
+async def create_schema(manager: DatabaseSessionManager) -> None:
+    async with manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+
+async def count_books(manager: DatabaseSessionManager) -> int:
+    async with manager.connect() as connection:
+        return (await connection.scalar(select(func.count(BookDBModel.id)))) or 0
+
+
+async def id_range(manager: DatabaseSessionManager) -> tuple[int, int]:
+    async with manager.connect() as connection:
+        low, high = (
+            await connection.execute(
+                select(func.min(BookDBModel.id), func.max(BookDBModel.id))
+            )
+        ).one()
+    return low or 0, high or 0
+
+
+async def seed_catalog(
+    manager: DatabaseSessionManager, rows: int, batch_size: int = 10_000
+) -> int:
+    """Top the book table up to `rows` synthetic metadata-only rows.
+
+    Existing rows are kept, so a large catalog is only paid for once. Postgres
+    is loaded with COPY, other databases with multi-row INSERTs; each batch is
+    its own transaction. Returns the number of rows added.
+    """
+    existing = await count_books(manager)
+    if existing >= rows:
+        return 0
+    added = rows - existing
+
+    started = time.perf_counter()
+    for batch in catalog_batches(existing, rows, rows, batch_size):
+        async with manager.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                raw = await connection.get_raw_connection()
+                await raw.driver_connection.copy_records_to_table(  # type: ignore[union-attr]
+                    BookDBModel.__tablename__, records=batch, columns=SEED_COLUMNS
+                )
+            else:
+                values: list[dict[str, Any]] = [
+                    dict(zip(SEED_COLUMNS, row)) for row in batch
+                ]
+                await connection.execute(insert(BookDBModel), values)
+        print(
+            f"\rseeded {existing + len(batch):,}/{rows:,} rows "
+            f"({time.perf_counter() - started:.0f}s)",
+            end="",
+            flush=True,
+        )
+        existing += len(batch)
+    print()
+
+    # Seeding bypasses the crud layer, so the facet summary is rebuilt once.
+    async with manager.session() as session:
+        await rebuild_facets(session)
+        await session.commit()
+    async with manager.connect() as connection:
+        if connection.dialect.name == "postgresql":
+            await connection.execute(text("ANALYZE book"))
+    return added
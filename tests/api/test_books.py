@@ -1,8 +1,16 @@
+import hashlib
+import json
+import os
+from http import HTTPStatus
 from unittest.mock import patch
+from uuid import uuid4
 
 import pytest
 from fastapi import status
 
+from app.core.config import get_settings
+from app.helper.book_file import compress_file, shard_path
+
 
 @pytest.mark.asyncio
 async def test_get_book_not_found(async_client):
@@ -98,3 +106,468 @@ async def test_delete_book(async_client, tmp_path):
 
         response = await async_client.get(f"/api/books/{book_id}")
         assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_get_books_cursor_pagination(async_client, upload_file):
+    author = f"Cursor Author {uuid4()}"
+    created = []
+    for i in range(3):
+        file = upload_file(content=b"Page", filename="page.txt")
+        response = await async_client.post(
+            "/api/books",
+            data={
+                "name": f"Cursor Book {i}",
+                "author": author,
+                "genre": "Pagination",
+                "date_published": "2025-05-02",
+            },
+            files={"file": (file.filename, file.file, "text/plain")},
+        )
+        created.append(response.json()["id"])
+
+    params = {"author": author, "sort": "name", "limit": 2}
+    response = await async_client.get("/api/books", params=params)
+    assert response.status_code == status.HTTP_200_OK
+    first_page = [book["id"] for book in response.json()]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = await async_client.get("/api/books", params=params | {"cursor": cursor})
+    assert response.status_code == status.HTTP_200_OK
+    second_page = [book["id"] for book in response.json()]
+    assert "X-Next-Cursor" not in response.headers
+
+    assert first_page + second_page == created
+
+    response = await async_client.get("/api/books", params=params | {"count": "exact"})
+    assert response.headers["X-Total-Count"] == str(len(created))
+    assert response.headers["X-Total-Count-Mode"] == "exact"
+    # Far below EXACT_COUNT_THRESHOLD, so the estimate is replaced.
+    response = await async_client.get(
+        "/api/books", params=params | {"count": "estimated"}
+    )
+    assert response.headers["X-Total-Count"] == str(len(created))
+    assert response.headers["X-Total-Count-Mode"] == "exact"
+
+
+@pytest.mark.asyncio
+async def test_download_conditional_and_range(async_client, upload_file):
+    content = b"Resumable book content"
+    file = upload_file(content=content, filename="resume.pdf")
+    response = await async_client.post(
+        "/api/books",
+        data={
+            "name": "Resumable Book",
+            "author": "Author",
+            "genre": "Genre",
+            "date_published": "2025-05-02",
+        },
+        files={"file": (file.filename, file.file, "application/pdf")},
+    )
+    book_id = response.json()["id"]
+
+    response = await async_client.get(f"/api/books/{book_id}/download")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == content
+    assert response.headers["etag"] == f'"{hashlib.sha256(content).hexdigest()}"'
+    assert "resume.pdf" in response.headers["content-disposition"]
+    etag = response.headers["etag"]
+
+    response = await async_client.get(
+        f"/api/books/{book_id}/download", headers={"If-None-Match": etag}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+
+    response = await async_client.get(
+        f"/api/books/{book_id}/preview",
+        headers={"Range": "bytes=10-", "If-Range": etag},
+    )
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == content[10:]
+
+
+@pytest.mark.asyncio
+async def test_download_from_compressed_tier(async_client, upload_file):
+    content = f"Cold book content {uuid4()}. ".encode() * 500
+    file = upload_file(content=content, filename="cold.txt")
+    response = await async_client.post(
+        "/api/books",
+        data={
+            "name": "Cold Book",
+            "author": "Author",
+            "genre": "Genre",
+            "date_published": "2025-05-02",
+        },
+        files={"file": (file.filename, file.file, "text/plain")},
+    )
+    book_id = response.json()["id"]
+    digest = hashlib.sha256(content).hexdigest()
+    stored = shard_path(get_settings().storage.upload_dir, digest)
+    assert compress_file(stored, level=6) > 0
+
+    # Sent as stored; httpx decodes the gzip body.
+    response = await async_client.get(
+        f"/api/books/{book_id}/download", headers={"Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == f'"{digest}-gzip"'
+    assert response.content == content
+
+    # Decompressed on the fly, under the same ETag as the uncompressed file.
+    for headers in ({"Accept-Encoding": "identity"}, {"Range": "bytes=10-"}):
+        response = await async_client.get(
+            f"/api/books/{book_id}/download", headers=headers
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert "content-encoding" not in response.headers
+        assert response.headers["etag"] == f'"{digest}"'
+        assert response.headers["accept-ranges"] == "none"
+        assert "cold.txt" in response.headers["content-disposition"]
+        assert response.content == content
+
+    response = await async_client.get(
+        f"/api/books/{book_id}/download",
+        headers={"Accept-Encoding": "gzip", "If-None-Match": f'"{digest}-gzip"'},
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    await async_client.delete(f"/api/books/{book_id}")
+    assert not os.path.exists(stored + ".gz")
+
+
+@pytest.mark.asyncio
+async def test_download_offloaded_to_proxy(async_client, upload_file, monkeypatch):
+    content = f"Offloaded {uuid4()}. ".encode() * 100
+    file = upload_file(content=content, filename="offload.txt")
+    response = await async_client.post(
+        "/api/books",
+        data={
+            "name": "Offloaded Book",
+            "author": "Author",
+            "genre": "Genre",
+            "date_published": "2025-05-02",
+        },
+        files={"file": (file.filename, file.file, "text/plain")},
+    )
+    book_id = response.json()["id"]
+    storage = get_settings().storage
+    digest = hashlib.sha256(content).hexdigest()
+    stored = shard_path(storage.upload_dir, digest)
+    monkeypatch.setattr(storage, "offload", "x-accel-redirect")
+    monkeypatch.setattr(storage, "offload_root", storage.upload_dir)
+
+    response = await async_client.get(f"/api/books/{book_id}/download")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b""
+    assert response.headers["x-accel-redirect"] == (
+        f"/internal/{digest[:2]}/{digest[2:4]}/{digest}"
+    )
+    assert response.headers["content-disposition"] == (
+        'attachment; filename="offload.txt"'
+    )
+    assert response.headers["etag"] == f'"{digest}"'
+
+    response = await async_client.get(
+        f"/api/books/{book_id}/download", headers={"If-None-Match": f'"{digest}"'}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert "x-accel-redirect" not in response.headers
+
+    monkeypatch.setattr(storage, "offload", "x-sendfile")
+    response = await async_client.get(f"/api/books/{book_id}/preview")
+    assert response.headers["x-sendfile"] == os.path.abspath(stored)
+    assert response.headers["content-type"].startswith("text/plain")
+
+    # Compressed files are still streamed by the worker.
+    assert compress_file(stored, level=1) > 0
+    response = await async_client.get(f"/api/books/{book_id}/download")
+    assert "x-sendfile" not in response.headers
+    assert response.content == content
+
+    await async_client.delete(f"/api/books/{book_id}")
+
+
+@pytest.mark.asyncio
+async def test_import_books(async_client):
+    author = f"Import Author {uuid4()}"
+    rows = [
+        {
+            "name": "Imported",
+            "author": author,
+            "genre": "Bulk",
+            "date_published": "2025-05-02",
+        },
+        {"name": "No date", "author": author, "genre": "Bulk"},
+        {
+            "name": "x" * 300,
+            "author": author,
+            "genre": "Bulk",
+            "date_published": "2025-05-02",
+        },
+        {
+            "name": "Imported 2",
+            "author": author,
+            "genre": "Bulk",
+            "date_published": "2025-05-03",
+        },
+    ]
+    content = "\n".join(json.dumps(row) for row in rows).encode()
+
+    response = await async_client.post(
+        "/api/books/import",
+        params={"batch_size": 10},
+        files={"file": ("catalog.ndjson", content, "application/x-ndjson")},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    result = response.json()
+    assert result["inserted"] == len(["Imported", "Imported 2"])
+    assert [error["line"] for error in result["errors"]] == [2, 3]
+
+    response = await async_client.get("/api/books", params={"author": author})
+    assert sorted(book["name"] for book in response.json()) == [
+        "Imported",
+        "Imported 2",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_export_books(async_client):
+    author = f"Export Author {uuid4()}"
+    rows = [
+        {
+            "name": f"Export {i}",
+            "author": author,
+            "genre": "Export",
+            "date_published": "2025-05-02",
+        }
+        for i in range(3)
+    ]
+    content = "\n".join(json.dumps(row) for row in rows).encode()
+    await async_client.post(
+        "/api/books/import",
+        files={"file": ("catalog.ndjson", content, "application/x-ndjson")},
+    )
+
+    response = await async_client.get("/api/books/export", params={"author": author})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"] == "application/x-ndjson"
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    assert [book["name"] for book in exported] == ["Export 0", "Export 1", "Export 2"]
+    assert exported[0]["date_published"] == "2025-05-02T00:00:00"
+
+    response = await async_client.get(
+        "/api/books/export", params={"author": author, "format": "csv"}
+    )
+    lines = response.text.splitlines()
+    assert lines[0] == "id,name,author,genre,date_published"
+    assert lines[1].endswith(f"Export 0,{author},Export,2025-05-02T00:00:00")
+    assert len(lines) == len(rows) + 1
+
+    response = await async_client.get(
+        "/api/books/export", params={"author": f"{author} missing", "format": "csv"}
+    )
+    assert response.text.splitlines() == ["id,name,author,genre,date_published"]
+
+
+@pytest.mark.asyncio
+async def test_get_books_batch(async_client, upload_file):
+    file = upload_file(content=b"Batch", filename="batch.txt")
+    response = await async_client.post(
+        "/api/books",
+        data={
+            "name": "Batch Book",
+            "author": "Author",
+            "genre": "Genre",
+            "date_published": "2025-05-02",
+        },
+        files={"file": (file.filename, file.file, "text/plain")},
+    )
+    book_id = response.json()["id"]
+
+    response = await async_client.post(
+        "/api/books/batch", json={"ids": [99999999, book_id]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [book["id"] for book in data["books"]] == [book_id]
+    assert data["missing"] == [99999999]
+
+    response = await async_client.post("/api/books/batch", json={"ids": []})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_query_budgets(async_client, upload_file, assert_max_queries):
+    file = upload_file(content=b"budget", filename="budget.txt")
+    # Blob refcount upsert, INSERT ... RETURNING, facet upsert, refresh.
+    with assert_max_queries(4):
+        response = await async_client.post(
+            "/api/books",
+            data={
+                "name": "Budget",
+                "author": "Author",
+                "genre": "Fiction",
+                "date_published": "2025-05-02",
+            },
+            files={"file": (file.filename, file.file, "text/plain")},
+        )
+    book_id = response.json()["id"]
+
+    with assert_max_queries(1):
+        response = await async_client.get(f"/api/books/{book_id}")
+    assert response.headers["server-timing"].endswith('desc="1 queries"')
+    with assert_max_queries(0):
+        await async_client.get(f"/api/books/{book_id}")
+
+    # SELECT, UPDATE, refresh; facets are untouched by a rename.
+    with assert_max_queries(3):
+        await async_client.put(f"/api/books/{book_id}", data={"name": "Budget 2"})
+
+    with assert_max_queries(1):
+        await async_client.get("/api/books", params={"name": "Budget 2"})
+
+    with assert_max_queries(2):
+        response = await async_client.get("/api/books/facets", params={"limit": 100})
+    assert any(facet["value"] == "Fiction" for facet in response.json()["genre"])
+
+    # SELECT, DELETE, facet decrement, refcount decrement, blob row removal,
+    # then the claim held while the released file is removed, and its drop.
+    with assert_max_queries(7):
+        await async_client.delete(f"/api/books/{book_id}")
+
+
+@pytest.mark.asyncio
+async def test_preview_uses_real_media_type(async_client, upload_file):
+    file = upload_file(content=b"Just text", filename="notes.txt")
+    response = await async_client.post(
+        "/api/books",
+        data={
+            "name": "Notes",
+            "author": "Author",
+            "genre": "Preview",
+            "date_published": "2025-05-02",
+        },
+        files={"file": (file.filename, file.file, "text/plain")},
+    )
+    book_id = response.json()["id"]
+
+    response = await async_client.get(f"/api/books/{book_id}/preview")
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/plain")
+    assert response.content == b"Just text"
+
+    response = await async_client.get(f"/api/books/{book_id}/thumbnail")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_books(async_client):
+    author = f"Bulk Author {uuid4()}"
+    rows = [
+        {"name": name, "author": author, "genre": "Old", "date_published": "2025-05-02"}
+        for name in ("One", "Two", "Three")
+    ]
+    # Would match a substring filter on author.
+    rows.append(
+        {
+            "name": "Bystander",
+            "author": f"{author} Jr",
+            "genre": "Old",
+            "date_published": "2025-05-02",
+        }
+    )
+    content = "\n".join(json.dumps(row) for row in rows).encode()
+    await async_client.post(
+        "/api/books/import",
+        files={"file": ("catalog.ndjson", content, "application/x-ndjson")},
+    )
+    response = await async_client.get("/api/books", params={"author": author})
+    books = {book["name"]: book["id"] for book in response.json()}
+    bystander = books.pop("Bystander")
+    book_ids = sorted(books.values())
+
+    genre = f"Retagged {uuid4()}"
+    response = await async_client.post(
+        "/api/books/bulk-update",
+        json={"filter": {"author": author}, "update": {"genre": genre}},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == len(book_ids)
+    assert sorted(response.json()["ids"]) == book_ids
+
+    response = await async_client.post(
+        "/api/books/bulk-update",
+        json={"ids": book_ids[:1], "update": {"name": "Renamed"}},
+    )
+    assert response.json() == {"count": 1, "ids": book_ids[:1]}
+
+    response = await async_client.get("/api/books", params={"author": author})
+    books = sorted(response.json(), key=lambda book: book["id"])
+    assert [(book["name"], book["genre"]) for book in books] == [
+        ("Renamed", genre),
+        ("Two", genre),
+        ("Three", genre),
+        ("Bystander", "Old"),
+    ]
+    assert books[-1]["id"] == bystander
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_books_validation(async_client):
+    for body in (
+        {"update": {"name": "Nothing targeted"}},
+        {"ids": [1], "filter": {"author": "Both"}, "update": {"name": "x"}},
+        {"filter": {}, "update": {"name": "Whole table"}},
+        {"filter": {"q": "fuzzy"}, "update": {"name": "Search results"}},
+        {"ids": [1], "update": {"name": ""}},
+    ):
+        response = await async_client.post("/api/books/bulk-update", json=body)
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    # Wildcards are plain characters, not a way to match everything.
+    response = await async_client.post(
+        "/api/books/bulk-update",
+        json={"filter": {"genre": "%"}, "update": {"name": "Everything"}},
+    )
+    assert response.json() == {"count": 0, "ids": []}
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_books(async_client, upload_file):
+    content = f"Bulk delete content {uuid4()}".encode()
+    book_ids = []
+    for name in ("Copy 1", "Copy 2"):
+        file = upload_file(content=content, filename="shared.txt")
+        response = await async_client.post(
+            "/api/books",
+            data={
+                "name": name,
+                "author": "Author",
+                "genre": "Genre",
+                "date_published": "2025-05-02",
+            },
+            files={"file": (file.filename, file.file, "text/plain")},
+        )
+        book_ids.append(response.json()["id"])
+    stored = shard_path(
+        get_settings().storage.upload_dir, hashlib.sha256(content).hexdigest()
+    )
+    assert os.path.exists(stored)
+
+    response = await async_client.post(
+        "/api/books/bulk-delete", json={"ids": [*book_ids, 99999999]}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["count"] == len(book_ids)
+    assert sorted(response.json()["ids"]) == book_ids
+
+    # Removed by the background task once both references are gone.
+    assert not os.path.exists(stored)
+    for book_id in book_ids:
+        response = await async_client.get(f"/api/books/{book_id}")
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.post("/api/books/bulk-delete", json={"ids": []})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
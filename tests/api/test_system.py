@@ -0,0 +1,23 @@
+from http import HTTPStatus
+
+import pytest
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(async_client):
+    await async_client.get("/api/books/0")
+
+    response = await async_client.get("/metrics")
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/api/books/{book_id}"}'
+        in body
+    )
+    assert (
+        'db_query_duration_seconds_bucket{engine="primary",operation="SELECT"' in body
+    )
+    assert 'db_pool_connections{state="checked_out"}' in body
+    assert "# TYPE cache_hits_total counter" in body
@@ -0,0 +1,111 @@
+import base64
+from http import HTTPStatus
+from uuid import uuid4
+
+import pytest
+from fastapi import status
+
+CHUNK_HEADERS = {"Content-Type": "application/offset+octet-stream"}
+BOOK_FORM = {
+    "name": "Resumed Book",
+    "author": "Author",
+    "genre": "Genre",
+    "date_published": "2025-05-02",
+}
+
+
+async def create_upload(async_client, length, filename="resumable.txt"):
+    response = await async_client.post(
+        "/api/uploads",
+        headers={
+            "Upload-Length": str(length),
+            "Upload-Metadata": f"filename {base64.b64encode(filename.encode()).decode()}",
+        },
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    assert response.headers["upload-offset"] == "0"
+    return response.headers["location"]
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload(async_client):
+    content = f"Resumable content {uuid4()}".encode()
+    half = len(content) // 2
+    location = await create_upload(async_client, len(content))
+
+    response = await async_client.patch(
+        location, content=content[:half], headers=CHUNK_HEADERS | {"Upload-Offset": "0"}
+    )
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    assert response.headers["upload-offset"] == str(half)
+
+    # A retried chunk, a wrong media type and an early finalize are refused.
+    response = await async_client.patch(
+        location, content=content[:half], headers=CHUNK_HEADERS | {"Upload-Offset": "0"}
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = await async_client.patch(
+        location, content=content[half:], headers={"Upload-Offset": str(half)}
+    )
+    assert response.status_code == status.HTTP_415_UNSUPPORTED_MEDIA_TYPE
+    upload_id = location.rsplit("/", 1)[-1]
+    response = await async_client.post(
+        "/api/books", data=BOOK_FORM | {"upload_id": upload_id}
+    )
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+    response = await async_client.head(location)
+    assert response.headers["upload-offset"] == str(half)
+    assert response.headers["upload-length"] == str(len(content))
+
+    response = await async_client.patch(
+        location,
+        content=content[half:],
+        headers=CHUNK_HEADERS | {"Upload-Offset": str(half)},
+    )
+    assert response.headers["upload-offset"] == str(len(content))
+
+    # A request that fails leaves the finished upload to retry with.
+    response = await async_client.put(
+        "/api/books/999999999", data=BOOK_FORM | {"upload_id": upload_id}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.head(location)
+    assert response.headers["upload-offset"] == str(len(content))
+
+    response = await async_client.post(
+        "/api/books", data=BOOK_FORM | {"upload_id": upload_id}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    book_id = response.json()["id"]
+    response = await async_client.get(f"/api/books/{book_id}/download")
+    assert response.content == content
+    assert "resumable.txt" in response.headers["content-disposition"]
+
+    response = await async_client.head(location)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    await async_client.delete(f"/api/books/{book_id}")
+
+
+@pytest.mark.asyncio
+async def test_resumable_upload_limits(async_client):
+    location = await create_upload(async_client, 4)
+
+    response = await async_client.patch(
+        location, content=b"Too long", headers=CHUNK_HEADERS | {"Upload-Offset": "0"}
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+    response = await async_client.delete(location)
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+    response = await async_client.head(location)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await async_client.head("/api/uploads/..%2F..%2Fetc")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await async_client.post(
+        "/api/uploads", headers={"Upload-Length": str(2**40)}
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    response = await async_client.post("/api/books", data=BOOK_FORM)
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -1,7 +1,15 @@
+import contextlib
 import os
 import tempfile
 from unittest.mock import AsyncMock
 
+# Storage paths are read when app modules are imported, so point them at the
+# temp directory before that happens. It is kept between runs, like the rows
+# of the test database that refer to its files.
+STORAGE_DIR = os.path.join(tempfile.gettempdir(), "test-library")
+os.environ["STORAGE__UPLOAD_DIR"] = os.path.join(STORAGE_DIR, "uploads")
+os.environ["STORAGE__PREVIEW_DIR"] = os.path.join(STORAGE_DIR, "previews")
+
 import pytest
 from fastapi import UploadFile
 from httpx import ASGITransport, AsyncClient
@@ -9,6 +17,7 @@ from sqlalchemy.engine.url import URL
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import DatabaseSessionManager
+from app.core.metrics import track_queries
 from app.main import app
 
 
@@ -21,7 +30,28 @@ async def async_client():
 
 @pytest.fixture
 def fake_db_session():
-    return AsyncMock(spec=AsyncSession)
+    session = AsyncMock(spec=AsyncSession)
+    session.info = {}
+    return session
+
+
+@pytest.fixture
+def assert_max_queries():
+    """Fail when the block issues more database statements than allowed.
+
+    Usage: ``with assert_max_queries(2): await async_client.get(...)``.
+    """
+
+    @contextlib.contextmanager
+    def _assert_max_queries(limit):
+        with track_queries() as stats:
+            yield stats
+        assert stats.count <= limit, (
+            f"{stats.count} queries, expected at most {limit}:\n"
+            + "\n".join(stats.statements)
+        )
+
+    return _assert_max_queries
 
 
 @pytest.fixture
@@ -0,0 +1,63 @@
+import pytest
+
+from app.core.cache import MISSING, MemoryCache, NullCache, build_cache
+from app.core.config import Cache as CacheSettings
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_hit_and_miss():
+    cache = MemoryCache(max_size=2, ttl=60)
+
+    assert await cache.get("a") is MISSING
+    await cache.set("a", 1)
+    assert await cache.get("a") == 1
+
+    assert cache.stats.as_dict() == {"hits": 1, "misses": 1, "evictions": 0}
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+    await cache.get("a")
+    await cache.set("c", 3)
+
+    assert await cache.get("b") is MISSING
+    assert await cache.get("a") == 1
+    assert len(cache) == cache.max_size
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_expires_entries():
+    cache = MemoryCache(max_size=2, ttl=60)
+    await cache.set("a", 1, ttl=0)
+
+    assert await cache.get("a") is MISSING
+    assert cache.stats.evictions == 1
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_delete_and_clear():
+    cache = MemoryCache(max_size=2, ttl=60)
+    await cache.set("a", 1)
+    await cache.set("b", 2)
+
+    await cache.delete("a")
+    await cache.delete("missing")
+    assert await cache.get("a") is MISSING
+
+    await cache.clear()
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_null_cache_never_stores():
+    cache = build_cache(CacheSettings(backend="none"))
+    assert isinstance(cache, NullCache)
+
+    await cache.set("a", 1)
+    assert await cache.get("a") is MISSING
+    assert len(cache) == 0
@@ -1,8 +1,18 @@
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
+from sqlalchemy import text
+from sqlalchemy.engine.url import URL
 from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
 
+from app.core.config import Database
+from app.core.database import (
+    DatabaseSessionManager,
+    Replica,
+    TimedQueuePool,
+    engine_kwargs,
+)
+
 
 @pytest.mark.asyncio
 async def test_session_success(db_manager):
@@ -63,3 +73,97 @@ async def test_close(db_manager):
     engine_mock.dispose.assert_awaited_once()
     assert db_manager._engine is None
     assert db_manager._sessionmaker is None
+
+
+def test_engine_kwargs():
+    settings = Database(password="secret", pool_size=20, pool_pre_ping=True)
+
+    kwargs = engine_kwargs(settings)
+
+    assert kwargs["poolclass"] is TimedQueuePool
+    assert kwargs["pool_size"] == settings.pool_size
+    assert kwargs["pool_pre_ping"] is True
+    assert kwargs["connect_args"] == {
+        "statement_cache_size": settings.statement_cache_size,
+        "prepared_statement_cache_size": settings.statement_cache_size,
+    }
+
+
+def test_engine_kwargs_pgbouncer():
+    connect_args = engine_kwargs(Database(password="secret", pgbouncer=True))[
+        "connect_args"
+    ]
+
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert connect_args["prepared_statement_name_func"]() != (
+        connect_args["prepared_statement_name_func"]()
+    )
+
+
+@pytest.mark.asyncio
+async def test_pool_status(tmp_path):
+    url = URL.create(drivername="sqlite+aiosqlite", database=str(tmp_path / "db"))
+    db_manager = DatabaseSessionManager(
+        url, {"poolclass": TimedQueuePool, "pool_size": 2}
+    )
+
+    async with db_manager.session() as session:
+        await session.execute(text("SELECT 1"))
+        status = db_manager.pool_status()
+        assert status["checked_out"] == 1
+        assert status["checkouts"] == 1
+
+    status = db_manager.pool_status()
+    assert status["checked_out"] == 0
+    assert status["size"] == db_manager._engine.pool.size()
+    assert status["wait_time_max"] >= 0
+    await db_manager.close()
+
+
+def test_pool_status_without_queue_pool(db_manager):
+    assert db_manager.pool_status() == {}
+
+
+@pytest.mark.asyncio
+async def test_read_session_round_robins_replicas(tmp_path):
+    primary = URL.create(drivername="sqlite+aiosqlite", database=str(tmp_path / "p"))
+    replicas = [
+        URL.create(drivername="sqlite+aiosqlite", database=str(tmp_path / name))
+        for name in ("r1", "r2")
+    ]
+    db_manager = DatabaseSessionManager(primary, replica_hosts=replicas)
+    assert db_manager.has_replicas
+
+    used = []
+    for _ in range(2):
+        async with db_manager.read_session() as session:
+            used.append(session.get_bind().url.database)
+            assert session.info["replica"]
+    assert used == [str(tmp_path / "r1"), str(tmp_path / "r2")]
+
+    async with db_manager.read_session(use_primary=True) as session:
+        assert session.get_bind().url.database == str(tmp_path / "p")
+        assert session.info == {"use_primary": True}
+    await db_manager.close()
+
+
+@pytest.mark.asyncio
+async def test_read_session_falls_back_to_primary(db_manager):
+    failing_session = AsyncMock(spec=AsyncSession)
+    failing_session.connection.side_effect = OSError("replica down")
+    replica = Replica(
+        engine=AsyncMock(spec=AsyncEngine),
+        sessionmaker=MagicMock(return_value=failing_session),
+    )
+    db_manager._replicas = [replica]
+
+    async with db_manager.read_session() as session:
+        assert session is not failing_session
+
+    failing_session.close.assert_awaited_once()
+    assert replica.unhealthy_until > 0
+
+    async with db_manager.read_session():
+        pass
+    replica.sessionmaker.assert_called_once()
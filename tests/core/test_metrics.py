@@ -0,0 +1,99 @@
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+
+from app.core.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    Registry,
+    db_query_duration,
+    http_request_duration,
+    http_requests,
+    http_requests_in_flight,
+    instrument_engine,
+    track_queries,
+)
+
+
+def test_registry_renders_exposition_format():
+    registry = Registry()
+    counter = registry.register(Counter("jobs_total", "Jobs.", ("kind",)))
+    registry.register(Gauge("queue", "Queue.", collect=lambda: [((), 3)]))
+    histogram = registry.register(Histogram("job_seconds", "Job time.", (), (0.1, 1)))
+    counter.inc(labels=('say "hi"',))
+    counter.inc(2, ('say "hi"',))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert registry.render().splitlines() == [
+        "# HELP jobs_total Jobs.",
+        "# TYPE jobs_total counter",
+        'jobs_total{kind="say \\"hi\\""} 3',
+        "# HELP queue Queue.",
+        "# TYPE queue gauge",
+        "queue 3",
+        "# HELP job_seconds Job time.",
+        "# TYPE job_seconds histogram",
+        'job_seconds_bucket{le="0.1"} 1',
+        'job_seconds_bucket{le="1"} 2',
+        'job_seconds_bucket{le="+Inf"} 3',
+        "job_seconds_sum 5.55",
+        "job_seconds_count 3",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_middleware_labels_by_route_template():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int) -> dict[str, int]:
+        return {"id": item_id}
+
+    labels = ("GET", "/items/{item_id}", "200")
+    before = http_requests.values.get(labels, 0)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        for item_id in range(3):
+            await client.get(f"/items/{item_id}")
+        await client.get("/missing")
+
+    assert http_requests.values[labels] == before + 3
+    assert http_requests.values[("GET", "unmatched", "404")] >= 1
+    assert ("GET", "/items/{item_id}") in http_request_duration.values
+    assert http_requests_in_flight.values[()] == 0
+
+
+@pytest.mark.asyncio
+async def test_instrument_engine_times_queries(db_manager):
+    instrument_engine(db_manager._engine, "test")
+
+    async with db_manager.connect() as connection:
+        await connection.execute(text("SELECT 1"))
+
+    counts, _ = db_query_duration.values[("test", "SELECT")]
+    assert sum(counts) == 1
+
+
+@pytest.mark.asyncio
+async def test_track_queries_nests_and_logs_slow_queries(
+    monkeypatch, caplog, db_manager
+):
+    monkeypatch.setattr("app.core.metrics.SLOW_QUERY_THRESHOLD", 1e-9)
+
+    with track_queries() as outer:
+        with track_queries() as inner:
+            async with db_manager.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                await connection.execute(text("SELECT 2"))
+
+    assert outer.statements == inner.statements == ["SELECT 1", "SELECT 2"]
+    assert outer.count == len(outer.statements)
+    assert outer.slowest_statement in outer.statements
+    assert outer.total_time >= outer.slowest_time > 0
+    assert "Slow query on primary" in caplog.text
@@ -1,12 +1,44 @@
+import json
+from collections import Counter
 from http import HTTPStatus
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from fastapi import HTTPException
-
-from app.crud.book import delete_book, fetch_book, list_books, save_book, update_book
+from sqlalchemy.dialects import postgresql
+
+from app.core.cache import MISSING, MemoryCache
+from app.core.config import get_settings
+from app.crud.book import (
+    EXACT_COUNT_THRESHOLD,
+    book_cache_key,
+    bulk_delete_books,
+    bulk_update_books,
+    count_cache_key,
+    delete_book,
+    fetch_book,
+    fetch_books,
+    get_cached_book,
+    get_cached_books,
+    invalidate_book,
+    list_books,
+    list_cache_key,
+    list_cached_books,
+    next_cursor,
+    save_book,
+    total_count,
+    update_book,
+)
+from app.helper.book_file import SavedFile
+from app.helper.pagination import decode_cursor, encode_cursor
 from app.models import Book as BookDBModel
-from app.schemas.requests import BookCreate, BookFilter, BookUpdate
+from app.schemas.requests import (
+    BookBulkUpdate,
+    BookCreate,
+    BookFilter,
+    BookUpdate,
+)
 
 
 @pytest.mark.asyncio
@@ -20,6 +52,11 @@ async def test_fetch_book_found(fake_db_session):
     result = await fetch_book(fake_db_session, 1)
     assert result == book
 
+    await fetch_book(fake_db_session, 1, for_update=True)
+    stmt = fake_db_session.scalars.call_args.args[0]
+    assert str(stmt.compile(dialect=postgresql.dialect())).endswith("FOR UPDATE")
+    assert stmt.get_execution_options()["populate_existing"]
+
 
 @pytest.mark.asyncio
 async def test_fetch_book_not_found(fake_db_session):
@@ -38,10 +75,10 @@ async def test_fetch_book_not_found(fake_db_session):
 async def test_list_books_found(fake_db_session):
     books = [BookDBModel(id=1, name="Book 1"), BookDBModel(id=2, name="Book 2")]
 
-    scalars = MagicMock()
-    scalars.all.return_value = books
+    db_result = MagicMock()
+    db_result.all.return_value = books
 
-    fake_db_session.scalars.return_value = scalars
+    fake_db_session.execute.return_value = db_result
 
     filters = BookFilter(
         name=None, author=None, genre=None, date_published=None, limit=10, offset=0
@@ -53,10 +90,10 @@ async def test_list_books_found(fake_db_session):
 
 @pytest.mark.asyncio
 async def test_list_books_not_found(fake_db_session):
-    scalars = MagicMock()
-    scalars.all.return_value = []
+    db_result = MagicMock()
+    db_result.all.return_value = []
 
-    fake_db_session.scalars.return_value = scalars
+    fake_db_session.execute.return_value = db_result
 
     filters = BookFilter(
         name=None, author=None, genre=None, date_published=None, limit=10, offset=0
@@ -77,16 +114,21 @@ async def test_save_book(fake_db_session):
         date_published="2025-05-02",
     )
 
-    file_path = "/tmp/file.txt"
+    file = SavedFile(path="/tmp/file.txt", size=1, sha256="ab", filename="file.txt")
 
-    result = await save_book(fake_db_session, book_data, file_path)
+    with patch(
+        "app.crud.book.acquire_file", return_value=file.path
+    ) as mock_acquire_file:
+        result = await save_book(fake_db_session, book_data, file)
 
+    mock_acquire_file.assert_awaited_once_with(fake_db_session, file)
     fake_db_session.add.assert_called_once()
     fake_db_session.commit.assert_awaited_once()
     fake_db_session.refresh.assert_awaited_once_with(result)
 
     assert result.name == book_data.name
-    assert result.file_path == file_path
+    assert result.file_path == file.path
+    assert result.file_name == "file.txt"
 
 
 @pytest.mark.asyncio
@@ -96,19 +138,56 @@ async def test_update_book(monkeypatch, fake_db_session):
     fake_db_session.commit = AsyncMock()
     fake_db_session.refresh = AsyncMock()
 
-    async def fake_fetch_book(db_session, book_id):
+    async def fake_fetch_book(db_session, book_id, for_update):
+        assert for_update
         return book
 
     monkeypatch.setattr("app.crud.book.fetch_book", fake_fetch_book)
 
-    with patch("app.crud.book.remove_file") as mock_remove_file:
+    file = SavedFile(path="new_file.txt", size=1, sha256="ab", filename="new.txt")
+
+    with (
+        patch("app.crud.book.remove_unreferenced") as mock_remove_unreferenced,
+        patch(
+            "app.crud.book.acquire_file", return_value=file.path
+        ) as mock_acquire_file,
+        patch("app.crud.book.release_file", return_value=True) as mock_release_file,
+    ):
         book_data = BookUpdate(name="New Name")
 
-        result = await update_book(fake_db_session, 1, book_data, "new_file.txt")
+        result = await update_book(fake_db_session, 1, book_data, file)
 
         assert result.name == "New Name"
         assert result.file_path == "new_file.txt"
-        mock_remove_file.assert_called_once_with("old_file.txt")
+        assert result.file_name == "new.txt"
+        mock_acquire_file.assert_awaited_once_with(fake_db_session, file)
+        mock_release_file.assert_awaited_once_with(fake_db_session, "old_file.txt")
+        mock_remove_unreferenced.assert_awaited_once_with(
+            fake_db_session, ["old_file.txt"]
+        )
+
+
+@pytest.mark.asyncio
+async def test_update_book_file_still_referenced(monkeypatch, fake_db_session):
+    book = BookDBModel(id=1, name="Old Name", file_path="shared_file.txt")
+
+    async def fake_fetch_book(db_session, book_id, for_update):
+        assert for_update
+        return book
+
+    monkeypatch.setattr("app.crud.book.fetch_book", fake_fetch_book)
+
+    file = SavedFile(path="new_file.txt", size=1, sha256="ab", filename="new.txt")
+
+    with (
+        patch("app.crud.book.remove_unreferenced") as mock_remove_unreferenced,
+        patch("app.crud.book.acquire_file", return_value=file.path),
+        patch("app.crud.book.release_file", return_value=False),
+    ):
+        result = await update_book(fake_db_session, 1, BookUpdate(), file)
+
+        assert result.file_path == "new_file.txt"
+        mock_remove_unreferenced.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -118,18 +197,27 @@ async def test_update_book_no_file(monkeypatch, fake_db_session):
     fake_db_session.commit = AsyncMock()
     fake_db_session.refresh = AsyncMock()
 
-    async def fake_fetch_book(db_session, book_id):
+    async def fake_fetch_book(db_session, book_id, for_update):
+        assert for_update
         return book
 
     monkeypatch.setattr("app.crud.book.fetch_book", fake_fetch_book)
 
-    with patch("app.crud.book.remove_file") as mock_remove_file:
+    file = SavedFile(path="same_file.txt", size=1, sha256="ab", filename="same.txt")
+
+    with (
+        patch("app.crud.book.remove_unreferenced") as mock_remove_unreferenced,
+        patch(
+            "app.crud.book.acquire_file", return_value=file.path
+        ) as mock_acquire_file,
+    ):
         book_data = BookUpdate(name="New Name")
 
-        result = await update_book(fake_db_session, 1, book_data, "same_file.txt")
+        result = await update_book(fake_db_session, 1, book_data, file)
 
         assert result.name == "New Name"
-        mock_remove_file.assert_not_called()
+        mock_acquire_file.assert_not_called()
+        mock_remove_unreferenced.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -139,14 +227,442 @@ async def test_delete_book(monkeypatch, fake_db_session):
     fake_db_session.commit = AsyncMock()
     fake_db_session.delete = AsyncMock()
 
-    async def fake_fetch_book(db_session, book_id):
+    async def fake_fetch_book(db_session, book_id, for_update):
+        assert for_update
         return book
 
     monkeypatch.setattr("app.crud.book.fetch_book", fake_fetch_book)
 
-    with patch("app.crud.book.remove_file") as mock_remove_file:
+    with (
+        patch("app.crud.book.remove_unreferenced") as mock_remove_unreferenced,
+        patch("app.crud.book.release_file", return_value=True) as mock_release_file,
+    ):
         await delete_book(fake_db_session, 1)
 
         fake_db_session.delete.assert_awaited_once_with(book)
         fake_db_session.commit.assert_awaited_once()
-        mock_remove_file.assert_called_once_with("delete_file.txt")
+        mock_release_file.assert_awaited_once_with(fake_db_session, "delete_file.txt")
+        mock_remove_unreferenced.assert_awaited_once_with(
+            fake_db_session, ["delete_file.txt"]
+        )
+
+
+@pytest.mark.asyncio
+async def test_list_books_cursor_uses_keyset(fake_db_session):
+    books = [BookDBModel(id=3, name="Book 3")]
+
+    db_result = MagicMock()
+    db_result.all.return_value = books
+
+    fake_db_session.execute.return_value = db_result
+
+    filters = BookFilter(
+        sort="name", cursor=encode_cursor("name", "Book 2", 2), limit=10, offset=5
+    )
+
+    result = await list_books(fake_db_session, filters)
+    assert result == books
+
+    sql = str(fake_db_session.execute.call_args.args[0])
+    assert "(book.name, book.id) > (:param_1, :param_2)" in sql
+    assert "ORDER BY book.name, book.id" in sql
+    assert "OFFSET" not in sql
+
+
+def test_next_cursor():
+    books = [BookDBModel(id=1, name="A"), BookDBModel(id=2, name="B")]
+
+    assert next_cursor(BookFilter(limit=3), books) is None
+
+    cursor = next_cursor(BookFilter(sort="name", limit=2), books)
+    assert decode_cursor(cursor, "name") == ("B", 2)
+
+
+@pytest.mark.asyncio
+async def test_list_books_search_falls_back_to_ilike(fake_db_session):
+    books = [BookDBModel(id=1, name="Dune")]
+
+    db_result = MagicMock()
+    db_result.all.return_value = books
+
+    fake_db_session.execute.return_value = db_result
+
+    result = await list_books(fake_db_session, BookFilter(q="dune"))
+    assert result == books
+
+    sql = str(fake_db_session.execute.call_args.args[0])
+    assert "lower(book.name) LIKE lower(:name_1)" in sql
+    assert "lower(book.genre) LIKE lower(:genre_1)" in sql
+    assert "ORDER BY book.id" in sql
+
+
+@pytest.mark.asyncio
+async def test_list_books_search_ranks_on_postgres(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+
+    db_result = MagicMock()
+    db_result.all.return_value = [BookDBModel(id=1, name="Dune")]
+
+    fake_db_session.execute.return_value = db_result
+
+    await list_books(fake_db_session, BookFilter(q="dune", sort="name"))
+
+    sql = str(
+        fake_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "book.name %%> %(name_1)s" in sql
+    assert "ORDER BY greatest(word_similarity(" in sql
+    assert "DESC, book.id" in sql
+
+
+@pytest.mark.asyncio
+async def test_list_books_search_rejects_cursor(fake_db_session):
+    filters = BookFilter(q="dune", cursor=encode_cursor("id", 1, 1))
+
+    with pytest.raises(HTTPException) as exc:
+        await list_books(fake_db_session, filters)
+
+    assert exc.value.status_code == HTTPStatus.BAD_REQUEST
+    assert next_cursor(BookFilter(q="dune", limit=1), [BookDBModel(id=1)]) is None
+
+
+@pytest.mark.asyncio
+async def test_get_cached_book_reads_through(monkeypatch, fake_db_session):
+    monkeypatch.setattr("app.crud.book.book_cache", MemoryCache(max_size=10, ttl=60))
+    book = BookDBModel(id=1, name="Cached", file_path="cached.txt")
+    db_result = MagicMock()
+    db_result.first.return_value = book
+    fake_db_session.execute.return_value = db_result
+
+    assert await get_cached_book(fake_db_session, 1) is book
+    assert await get_cached_book(fake_db_session, 1) is book
+    fake_db_session.execute.assert_awaited_once()
+
+    renamed = BookDBModel(id=1, name="Renamed", file_path="cached.txt")
+    db_result.first.return_value = renamed
+    await invalidate_book(1)
+    assert await get_cached_book(fake_db_session, 1) is renamed
+
+
+@pytest.mark.asyncio
+async def test_get_cached_book_skips_rows_read_across_invalidation(
+    monkeypatch, fake_db_session
+):
+    monkeypatch.setattr("app.crud.book.book_cache", MemoryCache(max_size=10, ttl=60))
+    stale = BookDBModel(id=1, name="Stale", file_path="cached.txt")
+    db_result = MagicMock()
+    db_result.first.return_value = stale
+
+    async def update_during_read(stmt):
+        # An update commits and invalidates while this read is in flight.
+        await invalidate_book(1)
+        return db_result
+
+    fake_db_session.execute.side_effect = update_during_read
+    assert await get_cached_book(fake_db_session, 1) is stale
+
+    fresh = BookDBModel(id=1, name="Fresh", file_path="cached.txt")
+    fake_db_session.execute.side_effect = None
+    fake_db_session.execute.return_value = db_result
+    db_result.first.return_value = fresh
+    assert await get_cached_book(fake_db_session, 1) is fresh
+
+
+@pytest.mark.asyncio
+async def test_get_cached_book_bypassed_for_pinned_clients(
+    monkeypatch, fake_db_session
+):
+    cache = MemoryCache(max_size=10, ttl=60)
+    monkeypatch.setattr("app.crud.book.book_cache", cache)
+    await cache.set(book_cache_key(1), BookDBModel(id=1, name="Cached"))
+    fresh = BookDBModel(id=1, name="Fresh")
+    db_result = MagicMock()
+    db_result.first.return_value = fresh
+    fake_db_session.execute.return_value = db_result
+    fake_db_session.info["use_primary"] = True
+
+    assert await get_cached_book(fake_db_session, 1) is fresh
+    assert (await cache.get(book_cache_key(1))).name == "Cached"
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_cached_after_write_window(monkeypatch, fake_db_session):
+    cache = MemoryCache(max_size=10, ttl=60)
+    monkeypatch.setattr("app.crud.book.book_cache", cache)
+    book = BookDBModel(id=1, name="Book")
+    db_result = MagicMock()
+    db_result.first.return_value = book
+    fake_db_session.execute.return_value = db_result
+    fake_db_session.info["replica"] = True
+
+    # Right after a write the replica may not have it yet.
+    await invalidate_book(1)
+    assert await get_cached_book(fake_db_session, 1) is book
+    assert await cache.get(book_cache_key(1)) is MISSING
+
+    window = get_settings().database.read_your_writes_window
+    monkeypatch.setattr("app.crud.book.list_generation.bumped_at", -window)
+    assert await get_cached_book(fake_db_session, 1) is book
+    assert await cache.get(book_cache_key(1)) is book
+
+
+@pytest.mark.asyncio
+async def test_get_cached_book_caches_not_found(monkeypatch, fake_db_session):
+    monkeypatch.setattr("app.crud.book.book_cache", MemoryCache(max_size=10, ttl=60))
+    db_result = MagicMock()
+    db_result.first.return_value = None
+    fake_db_session.execute.return_value = db_result
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            await get_cached_book(fake_db_session, 999)
+        assert exc.value.status_code == HTTPStatus.NOT_FOUND
+
+    fake_db_session.execute.assert_awaited_once()
+
+
+def test_list_cache_key_normalizes_filters():
+    key = list_cache_key(BookFilter(name="Dune", author="", limit=10, offset=2))
+
+    assert key == list_cache_key(BookFilter(name="dUNE", limit=10, offset=2))
+    assert key != list_cache_key(BookFilter(name="Dune", limit=10, offset=3))
+
+    cursor = encode_cursor("id", 5, 5)
+    assert list_cache_key(BookFilter(cursor=cursor, offset=1)) == list_cache_key(
+        BookFilter(cursor=cursor, offset=2)
+    )
+
+
+@pytest.mark.asyncio
+async def test_list_cached_books_invalidated_by_writes(monkeypatch, fake_db_session):
+    monkeypatch.setattr("app.crud.book.list_cache", MemoryCache(max_size=10, ttl=60))
+    db_result = MagicMock()
+    db_result.all.return_value = []
+    fake_db_session.execute.return_value = db_result
+    filters = BookFilter(genre="Fantasy")
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc:
+            await list_cached_books(fake_db_session, filters)
+        assert exc.value.status_code == HTTPStatus.NOT_FOUND
+    fake_db_session.execute.assert_awaited_once()
+
+    book = BookDBModel(id=1, name="Book 1", genre="Fantasy")
+    db_result.all.return_value = [book]
+    await invalidate_book(book.id)
+
+    result = await list_cached_books(fake_db_session, BookFilter(genre="fantasy"))
+    assert result == [book]
+    cached = await list_cached_books(fake_db_session, filters)
+    assert [(b.id, b.name) for b in cached] == [(1, "Book 1")]
+
+
+@pytest.mark.asyncio
+async def test_get_cached_books_single_query(monkeypatch, fake_db_session):
+    cache = MemoryCache(max_size=10, ttl=60)
+    monkeypatch.setattr("app.crud.book.book_cache", cache)
+    await cache.set(book_cache_key(1), BookDBModel(id=1, name="Cached"))
+    db_result = MagicMock()
+    db_result.all.return_value = [BookDBModel(id=3, name="Three")]
+    fake_db_session.execute.return_value = db_result
+
+    books, missing = await get_cached_books(fake_db_session, [3, 1, 2, 3])
+
+    assert [book.id for book in books] == [3, 1]
+    assert missing == [2]
+    stmt = fake_db_session.execute.call_args.args[0]
+    assert "book.id IN (__[POSTCOMPILE_id_1])" in str(stmt)
+
+    books, missing = await get_cached_books(fake_db_session, [2, 3])
+    assert [book.id for book in books] == [3]
+    assert missing == [2]
+    fake_db_session.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_fetch_books_uses_any_on_postgres(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+    fake_db_session.execute.return_value = MagicMock()
+
+    await fetch_books(fake_db_session, [1, 2])
+
+    sql = str(
+        fake_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "book.id = ANY (%(book_ids)s::BIGINT[])" in sql
+
+
+def test_count_cache_key_ignores_paging():
+    assert count_cache_key(BookFilter(name="Dune", limit=10, offset=2)) == (
+        count_cache_key(BookFilter(name="dune", sort="name"))
+    )
+    assert count_cache_key(BookFilter(name="Dune")) != count_cache_key(BookFilter())
+
+
+@pytest.mark.asyncio
+async def test_total_count_exact_is_cached(monkeypatch, fake_db_session):
+    monkeypatch.setattr("app.crud.book.count_cache", MemoryCache(max_size=10, ttl=60))
+    fake_db_session.scalar.return_value = 42
+
+    for _ in range(2):
+        assert await total_count(
+            fake_db_session, BookFilter(genre="Sci-Fi"), "exact"
+        ) == (
+            42,
+            "exact",
+        )
+    fake_db_session.scalar.assert_awaited_once()
+    assert "count(*)" in str(fake_db_session.scalar.call_args.args[0])
+
+    # Nothing to estimate from on SQLite.
+    assert await total_count(
+        fake_db_session, BookFilter(genre="Sci-Fi"), "estimated"
+    ) == (
+        42,
+        "exact",
+    )
+
+
+@pytest.mark.asyncio
+async def test_total_count_estimated_on_postgres(monkeypatch, fake_db_session):
+    monkeypatch.setattr("app.crud.book.count_cache", MemoryCache(max_size=10, ttl=60))
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+    fake_db_session.scalar.return_value = float(EXACT_COUNT_THRESHOLD * 5)
+
+    assert await total_count(fake_db_session, BookFilter(), "estimated") == (
+        EXACT_COUNT_THRESHOLD * 5,
+        "estimated",
+    )
+    assert "reltuples" in str(fake_db_session.scalar.call_args.args[0])
+
+    plan = [{"Plan": {"Plan Rows": EXACT_COUNT_THRESHOLD * 2}}]
+    fake_db_session.scalar.return_value = json.dumps(plan)
+    assert await total_count(fake_db_session, BookFilter(author="x"), "estimated") == (
+        EXACT_COUNT_THRESHOLD * 2,
+        "estimated",
+    )
+    sql = str(
+        fake_db_session.scalar.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert sql.startswith("EXPLAIN (FORMAT JSON) SELECT book.id")
+    assert "book.author ILIKE %(author_1)s" in sql
+
+    plan[0]["Plan"]["Plan Rows"] = 3
+    fake_db_session.scalar.side_effect = [json.dumps(plan), 3]
+    assert await total_count(fake_db_session, BookFilter(author="x"), "estimated") == (
+        3,
+        "exact",
+    )
+    sql = str(
+        fake_db_session.scalar.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert sql.startswith("SELECT count(*) AS count_1 \nFROM (SELECT book.id")
+    assert sql.endswith("LIMIT %(param_1)s::INTEGER) AS anon_1")
+
+    # Underestimated: the capped count overflows and is not cached as a total.
+    over = EXACT_COUNT_THRESHOLD + 1
+    fake_db_session.scalar.side_effect = [json.dumps(plan), over]
+    assert await total_count(fake_db_session, BookFilter(author="y"), "estimated") == (
+        over,
+        "estimated",
+    )
+    fake_db_session.scalar.side_effect = [json.dumps(plan), 5]
+    assert await total_count(fake_db_session, BookFilter(author="y"), "estimated") == (
+        5,
+        "exact",
+    )
+
+
+def _rows(*rows):
+    result = MagicMock()
+    result.all.return_value = [SimpleNamespace(**row) for row in rows]
+    return result
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_books_single_statement(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+    fake_db_session.execute.return_value = _rows(
+        {"id": 1, "genre": "Genre", "author": "Author"}
+    )
+    bulk = BookBulkUpdate(filter={"author": "Author"}, update=BookUpdate(name="New"))
+
+    with patch("app.crud.book.adjust_facets") as mock_adjust_facets:
+        assert await bulk_update_books(fake_db_session, bulk) == [1]
+
+    fake_db_session.execute.assert_awaited_once()
+    sql = str(
+        fake_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    # Exact matches only, with the rows locked in id order.
+    assert sql.startswith(
+        "UPDATE book SET name=%(name)s::VARCHAR WHERE book.id IN "
+        "(SELECT book.id \nFROM book \nWHERE book.author = %(author_1)s::VARCHAR "
+        "ORDER BY book.id FOR UPDATE)"
+    )
+    assert sql.endswith("RETURNING book.id, book.genre, book.author")
+    mock_adjust_facets.assert_not_called()
+    fake_db_session.commit.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_books_moves_facets(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+    fake_db_session.execute.side_effect = [
+        _rows(
+            {"id": 1, "genre": "Old", "author": "Author"},
+            {"id": 2, "genre": "Other", "author": "Author"},
+        ),
+        _rows(
+            {"id": 1, "genre": "New", "author": "Author"},
+            {"id": 2, "genre": "New", "author": "Author"},
+        ),
+    ]
+    bulk = BookBulkUpdate(filter={"author": "Author"}, update=BookUpdate(genre="New"))
+
+    with patch("app.crud.book.adjust_facets") as mock_adjust_facets:
+        assert await bulk_update_books(fake_db_session, bulk) == [1, 2]
+
+    locked, updated = (
+        str(call.args[0].compile(dialect=postgresql.dialect()))
+        for call in fake_db_session.execute.call_args_list
+    )
+    assert locked.endswith("ORDER BY book.id FOR UPDATE")
+    assert "WHERE book.id = ANY (%(book_ids)s::BIGINT[])" in updated
+    assert +mock_adjust_facets.call_args.args[1] == Counter({("genre", "New"): 2})
+    assert -mock_adjust_facets.call_args.args[1] == Counter(
+        {("genre", "Old"): 1, ("genre", "Other"): 1}
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_books(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+    fake_db_session.execute.return_value = _rows(
+        {"id": 1, "genre": "Genre", "author": "Author", "file_path": "store/ab"},
+        {"id": 2, "genre": "Genre", "author": "Author", "file_path": None},
+    )
+
+    with (
+        patch("app.crud.book.adjust_facets") as mock_adjust_facets,
+        patch(
+            "app.crud.book.release_files", return_value=["store/ab"]
+        ) as mock_release_files,
+        patch("app.crud.book.remove_unreferenced") as mock_remove_unreferenced,
+    ):
+        deleted, unreferenced = await bulk_delete_books(fake_db_session, [1, 2, 3])
+
+    assert (deleted, unreferenced) == ([1, 2], ["store/ab"])
+    sql = str(
+        fake_db_session.execute.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert sql.startswith(
+        "DELETE FROM book WHERE book.id IN (SELECT book.id \nFROM book \n"
+        "WHERE book.id = ANY (%(book_ids)s::BIGINT[]) ORDER BY book.id FOR UPDATE)"
+    )
+    assert sql.endswith("RETURNING book.id, book.genre, book.author, book.file_path")
+    assert mock_adjust_facets.call_args.args[1] == Counter(
+        {("genre", "Genre"): -2, ("author", "Author"): -2}
+    )
+    mock_release_files.assert_awaited_once_with(fake_db_session, ["store/ab", None])
+    mock_remove_unreferenced.assert_not_called()
@@ -0,0 +1,98 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+from app.crud.book import delete_book, insert_books, save_book, update_book
+from app.crud.book_facet import (
+    adjust_facets,
+    facet_deltas,
+    fetch_facets,
+    rebuild_facets,
+)
+from app.models import Base
+from app.models import Book as BookDBModel
+from app.schemas.requests import BookCreate, BookUpdate
+
+
+def book(name, author, genre):
+    return BookCreate(
+        name=name, author=author, genre=genre, date_published=date(2020, 1, 1)
+    )
+
+
+def test_facet_deltas():
+    books = [book("A", "Le Guin", "Fantasy"), book("B", "Le Guin", "Sci-Fi")]
+
+    assert facet_deltas(books, -1) == {
+        ("genre", "Fantasy"): -1,
+        ("genre", "Sci-Fi"): -1,
+        ("author", "Le Guin"): -2,
+    }
+
+
+@pytest.mark.asyncio
+async def test_adjust_facets_upserts_in_key_order(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+
+    await adjust_facets(
+        fake_db_session,
+        facet_deltas([book("A", "Herbert", "Sci-Fi")])
+        + facet_deltas([book("B", "Asimov", "Sci-Fi")]),
+    )
+
+    stmt = fake_db_session.execute.call_args.args[0]
+    params = stmt.compile(dialect=postgresql.dialect()).params
+    assert [params[f"value_m{i}"] for i in range(3)] == ["Asimov", "Herbert", "Sci-Fi"]
+    assert (
+        "ON CONFLICT (facet, value) DO UPDATE SET count = (book_facet.count + excluded.count)"
+        in str(stmt.compile(dialect=postgresql.dialect()))
+    )
+
+    fake_db_session.execute.reset_mock()
+    await adjust_facets(fake_db_session, facet_deltas([]))
+    fake_db_session.execute.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_facets_follow_writes(db_manager):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with db_manager.session() as session:
+        dune = await save_book(session, book("Dune", "Herbert", "Sci-Fi"))
+        await insert_books(
+            session,
+            [
+                book("Emma", "Austen", "Classic"),
+                book("Persuasion", "Austen", "Classic"),
+            ],
+        )
+        await session.commit()
+        await update_book(session, dune.id, BookUpdate(genre="Classic"))
+
+        facets = await fetch_facets(session, 10)
+        assert facets["genre"] == [{"value": "Classic", "count": 3}]
+        assert facets["author"] == [
+            {"value": "Austen", "count": 2},
+            {"value": "Herbert", "count": 1},
+        ]
+
+        await delete_book(session, dune.id)
+        facets = await fetch_facets(session, 1)
+        assert facets == {
+            "genre": [{"value": "Classic", "count": 2}],
+            "author": [{"value": "Austen", "count": 2}],
+        }
+
+        # Rows written around the crud layer are picked up by a rebuild.
+        await session.execute(
+            insert(BookDBModel).values(
+                name="Raw", author="Raw", genre="Raw", date_published=date(2020, 1, 1)
+            )
+        )
+        await rebuild_facets(session)
+        assert {"value": "Raw", "count": 1} in (await fetch_facets(session, 10))[
+            "genre"
+        ]
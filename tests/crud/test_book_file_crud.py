@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock, patch
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app.crud.book_file import acquire_file, release_file, release_files
+from app.helper.book_file import SavedFile
+
+
+@pytest.mark.asyncio
+async def test_acquire_file_upserts_reference(fake_db_session):
+    fake_db_session.get_bind.return_value.dialect.name = "postgresql"
+    file = SavedFile(path="store/ab", size=3, sha256="ab", filename="book.pdf")
+
+    result = MagicMock()
+    result.one.return_value = "store/old"
+    fake_db_session.scalars.return_value = result
+
+    with patch("app.crud.book_file.store_file") as mock_store_file:
+        assert await acquire_file(fake_db_session, file) == "store/old"
+    # Put in place under the path the row refers to, once the row exists.
+    mock_store_file.assert_called_once_with(file, "store/old")
+
+    sql = str(
+        fake_db_session.scalars.call_args.args[0].compile(dialect=postgresql.dialect())
+    )
+    assert "ON CONFLICT (sha256) DO UPDATE SET ref_count" in sql
+    assert "book_file.ref_count + " in sql
+    assert sql.endswith("RETURNING book_file.path")
+
+
+@pytest.mark.asyncio
+async def test_release_file_still_referenced(fake_db_session):
+    result = MagicMock()
+    result.__iter__.return_value = iter([("store/ab", 1)])
+    fake_db_session.execute.return_value = result
+
+    assert await release_file(fake_db_session, "store/ab") is False
+    fake_db_session.execute.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_release_file_last_reference(fake_db_session):
+    result = MagicMock()
+    result.__iter__.return_value = iter([("store/ab", 0)])
+    fake_db_session.execute.return_value = result
+
+    assert await release_file(fake_db_session, "store/ab") is True
+
+    delete_stmt = fake_db_session.execute.call_args_list[1].args[0]
+    assert str(delete_stmt).startswith("DELETE FROM book_file")
+
+
+@pytest.mark.asyncio
+async def test_release_file_without_path(fake_db_session):
+    assert await release_file(fake_db_session, None) is False
+    fake_db_session.execute.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_release_files_one_update_per_count(fake_db_session):
+    shared, single = MagicMock(), MagicMock()
+    shared.__iter__.return_value = iter([("store/cd", 1)])
+    single.__iter__.return_value = iter([("store/ab", 0)])
+    fake_db_session.execute.side_effect = [single, shared, MagicMock()]
+
+    paths = ["store/ab", "store/cd", None, "store/cd", "store/ef"]
+    assert await release_files(fake_db_session, paths) == ["store/ab", "store/ef"]
+
+    statements = [call.args[0] for call in fake_db_session.execute.call_args_list]
+    sql = [str(stmt.compile(dialect=postgresql.dialect())) for stmt in statements]
+    assert sql[0].startswith("UPDATE book_file SET ref_count=(book_file.ref_count -")
+    # Paths losing one reference first, then the path losing two.
+    counts = [stmt.compile().params["ref_count_1"] for stmt in statements[:2]]
+    assert counts == [1, 2]
+    assert sql[2].startswith("DELETE FROM book_file")
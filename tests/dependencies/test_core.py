@@ -0,0 +1,27 @@
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+from app.dependencies.core import READ_PRIMARY_COOKIE, get_db_session
+
+
+def make_request(method):
+    return Request({"type": "http", "method": method, "headers": []})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "method, has_replicas, pinned",
+    [("POST", True, True), ("GET", True, False), ("PUT", False, False)],
+)
+async def test_writes_pin_reads_to_primary(monkeypatch, method, has_replicas, pinned):
+    monkeypatch.setattr(
+        "app.dependencies.core.sessionmanager._replicas", [object()] * has_replicas
+    )
+    response = Response()
+
+    sessions = get_db_session(make_request(method), response)
+    await anext(sessions)
+    await sessions.aclose()
+
+    assert (READ_PRIMARY_COOKIE in response.headers.get("set-cookie", "")) is pinned
@@ -1,11 +1,29 @@
+import hashlib
 import os
 import tempfile
+from http import HTTPStatus
 from unittest.mock import patch
 
 import pytest
-from fastapi import UploadFile
-
-from app.helper.book_file import get_basename, is_file_exists, remove_file, save_file
+from fastapi import HTTPException, UploadFile
+
+from app.core.config import get_settings
+from app.helper import book_file
+from app.helper.book_file import (
+    AccessStats,
+    compress_file,
+    compressed_path,
+    decompress_file,
+    get_basename,
+    is_file_exists,
+    other_layout,
+    read_head,
+    remove_file,
+    resolve_file,
+    save_file,
+    shard_path,
+    store_file,
+)
 
 
 @pytest.mark.asyncio
@@ -17,9 +35,16 @@ async def test_save_file_creates_file():
     with open(tmp_file.name, "rb") as f:
         upload_file = UploadFile(filename="testfile.txt", file=f)
 
-        saved_path = save_file(upload_file)
+        saved = await save_file(upload_file)
+        saved_path = saved.path
 
+        # Put in place by acquire_file once a row references it.
+        assert not os.path.exists(saved_path)
+        store_file(saved, saved_path)
+        assert not os.path.exists(saved.source)
         assert os.path.exists(saved_path)
+        assert saved.size == len(b"Test content")
+        assert saved.sha256 == hashlib.sha256(b"Test content").hexdigest()
 
         with open(saved_path, "rb") as saved_file:
             content = saved_file.read()
@@ -31,6 +56,62 @@ async def test_save_file_creates_file():
     os.remove(tmp_file.name)
 
 
+@pytest.mark.asyncio
+async def test_save_file_deduplicates_content(upload_file, monkeypatch, tmp_path):
+    monkeypatch.setattr("app.helper.book_file.UPLOAD_DIR", str(tmp_path))
+
+    first = await save_file(upload_file(content=b"Same", filename="a.pdf"))
+    second = await save_file(upload_file(content=b"Same", filename="b.pdf"))
+    store_file(first, first.path)
+    store_file(second, second.path)
+
+    assert first.path == second.path == shard_path(str(tmp_path), first.sha256)
+    assert (first.filename, second.filename) == ("a.pdf", "b.pdf")
+    assert os.listdir(tmp_path) == [first.sha256[:2]]
+
+
+@pytest.mark.asyncio
+async def test_save_file_keeps_flat_copy(upload_file, monkeypatch, tmp_path):
+    monkeypatch.setattr("app.helper.book_file.UPLOAD_DIR", str(tmp_path))
+    flat = tmp_path / hashlib.sha256(b"Old").hexdigest()
+    flat.write_bytes(b"Old")
+
+    saved = await save_file(upload_file(content=b"Old"))
+    store_file(saved, saved.path)
+
+    assert saved.path == str(flat)
+    assert os.listdir(tmp_path) == [flat.name]
+
+
+def test_resolve_file_across_layouts(tmp_path):
+    digest = hashlib.sha256(b"Moved").hexdigest()
+    flat = str(tmp_path / digest)
+    sharded = shard_path(str(tmp_path), digest)
+    assert other_layout(flat) == sharded
+    assert other_layout(sharded) == flat
+    assert other_layout(str(tmp_path / "legacy.pdf")) is None
+
+    os.makedirs(os.path.dirname(sharded))
+    with open(sharded, "wb") as file:
+        file.write(b"Moved")
+
+    assert resolve_file(flat).path == sharded
+    assert resolve_file(sharded).path == sharded
+
+
+@pytest.mark.asyncio
+async def test_save_file_rejects_oversized_upload(upload_file, monkeypatch, tmp_path):
+    monkeypatch.setattr("app.helper.book_file.UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(get_settings().storage, "max_upload_size", 4)
+    monkeypatch.setattr(get_settings().storage, "chunk_size", 2)
+
+    with pytest.raises(HTTPException) as exc:
+        await save_file(upload_file(content=b"Too large"))
+
+    assert exc.value.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert os.listdir(tmp_path) == []
+
+
 def test_is_file_exists_true_and_false(tmp_path):
     existing_file = tmp_path / "existing_file.txt"
     existing_file.write_text("Test")
@@ -75,3 +156,73 @@ def test_remove_file_when_not_exists():
         remove_file("/fake/path/to/file.txt")
 
         mock_remove.assert_not_called()
+
+
+def test_compress_and_restore_file(tmp_path):
+    content = b"A chapter that repeats itself. " * 1000
+    path = tmp_path / hashlib.sha256(content).hexdigest()
+    path.write_bytes(content)
+    mtime = 1_000_000
+    os.utime(path, (mtime, mtime))
+
+    saved = compress_file(str(path), level=6)
+
+    assert saved > 0
+    assert not path.exists()
+    blob = resolve_file(str(path))
+    assert blob.compressed and blob.path == compressed_path(str(path))
+    assert blob.stat.st_mtime == mtime
+    assert read_head(str(path), 9) == b"A chapter"
+    assert is_file_exists(str(path))
+
+    assert decompress_file(str(path)) is True
+    assert path.read_bytes() == content
+    assert not resolve_file(str(path)).compressed
+    assert decompress_file(str(path)) is False
+
+    compress_file(str(path), level=6)
+    remove_file(str(path))
+    assert os.listdir(tmp_path) == []
+
+
+def test_compress_file_removed_meanwhile(monkeypatch, tmp_path):
+    path = tmp_path / "book"
+    path.write_bytes(b"Deleted while it was being compressed. " * 100)
+    atomic_copy = book_file._atomic_copy
+
+    def copy_then_delete(*args, **kwargs):
+        size = atomic_copy(*args, **kwargs)
+        remove_file(str(path))
+        return size
+
+    monkeypatch.setattr(book_file, "_atomic_copy", copy_then_delete)
+
+    assert compress_file(str(path), level=6) == 0
+    assert compress_file(str(tmp_path / "missing"), level=6) == 0
+    assert decompress_file(str(tmp_path / "missing")) is False
+
+
+@pytest.mark.parametrize(
+    "content",
+    [b"", b"\x89PNG\r\n\x1a\n" + b"\0" * 4096, os.urandom(4096)],
+    ids=["empty", "png", "random"],
+)
+def test_compress_file_skips_incompressible(tmp_path, content):
+    path = tmp_path / "book"
+    path.write_bytes(content)
+
+    assert compress_file(str(path), level=6) == 0
+    assert os.listdir(tmp_path) == ["book"]
+
+
+def test_access_stats_drain():
+    stats = AccessStats()
+    stats.record("a")
+    stats.record("a")
+    stats.record("b")
+
+    counts, last_access = stats.drain()
+
+    assert counts == {"a": 2, "b": 1}
+    assert set(last_access) == {"a", "b"}
+    assert stats.drain() == ({}, {})
@@ -0,0 +1,133 @@
+import logging
+import os
+import time
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.helper.book_file_gc import reconcile_uploads, remove_released_files
+from app.models import Base, BookFile
+from app.models import Book as BookDBModel
+
+
+def write(path, content=b"data", age=0.0):
+    path.write_bytes(content)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_uploads(monkeypatch, caplog, db_manager, tmp_path):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    previews = tmp_path.parent / f"{tmp_path.name}-previews"
+    previews.mkdir()
+    monkeypatch.setattr("app.helper.book_file_gc.PREVIEW_DIR", str(previews))
+
+    hour = 3600
+    referenced = write(tmp_path / ("a" * 64), age=2 * hour)
+    legacy = write(tmp_path / "legacy.pdf", age=2 * hour)
+    cold = write(tmp_path / f"{'d' * 64}.gz", age=2 * hour)
+    (tmp_path / "ee" / "ee").mkdir(parents=True)
+    sharded = write(tmp_path / "ee" / "ee" / ("e" * 64), age=2 * hour)
+    sharded_orphan = write(tmp_path / "ee" / "ee" / ("f" * 64), age=2 * hour)
+    orphan = write(tmp_path / ("b" * 64), b"orphan", age=2 * hour)
+    stale_temp = write(tmp_path / ".upload-abc", b"partial", age=2 * hour)
+    fresh_temp = write(tmp_path / ".upload-def", b"uploading")
+    (tmp_path / "nested").mkdir()
+    (tmp_path / ".partial").mkdir()
+    resumable = write(tmp_path / ".partial" / ("1" * 32), age=2 * hour)
+    write(previews / f"{'a' * 64}.pdf", age=2 * hour)
+    write(previews / f"{'b' * 64}.png", age=2 * hour)
+    write(previews / f"{'c' * 64}.png")
+    write(previews / f"{'d' * 64}.png", age=2 * hour)
+    write(previews / ".render-abc", age=2 * hour)
+    write(previews / ".extract-def")
+    async with db_manager.session() as session:
+        session.add(BookFile(path=referenced, ref_count=1))
+        session.add(BookFile(path=str(tmp_path / ("d" * 64)), ref_count=1))
+        session.add(BookFile(path=sharded, ref_count=1))
+        session.add_all(
+            BookDBModel(
+                name=name,
+                author="Author",
+                genre="Genre",
+                date_published=date(2020, 1, 1),
+                file_path=path,
+            )
+            for name, path in [
+                ("Stored", referenced),
+                ("Legacy", legacy),
+                ("Gone", str(tmp_path / "gone.pdf")),
+                ("No file", None),
+                ("Cold", str(tmp_path / ("d" * 64))),
+            ]
+        )
+        await session.commit()
+
+    with caplog.at_level(logging.INFO, logger="app.helper.book_file_gc"):
+        report = await reconcile_uploads(
+            db_manager, str(tmp_path), grace_period=hour, batch_size=2, dry_run=True
+        )
+    assert (report.removed_files, report.removed_bytes) == (
+        3,
+        len(b"orphanpartialdata"),
+    )
+    assert os.path.exists(orphan)
+    assert f"Would remove unreferenced upload {orphan}" in caplog.messages
+    assert not any(message.startswith("Removed") for message in caplog.messages)
+
+    report = await reconcile_uploads(
+        db_manager, str(tmp_path), grace_period=hour, batch_size=2
+    )
+
+    assert report.scanned_files == len(
+        [referenced, legacy, cold, sharded, sharded_orphan]
+        + [orphan, stale_temp, fresh_temp]
+    )
+    assert report.removed_files == len([orphan, stale_temp, sharded_orphan])
+    assert os.listdir(tmp_path / "ee" / "ee") == ["e" * 64]
+    # Resumable uploads expire on their own schedule.
+    assert os.path.exists(resumable)
+    assert sorted(os.listdir(tmp_path)) == sorted(
+        [".partial", ".upload-def", "a" * 64, f"{'d' * 64}.gz", "ee"]
+        + ["legacy.pdf", "nested"]
+    )
+    assert report.scanned_books == len(["Stored", "Legacy", "Gone", "Cold"])
+    assert report.missing_files == 1
+    assert report.missing_book_ids == [3]
+    # The orphan's blob and the abandoned render are gone now; the fresh ones
+    # are still in their grace period.
+    assert report.removed_previews == len([f"{'b' * 64}.png", ".render-abc"])
+    assert sorted(os.listdir(previews)) == [
+        ".extract-def",
+        f"{'a' * 64}.pdf",
+        f"{'c' * 64}.png",
+        f"{'d' * 64}.png",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_remove_released_files_keeps_reacquired(db_manager, tmp_path):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    released = write(tmp_path / ("a" * 64))
+    reacquired = write(tmp_path / ("b" * 64))
+    # The same content uploaded again, stored under its sharded path.
+    moved = write(tmp_path / ("c" * 64))
+    async with db_manager.session() as session:
+        session.add(BookFile(path=reacquired, sha256="b" * 64, ref_count=1))
+        session.add(BookFile(path="elsewhere", sha256="c" * 64, ref_count=1))
+        await session.commit()
+
+    removed = await remove_released_files(
+        db_manager, [released, reacquired, moved], batch_size=2
+    )
+
+    assert removed == 1
+    assert sorted(os.listdir(tmp_path)) == ["b" * 64, "c" * 64]
+    async with db_manager.session() as session:
+        paths = (await session.scalars(select(BookFile.path))).all()
+    assert sorted(paths) == sorted([reacquired, "elsewhere"])
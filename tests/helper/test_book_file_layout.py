@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import os
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.helper.book_file import resolve_file, shard_path
+from app.helper.book_file_layout import shard_uploads
+from app.models import Base, BookFile
+from app.models import Book as BookDBModel
+
+
+def digest_of(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+@pytest.mark.asyncio
+async def test_shard_uploads(db_manager, tmp_path):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    upload_dir = str(tmp_path)
+    hot, cold = digest_of(b"hot"), digest_of(b"cold")
+    (tmp_path / hot).write_bytes(b"hot")
+    (tmp_path / f"{cold}.gz").write_bytes(b"gzipped cold")
+    (tmp_path / "legacy.pdf").write_bytes(b"legacy")
+    (tmp_path / ".upload-abc").write_bytes(b"partial")
+    paths = [str(tmp_path / hot), str(tmp_path / cold), str(tmp_path / "legacy.pdf")]
+    async with db_manager.session() as session:
+        session.add_all(BookFile(path=path, ref_count=1) for path in paths)
+        session.add_all(
+            BookDBModel(
+                name=f"Book {index}",
+                author="Author",
+                genre="Genre",
+                date_published=date(2020, 1, 1),
+                file_path=path,
+            )
+            for index, path in enumerate(paths)
+        )
+        await session.commit()
+
+    report = await shard_uploads(db_manager, upload_dir, batch_size=2, dry_run=True)
+    assert (report.scanned_files, report.moved_files) == (4, 3)
+    assert os.path.exists(paths[0])
+
+    report = await shard_uploads(db_manager, upload_dir, batch_size=2)
+
+    legacy = digest_of(b"legacy")
+    assert report.moved_files == len([hot, cold, legacy])
+    expected = [shard_path(upload_dir, digest) for digest in (hot, cold, legacy)]
+    assert resolve_file(expected[0]).path == expected[0]
+    assert resolve_file(expected[1]).path == expected[1] + ".gz"
+    assert resolve_file(expected[2]).path == expected[2]
+    assert set(os.listdir(tmp_path)) == {".upload-abc", hot[:2], cold[:2], legacy[:2]}
+    async with db_manager.session() as session:
+        book_paths = (
+            await session.scalars(select(BookDBModel.file_path).order_by("id"))
+        ).all()
+        blob_paths = (await session.scalars(select(BookFile.path))).all()
+        legacy_blob = await session.get(BookFile, expected[2])
+    assert list(book_paths) == expected
+    assert sorted(blob_paths) == sorted(expected)
+    assert (legacy_blob.sha256, legacy_blob.size) == (legacy, len(b"legacy"))
+
+    report = await shard_uploads(db_manager, upload_dir)
+    assert report.moved_files == 0
+
+
+@pytest.mark.asyncio
+async def test_shard_uploads_folds_legacy_duplicates(db_manager, tmp_path):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    upload_dir = str(tmp_path)
+    same, stored = digest_of(b"same"), digest_of(b"stored")
+    (tmp_path / "1_book.txt").write_bytes(b"same")
+    (tmp_path / "2_book.txt.gz").write_bytes(gzip.compress(b"same"))
+    (tmp_path / "3_book.txt").write_bytes(b"stored")
+    (tmp_path / "4_orphan.txt").write_bytes(b"orphan")
+    stored_path = shard_path(upload_dir, stored)
+    os.makedirs(os.path.dirname(stored_path))
+    with open(stored_path, "wb") as file:
+        file.write(b"stored")
+    legacy = {
+        str(tmp_path / "1_book.txt"): 2,
+        str(tmp_path / "2_book.txt"): 1,
+        str(tmp_path / "3_book.txt"): 1,
+    }
+    async with db_manager.session() as session:
+        session.add_all(
+            BookFile(path=path, ref_count=ref_count)
+            for path, ref_count in legacy.items()
+        )
+        session.add(BookFile(path=stored_path, sha256=stored, size=6, ref_count=1))
+        session.add_all(
+            BookDBModel(
+                name=f"Book {index}",
+                author="Author",
+                genre="Genre",
+                date_published=date(2020, 1, 1),
+                file_path=path,
+            )
+            for index, path in enumerate(legacy)
+        )
+        await session.commit()
+
+    report = await shard_uploads(db_manager, upload_dir)
+
+    assert report.moved_files == len(legacy)
+    assert set(os.listdir(tmp_path)) == {"4_orphan.txt", same[:2], stored[:2]}
+    same_path = shard_path(upload_dir, same)
+    async with db_manager.session() as session:
+        book_paths = (
+            await session.scalars(select(BookDBModel.file_path).order_by("id"))
+        ).all()
+        blobs = (
+            await session.execute(
+                select(BookFile.path, BookFile.sha256, BookFile.ref_count).order_by(
+                    BookFile.ref_count
+                )
+            )
+        ).all()
+    assert list(book_paths) == [same_path, same_path, stored_path]
+    assert [tuple(blob) for blob in blobs] == [
+        (stored_path, stored, 2),
+        (same_path, same, 3),
+    ]
+    assert resolve_file(same_path).path == same_path
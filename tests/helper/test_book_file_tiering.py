@@ -0,0 +1,101 @@
+import os
+import time
+
+import pytest
+from sqlalchemy import select
+
+from app.helper.book_file import AccessStats, compress_file, resolve_file
+from app.helper.book_file_tiering import _try_lock, tier_files
+from app.models import Base, BookFile
+
+DAY = 24 * 3600
+TEXT = b"Plain text compresses well. " * 2000
+
+
+def write(path, content=TEXT, age=0.0):
+    path.write_bytes(content)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+@pytest.mark.asyncio
+async def test_tier_files(monkeypatch, db_manager, tmp_path):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    stats = AccessStats()
+    monkeypatch.setattr("app.helper.book_file_tiering.access_stats", stats)
+
+    cold = write(tmp_path / "cold", age=30 * DAY)
+    fresh = write(tmp_path / "fresh")
+    downloaded = write(tmp_path / "downloaded", age=30 * DAY)
+    popular = write(tmp_path / "popular", age=30 * DAY)
+    compress_file(popular, level=6)
+    jpeg = write(tmp_path / "jpeg", b"\xff\xd8\xff" + os.urandom(1024), age=30 * DAY)
+    async with db_manager.session() as session:
+        session.add_all(
+            BookFile(path=path, ref_count=1)
+            for path in (cold, fresh, downloaded, popular, jpeg)
+        )
+        await session.commit()
+    stats.record(downloaded)
+    for _ in range(3):
+        stats.record(popular)
+
+    report = await tier_files(db_manager, cold_after=7 * DAY, batch_size=2)
+
+    assert report.downloaded_files == len([downloaded, popular])
+    assert report.promoted_files == 1
+    assert report.scanned_files == len([cold, fresh, jpeg])
+    assert report.compressed_files == 1
+    assert report.saved_bytes > 0
+    tiers = {
+        os.path.basename(path): resolve_file(path).compressed
+        for path in (cold, fresh, downloaded, popular, jpeg)
+    }
+    assert tiers == {
+        "cold": True,
+        "fresh": False,
+        "downloaded": False,
+        "popular": False,
+        "jpeg": False,
+    }
+    async with db_manager.session() as session:
+        rows = await session.execute(
+            select(BookFile.path, BookFile.download_count).where(
+                BookFile.last_downloaded_at.is_not(None)
+            )
+        )
+        assert {row.path: row.download_count for row in rows} == {
+            downloaded: 1,
+            popular: 3,
+        }
+
+
+@pytest.mark.asyncio
+async def test_tier_files_compresses_in_one_process(monkeypatch, db_manager, tmp_path):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    stats = AccessStats()
+    monkeypatch.setattr("app.helper.book_file_tiering.access_stats", stats)
+    lock_path = str(tmp_path / ".locks" / "tier")
+    monkeypatch.setattr("app.helper.book_file_tiering.LOCK_PATH", lock_path)
+
+    cold = write(tmp_path / "cold", age=30 * DAY)
+    async with db_manager.session() as session:
+        session.add(BookFile(path=cold, ref_count=1))
+        await session.commit()
+    stats.record(cold)
+
+    with _try_lock(lock_path) as locked:
+        assert locked
+        report = await tier_files(db_manager, cold_after=0)
+
+    # Downloads are still flushed while another process compresses.
+    assert report.compression_skipped
+    assert (report.downloaded_files, report.scanned_files) == (1, 0)
+    assert not resolve_file(cold).compressed
+
+    report = await tier_files(db_manager, cold_after=0)
+    assert not report.compression_skipped
+    assert report.compressed_files == 1
@@ -0,0 +1,79 @@
+import io
+
+import pytest
+from sqlalchemy import select
+
+from app.crud.book import list_generation
+from app.helper.book_import import guess_format, import_books, parse_rows
+from app.models import Base
+from app.models import Book as BookDBModel
+from app.schemas.requests import BookCreate
+
+CSV_DATA = """name,author,genre,date_published
+Dune,Frank Herbert,Sci-Fi,1965-08-01
+Broken,Nobody,Sci-Fi,not-a-date
+Emma,Jane Austen,Classic,1815-12-23
+"""
+
+NDJSON_DATA = """{"name": "Dune", "author": "Frank Herbert", "genre": "Sci-Fi", "date_published": "1965-08-01"}
+
+{not json
+{"name": "Emma", "author": "Jane Austen", "date_published": "1815-12-23"}
+"""
+
+
+def test_guess_format():
+    assert guess_format("catalog.ndjson") == "ndjson"
+    assert guess_format("catalog.JSONL") == "ndjson"
+    assert guess_format("catalog.csv") == "csv"
+    assert guess_format(None) == "csv"
+
+
+def test_parse_rows_csv():
+    rows = list(parse_rows(io.StringIO(CSV_DATA), "csv"))
+
+    assert [line for line, _ in rows] == [2, 3, 4]
+    assert isinstance(rows[0][1], BookCreate)
+    assert rows[1][1].startswith("date_published:")
+    assert rows[2][1].name == "Emma"
+
+
+def test_parse_rows_ndjson():
+    rows = list(parse_rows(io.StringIO(NDJSON_DATA), "ndjson"))
+
+    assert [line for line, _ in rows] == [1, 3, 4]
+    assert rows[0][1].name == "Dune"
+    assert rows[1][1].startswith("row: invalid JSON")
+    assert rows[2][1] == "genre: Field required"
+
+
+@pytest.mark.asyncio
+async def test_import_books_batches_valid_rows(db_manager):
+    async with db_manager.connect() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    async with db_manager.session() as session:
+        result = await import_books(session, io.StringIO(CSV_DATA), "csv", 1)
+
+        assert (result.inserted, result.failed) == (2, 1)
+        assert [error.line for error in result.errors] == [3]
+
+        names = (await session.scalars(select(BookDBModel.name))).all()
+        assert sorted(names) == ["Dune", "Emma"]
+
+
+@pytest.mark.asyncio
+async def test_import_books_invalidates_after_commit(fake_db_session):
+    generations = []
+
+    async def commit():
+        generations.append(list_generation.value)
+
+    fake_db_session.commit.side_effect = commit
+    before = list_generation.value
+
+    await import_books(fake_db_session, io.StringIO(CSV_DATA), "csv", 1)
+
+    # Listings cached before a commit keep the old generation.
+    assert generations == [before, before + 1]
+    assert list_generation.value == before + len(generations)
@@ -0,0 +1,170 @@
+import asyncio
+import gzip
+import hashlib
+import os
+
+import pymupdf
+import pytest
+
+from app.core.cache import MemoryCache
+from app.helper import book_preview
+from app.helper.book_preview import (
+    ensure_preview,
+    ensure_thumbnail,
+    guess_media_type,
+    preview_path,
+    shutdown_pool,
+    thumbnail_path,
+)
+
+
+def store(directory, content):
+    path = directory / hashlib.sha256(content).hexdigest()
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_guess_media_type(tmp_path):
+    pdf = tmp_path / "upload"
+    pdf.write_bytes(b"%PDF-1.7\n...")
+    text = tmp_path / "notes"
+    text.write_bytes(b"plain")
+
+    assert guess_media_type(str(pdf), "book.txt") == "application/pdf"
+    assert guess_media_type(str(text), "notes.txt") == "text/plain"
+    assert guess_media_type(str(text)) == "application/octet-stream"
+
+
+@pytest.mark.asyncio
+async def test_ensure_preview_skips_non_pdf(monkeypatch, tmp_path):
+    monkeypatch.setattr(book_preview, "PREVIEW_DIR", str(tmp_path))
+    source = store(tmp_path, b"not a pdf")
+
+    assert await ensure_preview(source) is None
+    assert await ensure_preview(str(tmp_path / "legacy.pdf")) is None
+
+
+@pytest.mark.asyncio
+async def test_ensure_preview_renders_once(monkeypatch, tmp_path):
+    monkeypatch.setattr(book_preview, "PREVIEW_DIR", str(tmp_path))
+    with pymupdf.open() as document:
+        for number in range(8):
+            document.new_page().insert_text((72, 72), f"Page {number}")
+        source = store(tmp_path, document.tobytes())
+
+    calls = []
+    generate = book_preview._generate
+
+    async def counting_generate(*args):
+        calls.append(args)
+        return await generate(*args)
+
+    monkeypatch.setattr(book_preview, "_generate", counting_generate)
+    try:
+        digests = await asyncio.gather(*(ensure_preview(source) for _ in range(3)))
+        thumbnail = await ensure_thumbnail(source)
+    finally:
+        shutdown_pool()
+
+    digest = digests[0]
+    assert digests == [digest] * 3
+    assert len(calls) == 1
+    with pymupdf.open(preview_path(digest)) as preview:
+        assert len(preview) == book_preview.get_settings().storage.preview_pages
+    assert thumbnail == thumbnail_path(digest)
+    with open(thumbnail, "rb") as file:
+        assert file.read(8) == b"\x89PNG\r\n\x1a\n"
+
+
+@pytest.mark.asyncio
+async def test_ensure_preview_from_compressed_source(monkeypatch, tmp_path):
+    previews = tmp_path / "previews"
+    previews.mkdir()
+    monkeypatch.setattr(book_preview, "PREVIEW_DIR", str(previews))
+    with pymupdf.open() as document:
+        document.new_page().insert_text((72, 72), "Cold page")
+        source = str(tmp_path / hashlib.sha256(document.tobytes()).hexdigest())
+        with gzip.open(source + ".gz", "wb") as file:
+            file.write(document.tobytes())
+
+    assert guess_media_type(source) == "application/pdf"
+    try:
+        digest = await ensure_preview(source)
+    finally:
+        shutdown_pool()
+
+    assert digest is not None
+    # The decompressed copy rendered from is gone.
+    assert sorted(os.listdir(previews)) == [f"{digest}.pdf", f"{digest}.png"]
+
+
+@pytest.mark.asyncio
+async def test_ensure_preview_retries_transient_failures(monkeypatch, tmp_path):
+    monkeypatch.setattr(book_preview, "PREVIEW_DIR", str(tmp_path))
+    monkeypatch.setattr(book_preview, "_unrenderable", MemoryCache(10, 60))
+    broken = store(tmp_path, b"%PDF-1.7\nnot really")
+    with pymupdf.open() as document:
+        document.new_page()
+        source = store(tmp_path, document.tobytes())
+
+    class BrokenPool:
+        def submit(self, *args):
+            raise RuntimeError("pool is broken")
+
+    get_pool = book_preview.get_pool
+    monkeypatch.setattr(book_preview, "get_pool", BrokenPool)
+    assert await ensure_preview(source) is None
+
+    monkeypatch.setattr(book_preview, "get_pool", get_pool)
+    calls = []
+    generate = book_preview._generate
+
+    async def counting_generate(*args):
+        calls.append(args)
+        return await generate(*args)
+
+    monkeypatch.setattr(book_preview, "_generate", counting_generate)
+    try:
+        # The pool failure is retried; the file pymupdf can't parse is not.
+        assert await ensure_preview(source) is not None
+        assert await ensure_preview(broken) is None
+        assert await ensure_preview(broken) is None
+    finally:
+        shutdown_pool()
+    assert [args[0] for args in calls] == [source, broken]
+
+
+@pytest.mark.asyncio
+async def test_ensure_preview_skips_encrypted_and_empty(monkeypatch, tmp_path):
+    monkeypatch.setattr(book_preview, "PREVIEW_DIR", str(tmp_path))
+    monkeypatch.setattr(book_preview, "_unrenderable", MemoryCache(10, 60))
+    with pymupdf.open() as document:
+        document.new_page()
+        encrypted = store(
+            tmp_path,
+            document.tobytes(
+                encryption=pymupdf.PDF_ENCRYPT_AES_256, user_pw="user", owner_pw="owner"
+            ),
+        )
+    # pymupdf won't write a document without pages.
+    empty = store(
+        tmp_path,
+        b"%PDF-1.4\n1 0 obj<</Type/Catalog/Pages 2 0 R>>endobj\n"
+        b"2 0 obj<</Type/Pages/Kids[]/Count 0>>endobj\n"
+        b"trailer<</Root 1 0 R>>\n%%EOF\n",
+    )
+
+    calls = []
+    generate = book_preview._generate
+
+    async def counting_generate(*args):
+        calls.append(args)
+        return await generate(*args)
+
+    monkeypatch.setattr(book_preview, "_generate", counting_generate)
+    try:
+        for source in (encrypted, empty, encrypted, empty):
+            assert await ensure_preview(source) is None
+    finally:
+        shutdown_pool()
+    assert [args[0] for args in calls] == [encrypted, empty]
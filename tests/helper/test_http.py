@@ -0,0 +1,80 @@
+import pytest
+from starlette.datastructures import Headers
+
+from app.core.config import get_settings
+from app.helper.http import (
+    accepts_gzip,
+    content_disposition,
+    is_not_modified,
+    offload_headers,
+)
+
+ETAG = '"abc"'
+LAST_MODIFIED = "Sat, 18 Oct 2025 09:00:00 GMT"
+
+
+@pytest.mark.parametrize(
+    "headers, expected",
+    [
+        ({}, False),
+        ({"if-none-match": '"abc"'}, True),
+        ({"if-none-match": 'W/"abc"'}, True),
+        ({"if-none-match": '"xyz", "abc"'}, True),
+        ({"if-none-match": "*"}, True),
+        ({"if-none-match": '"xyz"'}, False),
+        ({"if-modified-since": "Sat, 18 Oct 2025 10:00:00 GMT"}, True),
+        ({"if-modified-since": "Sat, 18 Oct 2025 08:00:00 GMT"}, False),
+        ({"if-modified-since": "yesterday"}, False),
+        (
+            {
+                "if-none-match": '"xyz"',
+                "if-modified-since": "Sat, 18 Oct 2025 10:00:00 GMT",
+            },
+            False,
+        ),
+    ],
+)
+def test_is_not_modified(headers, expected):
+    assert is_not_modified(Headers(headers), ETAG, LAST_MODIFIED) is expected
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, False),
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("br, GZIP", True),
+        ("gzip;q=0", False),
+        ("gzip;q=zero", False),
+        ("identity", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding, expected):
+    headers = Headers(
+        {} if accept_encoding is None else {"accept-encoding": accept_encoding}
+    )
+    assert accepts_gzip(headers) is expected
+
+
+def test_content_disposition():
+    assert content_disposition("book.pdf") == 'attachment; filename="book.pdf"'
+    assert content_disposition("книга.pdf") == (
+        "attachment; filename*=utf-8''%D0%BA%D0%BD%D0%B8%D0%B3%D0%B0.pdf"
+    )
+
+
+def test_offload_headers(monkeypatch, tmp_path):
+    storage = get_settings().storage
+    path = str(tmp_path / "ab" / "cd" / "book name")
+    assert offload_headers(path) is None
+
+    monkeypatch.setattr(storage, "offload", "x-sendfile")
+    assert offload_headers(path) == {"x-sendfile": path}
+
+    monkeypatch.setattr(storage, "offload", "x-accel-redirect")
+    monkeypatch.setattr(storage, "offload_root", str(tmp_path))
+    monkeypatch.setattr(storage, "offload_prefix", "/internal/")
+    assert offload_headers(path) == {"x-accel-redirect": "/internal/ab/cd/book%20name"}
+    # Outside the aliased root the worker has to serve the file itself.
+    assert offload_headers(str(tmp_path.parent / "elsewhere")) is None
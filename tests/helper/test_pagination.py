@@ -0,0 +1,36 @@
+from datetime import date
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from app.helper.pagination import decode_cursor, encode_cursor
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor("name", "Dune", 42)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor, "name") == ("Dune", 42)
+
+
+def test_cursor_round_trip_date():
+    cursor = encode_cursor("date_published", date(2025, 5, 2), 7)
+
+    assert decode_cursor(cursor, "date_published") == (date(2025, 5, 2), 7)
+
+
+@pytest.mark.parametrize(
+    "cursor, sort",
+    [
+        ("not-a-cursor", "id"),
+        (encode_cursor("name", "Dune", 42), "author"),
+        (encode_cursor("id", 1, "1"), "id"),
+        (encode_cursor("date_published", "yesterday", 1), "date_published"),
+    ],
+)
+def test_decode_cursor_invalid(cursor, sort):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, sort)
+
+    assert exc.value.status_code == HTTPStatus.BAD_REQUEST
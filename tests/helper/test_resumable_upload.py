@@ -0,0 +1,104 @@
+import os
+import time
+from http import HTTPStatus
+
+import pytest
+from fastapi import HTTPException
+
+from app.helper import resumable_upload
+from app.helper.book_file import store_file
+from app.helper.resumable_upload import (
+    _open_locked,
+    append_chunks,
+    cancel_session,
+    create_session,
+    discard_session,
+    expire_sessions,
+    finish_upload,
+    parse_metadata,
+)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def test_parse_metadata():
+    assert parse_metadata(None) == {}
+    assert parse_metadata("filename Ym9vay5wZGY=, is_draft") == {
+        "filename": "book.pdf",
+        "is_draft": "",
+    }
+    with pytest.raises(HTTPException):
+        parse_metadata("filename not-base64!")
+
+
+@pytest.mark.asyncio
+async def test_append_and_finish(monkeypatch, tmp_path):
+    monkeypatch.setattr(resumable_upload, "PARTIAL_DIR", str(tmp_path))
+    monkeypatch.setattr("app.helper.book_file.UPLOAD_DIR", str(tmp_path))
+    session = await create_session(6, "../book.txt")
+    assert session.filename == "book.txt"
+
+    session = await append_chunks(session.id, 0, chunks(b"abc", b"d"))
+    assert session.offset == len(b"abcd")
+
+    # A second request while one is appending is turned away.
+    lock = _open_locked(session.id)
+    with pytest.raises(HTTPException) as exc:
+        await append_chunks(session.id, 4, chunks(b"ef"))
+    assert exc.value.status_code == HTTPStatus.CONFLICT
+    lock.close()
+
+    await append_chunks(session.id, 4, chunks(b"ef"))
+    saved = await finish_upload(session.id)
+    store_file(saved, saved.path)
+
+    assert saved.size == len(b"abcdef")
+    with open(saved.path, "rb") as file:
+        assert file.read() == b"abcdef"
+    # Kept until the caller has committed, so a failed request can retry.
+    assert await finish_upload(session.id) == saved
+    await discard_session(session.id)
+    assert sorted(os.listdir(tmp_path)) == [saved.sha256[:2]]
+
+
+@pytest.mark.asyncio
+async def test_finish_upload_twice(monkeypatch, tmp_path):
+    monkeypatch.setattr(resumable_upload, "PARTIAL_DIR", str(tmp_path))
+    monkeypatch.setattr("app.helper.book_file.UPLOAD_DIR", str(tmp_path))
+    session = await create_session(3, "book.txt")
+    session = await append_chunks(session.id, 0, chunks(b"abc"))
+    saved = await finish_upload(session.id)
+    store_file(saved, saved.path)
+    await discard_session(session.id)
+
+    # A retry that looked the session up before the first request finished.
+    async def stale_session(upload_id):
+        return session
+
+    monkeypatch.setattr(resumable_upload, "get_session", stale_session)
+    for retry in (finish_upload, cancel_session):
+        with pytest.raises(HTTPException) as exc:
+            await retry(session.id)
+        assert exc.value.status_code == HTTPStatus.NOT_FOUND
+
+    # Nothing recreated, and no empty blob stored.
+    assert sorted(os.listdir(tmp_path)) == [saved.sha256[:2]]
+    with open(saved.path, "rb") as file:
+        assert file.read() == b"abc"
+
+
+@pytest.mark.asyncio
+async def test_expire_sessions(monkeypatch, tmp_path):
+    monkeypatch.setattr(resumable_upload, "PARTIAL_DIR", str(tmp_path))
+    idle = await create_session(10, "idle.txt")
+    active = await create_session(10, "active.txt")
+    (tmp_path / ("0" * 32 + ".json")).write_text("{}")
+    old = time.time() - 7200
+    for name in (idle.id, f"{idle.id}.json", f"{active.id}.json", "0" * 32 + ".json"):
+        os.utime(tmp_path / name, (old, old))
+
+    assert expire_sessions(3600) == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([active.id, f"{active.id}.json"])
@@ -0,0 +1,53 @@
+import json
+from datetime import date
+
+from app.models import Book as BookDBModel
+from app.schemas.responses import (
+    BookBatchResponse,
+    BookResponse,
+    render_batch,
+    render_book,
+    render_books,
+)
+
+
+def make_books():
+    return [
+        BookDBModel(
+            id=1,
+            name="Dune",
+            author="Frank Herbert",
+            genre="Sci-Fi",
+            date_published=date(1965, 8, 1),
+        ),
+        BookDBModel(
+            id=2,
+            name="Солярис",
+            author="Станислав Лем",
+            genre="Sci-Fi",
+            date_published=date(1961, 1, 1),
+        ),
+    ]
+
+
+def test_render_matches_book_response():
+    books = make_books()
+
+    expected = [
+        BookResponse.model_validate(book).model_dump(mode="json") for book in books
+    ]
+    assert json.loads(render_books(books)) == expected
+    assert json.loads(render_book(books[0])) == expected[0]
+    assert (
+        render_book(books[0])
+        == BookResponse.model_validate(books[0]).model_dump_json().encode()
+    )
+
+
+def test_render_batch_matches_batch_response():
+    books = make_books()
+
+    expected = BookBatchResponse(
+        books=[BookResponse.model_validate(book) for book in books], missing=[7]
+    )
+    assert render_batch(books, [7]) == expected.model_dump_json().encode()